@@ -6,30 +6,27 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import List
 
-from database import get_db
+from database import get_db, get_request_db, RequestDB
 from models import User, UserRole
 from auth.service import AuthService
-from auth.permissions import PERMISSION_KEYS, normalize_permissions, defaults_for_role
+from auth.principal import Principal, get_principal, peek_principal, resolve_permissions
+from auth.permissions import mask_from_keys
 
 
 # OAuth2 схема для токенов
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
-def get_current_user(
-    request: Request,
-    token: str | None = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Получение текущего пользователя из токена
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось валидировать учётные данные",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _user_id_from_token(request: Request, token: str | None) -> int:
+    credentials_exception = _credentials_exception()
     try:
         if not token:
             token = request.cookies.get("access_token")
@@ -39,13 +36,49 @@ def get_current_user(
         user_id_str: str = payload.get("sub")
         if user_id_str is None:
             raise credentials_exception
-        user_id = int(user_id_str)  # Конвертируем строку в число
+        return int(user_id_str)  # Конвертируем строку в число
     except Exception:
         raise credentials_exception
-    
-    user = AuthService.get_user_by_id(db, user_id=user_id)
+
+
+async def get_current_principal(
+    request: Request,
+    token: str | None = Depends(oauth2_scheme),
+    request_db: RequestDB = Depends(get_request_db)
+) -> Principal:
+    """
+    Текущий пользователь для проверок доступа: из кэша auth.principal,
+    в БД идём только при промахе. Async, чтобы проверка прав не занимала
+    поток из пула FastAPI.
+    """
+    user_id = _user_id_from_token(request, token)
+    principal = peek_principal(user_id)
+    if principal is None:
+        # В сессии запроса, которую использует и обработчик: одно соединение на запрос
+        principal = await request_db.run_sync(get_principal, user_id)
+    if principal is None:
+        raise _credentials_exception()
+
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Пользователь заблокирован"
+        )
+
+    return principal
+
+
+def get_current_user(
+    request: Request,
+    token: str | None = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Получение текущего пользователя из токена (строка users из БД)
+    """
+    user = AuthService.get_user_by_id(db, user_id=_user_id_from_token(request, token))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     if not user.is_active:
         raise HTTPException(
@@ -79,7 +112,7 @@ class RoleChecker:
     def __init__(self, allowed_roles: List[UserRole]):
         self.allowed_roles = allowed_roles
     
-    def __call__(self, user: User = Depends(get_current_active_user)) -> User:
+    async def __call__(self, user: Principal = Depends(get_current_principal)) -> Principal:
         if user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -97,25 +130,19 @@ require_manager = RoleChecker([
 ])
 
 # Все роли (любой авторизованный пользователь)
-require_auth = get_current_active_user
+require_auth = get_current_principal
 
 # ===== Permissions =====
-def get_user_permissions(user: User) -> dict:
-    role_value = user.role.value if hasattr(user.role, 'value') else str(user.role)
-    data = user.permissions if hasattr(user, 'permissions') else {}
-    if data:
-        normalized = normalize_permissions(data)
-        if normalized is not None:
-            role_defaults = defaults_for_role(role_value)
-            role_defaults.update(normalized)
-            return role_defaults
-    return defaults_for_role(role_value)
+def get_user_permissions(user) -> dict:
+    if isinstance(user, Principal):
+        return user.permissions
+    return resolve_permissions(user)
 
 def require_permissions(required):
-    def checker(user: User = Depends(get_current_active_user)) -> User:
-        permissions = get_user_permissions(user)
-        missing = [p for p in required if not permissions.get(p, False)]
-        if missing:
+    required_mask = mask_from_keys(required)
+
+    async def checker(user: Principal = Depends(get_current_principal)) -> Principal:
+        if not user.has_all(required_mask):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Недостаточно прав для выполнения операции"
@@ -137,9 +164,11 @@ require_temp_delete = require_permissions(["temp_delete"])
 require_temp_download = require_permissions(["temp_download"])
 
 
-def require_reports_access(user: User = Depends(get_current_active_user)) -> User:
-    permissions = get_user_permissions(user)
-    if not (permissions.get("menu_reports", False) or permissions.get("download_pdf", False)):
+_REPORTS_MASK = mask_from_keys(["menu_reports", "download_pdf"])
+
+
+async def require_reports_access(user: Principal = Depends(get_current_principal)) -> Principal:
+    if not user.mask & _REPORTS_MASK:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Недостаточно прав для просмотра отчетов"
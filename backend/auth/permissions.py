@@ -25,6 +25,10 @@ PERMISSION_KEYS = [
     "temp_view_all",
 ]
 
+# Бит права = его позиция в PERMISSION_KEYS. Маски хранятся в users.permission_mask,
+# поэтому новые права добавляются только в конец списка.
+PERMISSION_BITS = {key: 1 << index for index, key in enumerate(PERMISSION_KEYS)}
+
 
 def normalize_permissions(payload):
     if payload is None:
@@ -126,3 +130,38 @@ ROLE_DEFAULTS = {
 
 def defaults_for_role(role):
     return ROLE_DEFAULTS.get(role, ROLE_DEFAULTS["viewer"]).copy()
+
+
+def mask_from_keys(keys) -> int:
+    mask = 0
+    for key in keys:
+        mask |= PERMISSION_BITS.get(key, 0)
+    return mask
+
+
+def mask_from_dict(data: dict) -> int:
+    return mask_from_keys(key for key, value in data.items() if value)
+
+
+def mask_to_dict(mask: int) -> dict:
+    """Словарь прав для /me и веб-клиента"""
+    return {key: bool(mask & bit) for key, bit in PERMISSION_BITS.items()}
+
+
+ROLE_MASKS = {role: mask_from_dict(values) for role, values in ROLE_DEFAULTS.items()}
+
+
+def role_mask(role) -> int:
+    return ROLE_MASKS.get(role, ROLE_MASKS["viewer"])
+
+
+def effective_mask(role, data) -> int:
+    """
+    Итоговая маска пользователя. Сохранённые права (непустой словарь) задают
+    все ключи сразу, иначе действуют права роли по умолчанию.
+    """
+    if data:
+        normalized = normalize_permissions(data)
+        if normalized is not None:
+            return mask_from_dict(normalized)
+    return role_mask(role)
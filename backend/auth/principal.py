@@ -0,0 +1,98 @@
+"""
+Кэш авторизованных пользователей: роль, активность и готовый набор прав по id
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from sqlalchemy.orm import Session
+
+import cache_bus
+from cache import TTLCache
+from config import settings
+from models import User, UserRole
+from auth.service import AuthService
+from auth.permissions import effective_mask, mask_to_dict
+
+
+_principals = TTLCache(
+    maxsize=settings.AUTH_PRINCIPAL_CACHE_MAX_ITEMS,
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+_TOPIC = "user"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Снимок пользователя для проверок доступа.
+    Эндпоинтам, которым нужна сама строка users (например привязка Telegram), нужен get_current_user.
+    """
+    id: int
+    username: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+    mask: int
+    permissions: Mapping[str, bool]
+
+    def has_all(self, required_mask: int) -> bool:
+        return self.mask & required_mask == required_mask
+
+
+def user_mask(user: User) -> int:
+    """Маска из users.permission_mask; для строк до миграции считается на месте"""
+    if user.permission_mask is not None:
+        return user.permission_mask
+    role_value = user.role.value if hasattr(user.role, 'value') else str(user.role)
+    return effective_mask(role_value, user.permissions)
+
+
+def resolve_permissions(user: User) -> dict:
+    """Права пользователя словарём (форма для /me и веб-клиента)"""
+    return mask_to_dict(user_mask(user))
+
+
+def from_user(user: User) -> Principal:
+    mask = user_mask(user)
+    return Principal(
+        id=user.id,
+        username=user.username,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=bool(user.is_active),
+        mask=mask,
+        permissions=MappingProxyType(mask_to_dict(mask)),
+    )
+
+
+def peek_principal(user_id: int) -> Optional[Principal]:
+    """Только кэш, без обращения к БД"""
+    return _principals.get(user_id)
+
+
+def get_principal(db: Session, user_id: int) -> Optional[Principal]:
+    principal = _principals.get(user_id)
+    if principal is None:
+        user = AuthService.get_user_by_id(db, user_id=user_id)
+        if user is None:
+            return None
+        principal = from_user(user)
+        _principals.set(user_id, principal)
+    return principal
+
+
+def invalidate(db: Session, user_id: int) -> None:
+    """Вызывается до коммита изменений пользователя: остальные воркеры сбросят запись после коммита"""
+    _principals.pop(user_id)
+    cache_bus.publish(db, _TOPIC, str(user_id))
+
+
+def _on_user_changed(payload: str) -> None:
+    if payload.isdigit():
+        _principals.pop(int(payload))
+    else:
+        _principals.clear()
+
+
+cache_bus.subscribe(_TOPIC, _on_user_changed)
@@ -4,6 +4,7 @@ API endpoints для авторизации и управления пользо
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from collections import deque
 from threading import Lock
 import time
@@ -16,13 +17,14 @@ import json
 from urllib import request as urllib_request
 from urllib import error as urllib_error
 
-from database import get_db
+from database import get_db, get_async_db, read_timeout
 from config import settings
 from models import User, UserRole
 from auth.schemas import UserCreate, UserResponse, UserUpdate, Token, LoginRequest, TelegramLoginRequest, TelegramLinkRequest
 from auth.service import AuthService
 from auth.permissions import normalize_permissions, defaults_for_role
-from auth.dependencies import get_current_active_user, require_admin
+from auth.dependencies import get_current_active_user, require_admin, require_auth
+from auth import principal
 
 
 router = APIRouter(prefix="/api/auth", tags=["Авторизация"])
@@ -267,14 +269,22 @@ def link_telegram(
     return current_user
 
 
-@router.get("/me", response_model=UserResponse)
-def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(read_timeout)])
+async def get_current_user_info(
+    current_user: principal.Principal = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение информации о текущем пользователе
     """
-    return current_user
+    user = await db.run_sync(AuthService.get_user_by_id, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Не удалось валидировать учётные данные",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
 
 @router.post("/users", response_model=UserResponse)
@@ -368,6 +378,7 @@ def update_user(
             permissions_payload = defaults_for_role(role_value)
         user.extra_permissions = json.dumps(permissions_payload)
 
+    principal.invalidate(db, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -395,6 +406,7 @@ def delete_user(
             detail="Пользователь не найден"
         )
     
+    principal.invalidate(db, user.id)
     db.delete(user)
     db.commit()
     return {"message": "Пользователь успешно удалён"}
@@ -0,0 +1,93 @@
+"""
+Замер задержки проверки госномера на посту охраны (GateService.check_plate)
+Запуск: python bench_gate_check.py [количество_итераций]
+"""
+import random
+import statistics
+import sys
+import time
+
+from database import SessionLocal
+from models import Propusk, PropuskStatus, TemporaryPass
+from gate.service import GateService
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(title: str, timings: list) -> None:
+    ms = [t * 1000 for t in timings]
+    print(
+        f"{title:<28} n={len(ms):<6} "
+        f"p50={_percentile(ms, 50):7.2f} мс  "
+        f"p95={_percentile(ms, 95):7.2f} мс  "
+        f"p99={_percentile(ms, 99):7.2f} мс  "
+        f"avg={statistics.mean(ms):7.2f} мс"
+    )
+
+
+def _run(db, plates: list, iterations: int, cold: bool) -> list:
+    timings = []
+    for _ in range(iterations):
+        plate = random.choice(plates)
+        if cold:
+            GateService.clear_cache()
+        started = time.perf_counter()
+        GateService.check_plate(db, plate)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_gate_check(iterations: int = 1000):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ПРОВЕРКИ НОМЕРА НА ПОСТУ ОХРАНЫ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+
+    try:
+        permanent = [
+            row.gos_id for row in db.query(Propusk.gos_id)
+            .filter(Propusk.status == PropuskStatus.ACTIVE)
+            .limit(500)
+            .all()
+        ]
+        temporary = [
+            row.gos_id for row in db.query(TemporaryPass.gos_id)
+            .filter(TemporaryPass.revoked_at.is_(None))
+            .limit(500)
+            .all()
+        ]
+        unknown = [f"Х{random.randint(100, 999)}ХХ{random.randint(10, 999)}" for _ in range(50)]
+
+        if not permanent and not temporary:
+            print("⚠️  Нет активных пропусков, замеряются только неизвестные номера")
+
+        print(f"Номеров: постоянных {len(permanent)}, временных {len(temporary)}, неизвестных {len(unknown)}\n")
+
+        # Прогрев соединения и плана запроса
+        _run(db, unknown, 20, cold=True)
+
+        groups = [
+            ("постоянные", permanent),
+            ("временные", temporary),
+            ("неизвестные", unknown),
+        ]
+        for name, plates in groups:
+            if not plates:
+                continue
+            _report(f"{name}, без кэша", _run(db, plates, iterations, cold=True))
+            GateService.clear_cache()
+            _report(f"{name}, с кэшем", _run(db, plates, iterations, cold=False))
+
+        print()
+    finally:
+        GateService.clear_cache()
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_gate_check(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,148 @@
+"""
+Нагрузочный замер читающих эндпоинтов при фиксированном числе одновременных клиентов
+(сервер должен быть запущен; сравнение - один и тот же запуск до и после изменений)
+Запуск: python bench_load.py [адрес] [клиентов_через_запятую] [секунд_на_замер]
+Логин и пароль пользователя с правом просмотра: BENCH_USERNAME / BENCH_PASSWORD
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from urllib.parse import quote, urlsplit
+import http.client
+import json
+import os
+import statistics
+import sys
+import time
+
+
+ENDPOINTS = [
+    "/api/propusk?limit=50",
+    "/api/propusk/paged?limit=50",
+    "/api/propusk/stats",
+    f"/api/propusk/lookup?plate={quote('А1')}",
+    "/api/temporary-pass?limit=50",
+    f"/api/gate/check?plate={quote('А123АА77')}",
+    "/api/auth/me",
+]
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _connect(base_url: str) -> http.client.HTTPConnection:
+    parts = urlsplit(base_url)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    return conn_cls(parts.hostname, parts.port, timeout=30)
+
+
+def _login(base_url: str, username: str, password: str) -> str:
+    conn = _connect(base_url)
+    try:
+        body = json.dumps({"username": username, "password": password})
+        conn.request("POST", "/api/auth/login-json", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        payload = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Не удалось войти ({response.status}): {payload[:200]!r}")
+        return json.loads(payload)["access_token"]
+    finally:
+        conn.close()
+
+
+def _client(base_url: str, path: str, headers: dict, stop: Event) -> tuple:
+    # Одно keep-alive соединение на клиента, как у браузера поста охраны
+    timings, errors = [], 0
+    conn = _connect(base_url)
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = _connect(base_url)
+                continue
+            timings.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    return timings, errors
+
+
+def _measure(base_url: str, path: str, headers: dict, concurrency: int, seconds: float) -> None:
+    stop = Event()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_client, base_url, path, headers, stop) for _ in range(concurrency)]
+        time.sleep(seconds)
+        stop.set()
+        results = [future.result() for future in futures]
+
+    timings = [t * 1000 for items, _ in results for t in items]
+    errors = sum(err for _, err in results)
+    if not timings:
+        print(f"{path:<36} c={concurrency:<4} нет успешных ответов, ошибок {errors}")
+        return
+    print(
+        f"{path:<36} c={concurrency:<4} "
+        f"{len(timings) / seconds:8.1f} зап/с  "
+        f"p50={_percentile(timings, 50):7.1f} мс  "
+        f"p95={_percentile(timings, 95):7.1f} мс  "
+        f"avg={statistics.mean(timings):7.1f} мс  "
+        f"ошибок {errors}"
+    )
+
+
+def _print_pool(base_url: str, headers: dict) -> None:
+    # Доступно только администратору; при нескольких воркерах - данные того, кто ответил
+    conn = _connect(base_url)
+    try:
+        conn.request("GET", "/api/settings/db-pool", headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+    finally:
+        conn.close()
+    if response.status != 200:
+        return
+    for name, pool in json.loads(payload).items():
+        print(
+            f"  пул {name:<5} размер {pool['size']}, overflow {pool['overflow']}, "
+            f"выдач {pool['checkouts']}, таймаутов {pool['timeouts']}, "
+            f"ожидание avg {pool['wait_avg_ms']:.2f} мс / max {pool['wait_max_ms']:.2f} мс"
+        )
+
+
+def bench_load(base_url: str, concurrency_levels: list, seconds: float):
+    print("\n" + "="*60)
+    print("   НАГРУЗОЧНЫЙ ЗАМЕР ЧИТАЮЩИХ ЭНДПОИНТОВ")
+    print("="*60 + "\n")
+
+    username = os.getenv("BENCH_USERNAME")
+    password = os.getenv("BENCH_PASSWORD")
+    if not username or not password:
+        print("❌ Задай BENCH_USERNAME и BENCH_PASSWORD")
+        return
+
+    token = _login(base_url, username, password)
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"Сервер {base_url}, {seconds:g} с на замер\n")
+
+    for concurrency in concurrency_levels:
+        for path in ENDPOINTS:
+            _measure(base_url, path, headers, concurrency, seconds)
+        _print_pool(base_url, headers)
+        print()
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+    levels = [int(value) for value in sys.argv[2].split(",")] if len(sys.argv) > 2 else [10, 50, 100]
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    bench_load(url, levels, duration)
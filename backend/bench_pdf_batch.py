@@ -0,0 +1,72 @@
+"""
+Замер скорости пакетной печати пропусков (пропусков в секунду)
+Запуск: python bench_pdf_batch.py [количество_пропусков]
+"""
+import sys
+import time
+
+from database import SessionLocal
+from models import Propusk, PropuskStatus
+from settings.service import get_active_template
+from propusk.pdf_batch import load_active_propusks, render_batch, shutdown_pool
+from propusk.pdf_generator import PropuskPDFGenerator
+from config import settings
+from pdf_output import read_all
+
+
+def _measure(title: str, func, count: int) -> None:
+    started = time.perf_counter()
+    buffer = func()
+    elapsed = time.perf_counter() - started
+    size_kb = len(read_all(buffer)) / 1024
+    buffer.close()
+    print(f"{title:<36} {elapsed:7.2f} с  {count / elapsed:8.1f} проп./с  {size_kb:9.1f} КБ")
+
+
+def bench_pdf_batch(count: int = 2000):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ПАКЕТНОЙ ПЕЧАТИ ПРОПУСКОВ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+
+    try:
+        ids = [
+            row.id_propusk for row in db.query(Propusk.id_propusk)
+            .filter(Propusk.status == PropuskStatus.ACTIVE)
+            .limit(count)
+            .all()
+        ]
+        if not ids:
+            print("❌ Нет активных пропусков! Сначала запусти seed_propusks.py")
+            return
+
+        # Если активных меньше, чем нужно, повторяем их по кругу
+        ids = (ids * (count // len(ids) + 1))[:count]
+        template = get_active_template(db)
+        template_data = template.data_json if template else None
+
+        started = time.perf_counter()
+        propusks = load_active_propusks(db, ids)
+        print(f"Выборка {len(propusks)} пропусков одним запросом: {time.perf_counter() - started:.2f} с\n")
+
+        _measure(
+            "в одном процессе",
+            lambda: PropuskPDFGenerator.generate_multiple_propusks_pdf(propusks, template_data=template_data),
+            len(propusks),
+        )
+        # Первый вызов поднимает пул процессов, его время замеряем отдельно
+        _measure("пул процессов (с запуском пула)", lambda: render_batch(propusks, template_data), len(propusks))
+        _measure("пул процессов", lambda: render_batch(propusks, template_data), len(propusks))
+        print(
+            f"\nPDF_BATCH_WORKERS={settings.PDF_BATCH_WORKERS or 'auto'}, "
+            f"PDF_BATCH_CHUNK_SIZE={settings.PDF_BATCH_CHUNK_SIZE}, "
+            f"PDF_BATCH_PARALLEL_THRESHOLD={settings.PDF_BATCH_PARALLEL_THRESHOLD}\n"
+        )
+    finally:
+        shutdown_pool()
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_pdf_batch(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,78 @@
+"""
+Замер памяти при формировании отчёта по всем организациям на тысячи страниц
+(данные синтетические, БД не нужна)
+Запуск: python bench_pdf_memory.py [страниц_через_запятую]
+"""
+from datetime import date
+from types import SimpleNamespace
+import sys
+import tracemalloc
+
+from config import settings
+from propusk.org_report import generate_all_orgs_report
+
+
+ROWS_PER_PAGE = 15
+
+
+def _org_items(pages: int):
+    for org_index in range(pages // 4 or 1):
+        propusks = [
+            SimpleNamespace(
+                id_propusk=org_index * 100 + i,
+                gos_id=f"А{i:03d}АА77",
+                mark=SimpleNamespace(mark_name="Toyota"),
+                abonent=SimpleNamespace(full_name="Иванов Иван Иванович"),
+                info="Проверка",
+                valid_until=date(2030, 1, 1),
+            )
+            for i in range(ROWS_PER_PAGE * 4)
+        ]
+        yield {
+            "org_name": f"Организация {org_index}",
+            "free_mesto": 10,
+            "permanent_count": len(propusks),
+            "propusks": propusks,
+        }
+
+
+def _measure(title: str, pages: int) -> None:
+    tracemalloc.start()
+    buffer = generate_all_orgs_report(_org_items(pages))
+    held, peak = tracemalloc.get_traced_memory()
+    buffer.seek(0, 2)
+    size_mb = buffer.tell() / 1024 / 1024
+    buffer.close()
+    tracemalloc.stop()
+    print(
+        f"{title:<28} {pages:6d} стр.  файл {size_mb:7.1f} МБ  "
+        f"пик {peak / 1024 / 1024:7.1f} МБ  держится до отдачи {held / 1024 / 1024:7.1f} МБ"
+    )
+
+
+def bench_pdf_memory(page_counts: list):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ПАМЯТИ ПРИ ФОРМИРОВАНИИ БОЛЬШИХ PDF")
+    print("="*60 + "\n")
+
+    compression = settings.PDF_PAGE_COMPRESSION
+    spool_limit = settings.PDF_SPOOL_MAX_MEMORY_BYTES
+    try:
+        for pages in page_counts:
+            # Как раньше: без сжатия, весь файл в памяти
+            settings.PDF_PAGE_COMPRESSION = False
+            settings.PDF_SPOOL_MAX_MEMORY_BYTES = 1 << 40
+            _measure("в памяти, без сжатия", pages)
+
+            settings.PDF_PAGE_COMPRESSION = compression
+            settings.PDF_SPOOL_MAX_MEMORY_BYTES = spool_limit
+            _measure("сжатие + временный файл", pages)
+            print()
+    finally:
+        settings.PDF_PAGE_COMPRESSION = compression
+        settings.PDF_SPOOL_MAX_MEMORY_BYTES = spool_limit
+
+
+if __name__ == "__main__":
+    counts = [int(value) for value in sys.argv[1].split(",")] if len(sys.argv) > 1 else [500, 1000, 2000, 4000]
+    bench_pdf_memory(counts)
@@ -0,0 +1,66 @@
+"""
+Микро-замер проверки прав в зависимостях FastAPI: словари против битовых масок
+(данные синтетические, БД не нужна)
+Запуск: python bench_permissions.py [повторов]
+"""
+from types import SimpleNamespace
+import json
+import sys
+import timeit
+
+from models import UserRole
+from auth.permissions import normalize_permissions, defaults_for_role, mask_from_keys
+from auth.principal import from_user
+
+
+REQUIRED = ["view", "download_pdf"]
+
+
+def _user(extra: dict):
+    raw = json.dumps(extra)
+    user = SimpleNamespace(
+        id=1,
+        username="bench",
+        full_name="Bench User",
+        role=UserRole.MANAGER,
+        is_active=True,
+        extra_permissions=raw,
+        permission_mask=None,
+    )
+    user.permissions = json.loads(raw)
+    return user
+
+
+def _dict_check(user) -> bool:
+    # Как раньше: разбор JSON и сборка словарей прав на каждый запрос
+    role_value = user.role.value
+    data = json.loads(user.extra_permissions or "{}")
+    permissions = defaults_for_role(role_value)
+    if data:
+        normalized = normalize_permissions(data)
+        if normalized is not None:
+            permissions.update(normalized)
+    return not [p for p in REQUIRED if not permissions.get(p, False)]
+
+
+def bench_permissions(number: int = 200_000):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ПРОВЕРКИ ПРАВ")
+    print("="*60 + "\n")
+
+    user = _user({"view": True, "download_pdf": True, "create": True})
+    principal = from_user(user)
+    required_mask = mask_from_keys(REQUIRED)
+
+    results = {
+        "словари (normalize + defaults)": timeit.timeit(lambda: _dict_check(user), number=number),
+        "битовая маска (AND)": timeit.timeit(lambda: principal.has_all(required_mask), number=number),
+    }
+    for title, elapsed in results.items():
+        print(f"{title:<34} {elapsed * 1_000_000 / number:8.3f} мкс/проверка")
+    before, after = results.values()
+    print(f"\nУскорение: x{before / after:.1f}\n")
+
+
+if __name__ == "__main__":
+    bench_permissions(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
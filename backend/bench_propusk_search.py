@@ -0,0 +1,170 @@
+"""
+Замер поиска пропусков (параметр search) на синтетических пропусках:
+соединение с 5 ILIKE (как было), OR с подзапросами IN и текущий UNION по id
+(данные вставляются в транзакции и откатываются в конце)
+Запуск: python bench_propusk_search.py [пропусков]
+"""
+import re
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, or_, select, text
+
+from database import SessionLocal
+from models import Propusk, Organiz, Abonent, MarkAuto, ModelAuto, User, PLATE_NORM_SQL
+from propusk.service import PropuskService
+
+
+SURNAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Фёдоров"]
+NAMES = ["Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Артём", "Илья", "Кирилл", "Михаил"]
+
+SEARCHES = [
+    ("часть номера", "123"),
+    ("фамилия", "Смирнов"),
+    ("организация", "Бенч-орг 17"),
+    ("нет совпадений", "Щщщ"),
+]
+
+
+def _joined_query(db, search: str, count: bool):
+    """Поиск до индексов: соединение с abonent и organiz, 5 ILIKE через OR"""
+    pattern = f"%{search}%"
+    query = db.query(func.count(Propusk.id_propusk)) if count else db.query(Propusk.id_propusk)
+    query = query.select_from(Propusk).join(Abonent).join(Organiz).filter(
+        or_(
+            Propusk.gos_id.ilike(pattern),
+            Organiz.org_name.ilike(pattern),
+            Abonent.surname.ilike(pattern),
+            Abonent.name.ilike(pattern),
+            Abonent.otchestvo.ilike(pattern),
+        )
+    )
+    return query
+
+
+def _or_in_query(db, search: str, count: bool):
+    """Первый вариант: gos_id ILIKE OR id_org IN (...) OR id_fio IN (...)"""
+    pattern = f"%{search}%"
+    org_ids = select(Organiz.id_org).where(Organiz.org_name.ilike(pattern))
+    abonent_ids = select(Abonent.id_fio).where(
+        or_(Abonent.surname.ilike(pattern), Abonent.name.ilike(pattern), Abonent.otchestvo.ilike(pattern))
+    )
+    query = db.query(func.count(Propusk.id_propusk)) if count else db.query(Propusk.id_propusk)
+    return query.filter(
+        or_(Propusk.gos_id.ilike(pattern), Propusk.id_org.in_(org_ids), Propusk.id_fio.in_(abonent_ids))
+    )
+
+
+def _current_query(db, search: str, count: bool):
+    query = db.query(func.count(Propusk.id_propusk)) if count else db.query(Propusk.id_propusk)
+    return PropuskService._apply_filters(query, search=search)
+
+
+def _page(query):
+    return query.order_by(Propusk.created_at.desc(), Propusk.id_propusk.desc()).limit(50)
+
+
+def _plan_indexes(db, query) -> str:
+    """Индексы, которые PostgreSQL выбрал для запроса (из EXPLAIN)"""
+    compiled = query.statement.compile(dialect=db.bind.dialect)
+    plan = db.connection().exec_driver_sql("EXPLAIN " + str(compiled), compiled.params).scalars().all()
+    names = sorted(set(re.findall(r"\b(ix_\w+)", "\n".join(plan))))
+    if not names:
+        return "индексы не используются"
+    return ", ".join(names)
+
+
+def _measure(title: str, func_, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func_()
+        timings.append((time.perf_counter() - started) * 1000)
+    avg = statistics.mean(timings)
+    print(f"  {title:<34} avg={avg:8.2f} мс  min={min(timings):8.2f} мс")
+    return avg
+
+
+def _insert_propusks(db, total: int, user_id: int, mark_id: int, model_id: int) -> None:
+    orgs = max(total // 500, 1)
+    abonents = max(total // 5, 1)
+    db.execute(text("""
+        INSERT INTO organiz (org_name, free_mesto, free_mesto_limit)
+        SELECT 'Бенч-орг ' || g, 0, 0 FROM generate_series(1, :orgs) AS g
+    """), {"orgs": orgs})
+    db.execute(text("""
+        INSERT INTO abonent (surname, name, otchestvo, id_org)
+        SELECT
+            (CAST(:surnames AS text[]))[1 + g % cardinality(CAST(:surnames AS text[]))],
+            (CAST(:names AS text[]))[1 + (g / 10) % cardinality(CAST(:names AS text[]))],
+            CASE WHEN g % 3 = 0 THEN '' ELSE 'Бенчевич' END,
+            o.id_org
+        FROM generate_series(1, :abonents) AS g
+        JOIN organiz AS o ON o.org_name = 'Бенч-орг ' || (1 + g % :orgs)
+    """), {"surnames": SURNAMES, "names": NAMES, "abonents": abonents, "orgs": orgs})
+    plate = "('Б' || lpad(CAST(g % 1000 AS text), 3, '0') || 'ЕН' || (10 + g % 90))"
+    db.execute(text(f"""
+        WITH ab AS (
+            SELECT a.id_fio, a.id_org, row_number() OVER (ORDER BY a.id_fio) - 1 AS n
+            FROM abonent AS a
+            JOIN organiz AS o ON o.id_org = a.id_org AND o.org_name LIKE 'Бенч-орг %'
+        )
+        INSERT INTO propusk
+            (gos_id, gos_id_norm, id_mark_auto, id_model_auto, id_org, release_date, valid_until,
+             id_fio, status, created_by, created_at)
+        SELECT
+            {plate}, {PLATE_NORM_SQL.format(column=plate)}, :mark_id, :model_id, ab.id_org,
+            current_date - g % 365, current_date + 365 - g % 365,
+            ab.id_fio, 'ACTIVE', :user_id, now() - g * interval '1 minute'
+        FROM generate_series(0, :total - 1) AS g
+        JOIN ab ON ab.n = g % :abonents
+    """), {"total": total, "abonents": abonents, "mark_id": mark_id, "model_id": model_id, "user_id": user_id})
+    for table in ("propusk", "abonent", "organiz"):
+        db.execute(text(f"ANALYZE {table}"))
+
+
+def bench_propusk_search(total: int = 100_000, repeats: int = 10):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ПОИСКА ПРОПУСКОВ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+
+    try:
+        user = db.query(User).order_by(User.id).first()
+        model = db.query(ModelAuto).join(MarkAuto).order_by(ModelAuto.id_model).first()
+        if not user or not model:
+            print("❌ Нет пользователей или моделей! Сначала запусти seed_data.py")
+            return
+        trgm = db.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_propusk_gos_id_trgm'")).scalar()
+        if not trgm:
+            print("⚠️ Индексов pg_trgm нет - сначала выполни python migrate.py\n")
+
+        print(f"Вставка {total} синтетических пропусков...")
+        _insert_propusks(db, total, user.id, model.id_mark, model.id_model)
+        print("Вставлено (будет откачено)\n")
+
+        variants = [
+            ("соединение + 5 ILIKE", _joined_query),
+            ("OR с подзапросами IN", _or_in_query),
+            ("UNION по id (текущий)", _current_query),
+        ]
+        for title, search in SEARCHES:
+            found = _current_query(db, search, count=True).scalar()
+            print(f"{title} ({search!r}, найдено {found}):")
+            averages = {}
+            for name, build in variants:
+                averages[name] = _measure(f"COUNT, {name}", lambda: build(db, search, True).scalar(), repeats)
+                _measure(f"страница 50, {name}", lambda: _page(build(db, search, False)).all(), repeats)
+            print(f"  план текущего: {_plan_indexes(db, _page(_current_query(db, search, False)))}")
+            before = averages[variants[0][0]]
+            after = averages[variants[-1][0]]
+            print(f"  COUNT быстрее в x{before / after:.1f}\n")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_propusk_search(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,119 @@
+"""
+Замер фильтров по датам в списке временных пропусков на годе синтетических данных:
+date(valid_from) >= ... (как раньше) против полуоткрытого интервала по времени
+(данные вставляются в транзакции и откатываются в конце)
+Запуск: python bench_temp_pass_filters.py [пропусков_в_день]
+"""
+from datetime import timedelta
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, text
+
+from config import settings
+from database import SessionLocal
+from models import Organiz, User, TemporaryPass, PLATE_NORM_SQL
+from temporary_pass.service import TemporaryPassService
+
+
+def _old_count(db, id_org, date_from, date_to) -> int:
+    query = db.query(func.count(TemporaryPass.id))
+    if id_org:
+        query = query.filter(TemporaryPass.id_org == id_org)
+    query = query.filter(
+        func.date(TemporaryPass.valid_from) >= date_from,
+        func.date(TemporaryPass.valid_until) <= date_to,
+    )
+    return int(query.scalar() or 0)
+
+
+def _old_list(db, id_org, date_from, date_to) -> list:
+    query = db.query(TemporaryPass)
+    if id_org:
+        query = query.filter(TemporaryPass.id_org == id_org)
+    query = query.filter(
+        func.date(TemporaryPass.valid_from) >= date_from,
+        func.date(TemporaryPass.valid_until) <= date_to,
+    )
+    return query.order_by(TemporaryPass.created_at.desc(), TemporaryPass.id.desc()).limit(50).all()
+
+
+def _measure(title: str, func_, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func_()
+        timings.append((time.perf_counter() - started) * 1000)
+    avg = statistics.mean(timings)
+    print(f"  {title:<34} avg={avg:8.2f} мс  min={min(timings):8.2f} мс")
+    return avg
+
+
+def _insert_year(db, per_day: int, org_ids: list, user_id: int) -> int:
+    today = TemporaryPassService._now().date()
+    plate = "('БЕНЧ' || g)"
+    db.execute(text(f"""
+        INSERT INTO temporary_pass
+            (gos_id, gos_id_norm, id_org, valid_from, valid_until, created_by, created_at, revoked_at, revoked_by)
+        SELECT
+            {plate}, {PLATE_NORM_SQL.format(column=plate)},
+            (CAST(:org_ids AS integer[]))[1 + g % cardinality(CAST(:org_ids AS integer[]))],
+            day + interval '8 hours', day + interval '20 hours',
+            :user_id, day + interval '8 hours', day + interval '20 hours', :user_id
+        FROM generate_series(0, :total - 1) AS g,
+            LATERAL (
+                SELECT CAST(CAST(:today AS date) - g / :per_day AS timestamp)
+                    AT TIME ZONE COALESCE(:tz, current_setting('TimeZone')) AS day
+            ) AS d
+    """), {
+        "org_ids": org_ids,
+        "user_id": user_id,
+        "total": per_day * 365,
+        "per_day": per_day,
+        "today": today,
+        "tz": settings.TIMEZONE,
+    })
+    db.execute(text("ANALYZE temporary_pass"))
+    return per_day * 365
+
+
+def bench_temp_pass_filters(per_day: int = 300, repeats: int = 20):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ФИЛЬТРОВ ПО ДАТАМ ВРЕМЕННЫХ ПРОПУСКОВ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+
+    try:
+        org_ids = [row.id_org for row in db.query(Organiz.id_org).limit(20)]
+        user = db.query(User).order_by(User.id).first()
+        if not org_ids or not user:
+            print("❌ Нет организаций или пользователей! Сначала запусти seed_data.py")
+            return
+
+        print(f"Вставка года синтетических пропусков ({per_day} в день)...")
+        total = _insert_year(db, per_day, org_ids, user.id)
+        print(f"Вставлено {total} строк (будут откачены)\n")
+
+        today = TemporaryPassService._now().date()
+        scenarios = [
+            ("один день, одна организация", org_ids[0], today - timedelta(days=30), today - timedelta(days=30)),
+            ("неделя, все организации", None, today - timedelta(days=7), today),
+            ("месяц, одна организация", org_ids[0], today - timedelta(days=60), today - timedelta(days=31)),
+        ]
+        for title, id_org, date_from, date_to in scenarios:
+            print(f"{title}:")
+            filters = {"id_org": id_org, "date_from": date_from, "date_to": date_to}
+            before = _measure("COUNT, date() над колонкой", lambda: _old_count(db, **filters), repeats)
+            after = _measure("COUNT, интервал по времени", lambda: TemporaryPassService.count_passes(db, **filters), repeats)
+            _measure("список 50, date() над колонкой", lambda: _old_list(db, **filters), repeats)
+            _measure("список 50, интервал по времени", lambda: TemporaryPassService.list_passes(db, **filters), repeats)
+            print(f"  COUNT быстрее в x{before / after:.1f}\n")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_temp_pass_filters(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
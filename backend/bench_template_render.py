@@ -0,0 +1,69 @@
+"""
+Замер отрисовки одной карточки пропуска: разбор шаблона на каждой карточке
+против заранее скомпилированного плана (pdf_templates)
+Запуск: python bench_template_render.py [количество_карточек]
+"""
+import sys
+import time
+
+from database import SessionLocal
+from models import Propusk, PropuskStatus
+from settings.service import get_active_template
+from propusk.pdf_batch import load_active_propusks
+from propusk.pdf_generator import PropuskPDFGenerator
+
+
+def _measure(title: str, func, propusks: list) -> float:
+    started = time.perf_counter()
+    for propusk in propusks:
+        func(propusk)
+    per_card_ms = (time.perf_counter() - started) * 1000 / len(propusks)
+    print(f"{title:<44} {per_card_ms:8.2f} мс/карточка")
+    return per_card_ms
+
+
+def bench_template_render(count: int = 500):
+    print("\n" + "="*60)
+    print("   ЗАМЕР ОТРИСОВКИ КАРТОЧКИ ПО ШАБЛОНУ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+
+    try:
+        template = get_active_template(db)
+        if not template:
+            print("❌ Нет активного шаблона пропуска! Сохрани шаблон в настройках")
+            return
+
+        ids = [
+            row.id_propusk for row in db.query(Propusk.id_propusk)
+            .filter(Propusk.status == PropuskStatus.ACTIVE)
+            .limit(count)
+            .all()
+        ]
+        if not ids:
+            print("❌ Нет активных пропусков! Сначала запусти seed_propusks.py")
+            return
+
+        ids = (ids * (count // len(ids) + 1))[:count]
+        propusks = load_active_propusks(db, ids)
+
+        # Как раньше: JSON и элементы шаблона разбираются для каждой карточки
+        before = _measure(
+            "словарь шаблона (разбор на каждой карточке)",
+            lambda p: PropuskPDFGenerator.generate_propusk_pdf(p, template_data=template.data_json),
+            propusks,
+        )
+        plan = PropuskPDFGenerator.compile_template(template)
+        after = _measure(
+            "скомпилированный план",
+            lambda p: PropuskPDFGenerator.generate_propusk_pdf(p, template_data=plan),
+            propusks,
+        )
+        print(f"\nУскорение: x{before / after:.2f} ({len(plan.ops)} элементов в шаблоне v{template.version})\n")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    bench_template_render(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
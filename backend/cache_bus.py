@@ -0,0 +1,114 @@
+"""
+Сброс кэшей процесса во всех воркерах через PostgreSQL LISTEN/NOTIFY
+
+Изменивший данные процесс вызывает publish() в своей транзакции; после коммита
+каждый воркер получает уведомление в фоновом потоке и вызывает подписчиков темы.
+"""
+from collections import defaultdict
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional
+import traceback
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+
+
+CHANNEL = "app_cache"
+
+_handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+_handlers_lock = Lock()
+_listener: Optional["_Listener"] = None
+
+
+def subscribe(topic: str, handler: Callable[[str], None]) -> None:
+    """handler(payload) вызывается при уведомлении по теме и после переподключения (payload="")"""
+    with _handlers_lock:
+        _handlers[topic].append(handler)
+
+
+def publish(db: Session, topic: str, payload: str = "") -> None:
+    """Уведомление уходит при коммите транзакции db (и не уходит при откате)"""
+    db.execute(
+        text("SELECT pg_notify(:channel, :message)"),
+        {"channel": CHANNEL, "message": f"{topic}:{payload}"},
+    )
+
+
+def _dispatch(topic: Optional[str], payload: str) -> None:
+    with _handlers_lock:
+        if topic is None:
+            handlers = [handler for items in _handlers.values() for handler in items]
+        else:
+            handlers = list(_handlers.get(topic, ()))
+    for handler in handlers:
+        try:
+            handler(payload)
+        except Exception:
+            traceback.print_exc()
+
+
+def _conninfo() -> str:
+    # psycopg принимает обычный URL postgresql://, без имени драйвера SQLAlchemy
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class _Listener:
+    def __init__(self):
+        self._stop = Event()
+        self.connected = Event()
+        self._thread = Thread(target=self._run, name="cache-bus-listener", daemon=True)
+
+    def _listen(self) -> None:
+        with psycopg.connect(_conninfo(), autocommit=True) as conn:
+            conn.execute(f"LISTEN {CHANNEL}")
+            # Пока соединения не было, уведомления могли потеряться - сбрасываем всё
+            _dispatch(None, "")
+            self.connected.set()
+            while not self._stop.is_set():
+                for notify in conn.notifies(timeout=1.0):
+                    topic, _, payload = notify.payload.partition(":")
+                    _dispatch(topic, payload)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                self.connected.clear()
+                print("❌ Потеряно соединение LISTEN для сброса кэшей, переподключение...")
+                traceback.print_exc()
+                self._stop.wait(settings.CACHE_BUS_RECONNECT_SECONDS)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+
+def start_listener() -> None:
+    global _listener
+    if not settings.CACHE_BUS_ENABLED or _listener is not None:
+        return
+    _listener = _Listener()
+    _listener.start()
+
+
+def is_live() -> bool:
+    """
+    Уведомления сейчас доходят до этого воркера: значения кэшей, сбрасываемых
+    через шину, можно считать актуальными, а не только ограниченными TTL.
+    """
+    return _listener is not None and _listener.connected.is_set()
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str | None = None
     POSTGRES_HOST: str | None = None
     POSTGRES_PORT: int = 5432
+
+    # Пул соединений (отдельно sync и async пул в каждом воркере, см. README)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 10
+    DB_POOL_RECYCLE_SECONDS: int = 30 * 60  # -1 - не пересоздавать
+    DB_POOL_PRE_PING: bool = False  # True - если соединения рвёт прокси/файрвол по простою
+
+    # Таймауты запросов, мс (0 - без таймаута)
+    DB_STATEMENT_TIMEOUT_MS: int = 30 * 1000
+    DB_STATEMENT_TIMEOUT_READ_MS: int = 5 * 1000
+    DB_STATEMENT_TIMEOUT_REPORT_MS: int = 5 * 60 * 1000
     
     # JWT токены
     SECRET_KEY: str
@@ -46,6 +58,63 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
 
+    # Кэш авторизованных пользователей (роль, активность, права) по id, отдельный в каждом воркере
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    AUTH_PRINCIPAL_CACHE_MAX_ITEMS: int = 1024
+
+    # Кэш флагов api_enabled/docs_enabled для middleware и сброс кэшей между воркерами (LISTEN/NOTIFY)
+    APP_SETTINGS_CACHE_TTL_SECONDS: float = 5
+    CACHE_BUS_ENABLED: bool = True
+    CACHE_BUS_RECONNECT_SECONDS: float = 5
+
+    # Кэш вердиктов поста охраны (/api/gate/check), отдельный в каждом воркере
+    GATE_CHECK_CACHE_TTL_SECONDS: float = 5
+    GATE_CHECK_CACHE_MAX_ITEMS: int = 2048
+
+    # Общее количество в постраничных списках: кэш точных COUNT и порог оценки планировщика
+    COUNT_CACHE_TTL_SECONDS: float = 30
+    COUNT_CACHE_MAX_ITEMS: int = 512
+    COUNT_ESTIMATE_MIN_ROWS: int = 1000
+
+    # Сверка счётчиков /api/propusk/stats с таблицей propusk (0 - отключить)
+    PROPUSK_COUNTERS_RECONCILE_SECONDS: int = 15 * 60
+
+    # Пакетная печать пропусков (/api/propusk/pdf/batch)
+    PDF_BATCH_MAX_ITEMS: int = 50
+    PDF_BATCH_WORKERS: int = 0  # 0 - по числу CPU
+    PDF_BATCH_PARALLEL_THRESHOLD: int = 200  # с какого размера пакета рисовать в пуле процессов
+    PDF_BATCH_CHUNK_SIZE: int = 100  # пропусков на одну часть (округляется до целых листов)
+
+    # Кэш готовых PDF одиночных пропусков (/api/propusk/{id}/pdf)
+    PDF_CACHE_MAX_ITEMS: int = 256  # в памяти каждого воркера, 0 - отключить
+    PDF_CACHE_TTL_SECONDS: float = 60 * 60
+    PDF_CACHE_DIR: str = ""  # каталог для дискового уровня (относительно backend/), пусто - только память
+    PDF_CACHE_DISK_MAX_FILES: int = 5000
+
+    # Большие PDF (пакеты и отчёты): сжатие страниц и порог, после которого файл уходит на диск
+    PDF_PAGE_COMPRESSION: bool = True
+    PDF_SPOOL_MAX_MEMORY_BYTES: int = 4 * 1024 * 1024
+
+    # Отчёт по всем организациям: сколько строк читать из БД за раз
+    REPORT_FETCH_BATCH_SIZE: int = 1000
+
+    # Архивация временных пропусков: порция на одну транзакцию и плановый перенос закрытых месяцев
+    TEMP_PASS_ARCHIVE_BATCH_SIZE: int = 1000
+    TEMP_PASS_AUTO_ARCHIVE_SECONDS: int = 0  # 0 - только вручную (/api/temporary-pass/archive/month)
+    TEMP_PASS_AUTO_ARCHIVE_KEEP_MONTHS: int = 1  # сколько закрытых месяцев оставлять в рабочей таблице
+
+    # Массовая архивация отозванных пропусков (/api/propusk/archive/bulk): порция на одну транзакцию
+    PROPUSK_ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Фоновые задания печати (/api/jobs)
+    JOBS_WORKERS: int = 2  # потоков-исполнителей в каждом процессе, 0 - не запускать
+    JOBS_SPOOL_DIR: str = "spool"  # каталог готовых файлов (относительно backend/)
+    JOBS_RESULT_TTL_SECONDS: int = 24 * 60 * 60
+    JOBS_STALE_SECONDS: int = 5 * 60  # задание без отметки воркера дольше этого срока считается прерванным
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_POLL_SECONDS: float = 2
+    JOBS_MAINTENANCE_SECONDS: int = 5 * 60
+
     # Timezone (e.g. "Europe/Moscow"). If not set, use system local timezone.
     TIMEZONE: str | None = None
     TZ: str | None = None
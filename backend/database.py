@@ -1,8 +1,19 @@
 ﻿"""
 Конфигурация подключения к базе данных PostgreSQL
 """
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Optional
+import time
+
+from fastapi import Depends, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from config import settings
 
@@ -10,30 +21,290 @@ from config import settings
 # Измени эти параметры под свою БД
 DATABASE_URL = settings.DATABASE_URL
 
+
+class PoolStats:
+    """Счётчики выдачи соединений из пула: сколько раз, сколько ждали, сколько раз не дождались"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class ConnectionGauge:
+    """Соединения, выданные сейчас sync и async пулами процесса, и максимум одновременно выданных"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.current = 0
+        self.peak = 0
+
+    def acquired(self) -> None:
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def released(self) -> None:
+        with self._lock:
+            self.current -= 1
+
+    def reset_peak(self) -> None:
+        with self._lock:
+            self.peak = self.current
+
+
+connections_in_use = ConnectionGauge()
+
+
+class _MeteredPool:
+    """Замер ожидания соединения: _do_get вызывается, когда сессии нужно соединение"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        connections_in_use.acquired()
+        return conn
+
+    def _do_return_conn(self, record):
+        connections_in_use.released()
+        super()._do_return_conn(record)
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncPool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options() -> dict:
+    """
+    Параметры пула из config.py, общие для sync и async движков.
+    Каждый воркер uvicorn/gunicorn держит оба пула.
+    """
+    options = {
+        "echo": settings.DEBUG,  # Показывать SQL запросы в консоли (для отладки)
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        # Проверка соединения перед выдачей - лишний запрос на каждый checkout
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
+
 # Создание движка БД
 engine = create_engine(
     DATABASE_URL,
-    echo=settings.DEBUG,  # Показывать SQL запросы в консоли (для отладки)
-    pool_pre_ping=True  # Проверка соединения перед использованием
+    poolclass=MeteredQueuePool,
+    **_engine_options()
 )
 
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для эндпоинтов на async def (тот же драйвер psycopg).
+# Сервисный код синхронный и вызывается через AsyncSession.run_sync().
+# Под Windows psycopg async работает только с SelectorEventLoop
+# (uvicorn --reload его и использует).
+async_engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=MeteredAsyncPool,
+    **_engine_options()
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Таймаут запросов для текущего запроса/задания (None - таймаут соединения по умолчанию)
+_statement_timeout_ms: ContextVar[Optional[int]] = ContextVar("statement_timeout_ms", default=None)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    timeout_ms = _statement_timeout_ms.get()
+    if timeout_ms is not None and timeout_ms != settings.DB_STATEMENT_TIMEOUT_MS:
+        # SET LOCAL действует до конца транзакции и не переходит к следующему владельцу соединения
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+@contextmanager
+def statement_timeout(timeout_ms: int):
+    """Таймаут запросов для кода вне эндпоинтов (фоновые задания)"""
+    token = _statement_timeout_ms.set(timeout_ms)
+    try:
+        yield
+    finally:
+        _statement_timeout_ms.reset(token)
+
+
+def with_statement_timeout(timeout_ms: int):
+    """
+    Dependency для класса маршрутов: Depends(read_timeout) в dependencies=[...].
+    Async, чтобы значение попало в контекст обработчика (и sync, и async).
+    """
+    async def apply_timeout() -> None:
+        _statement_timeout_ms.set(timeout_ms)
+    return apply_timeout
+
+
+# Частые чтения (списки, пост охраны) и тяжёлые отчёты/PDF
+read_timeout = with_statement_timeout(settings.DB_STATEMENT_TIMEOUT_READ_MS)
+report_timeout = with_statement_timeout(settings.DB_STATEMENT_TIMEOUT_REPORT_MS)
+
+
+def pool_status() -> dict:
+    """Состояние пулов этого воркера и счётчики ожидания соединений"""
+    result = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        result[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **pool.stats.snapshot(),
+        }
+    return result
+
 # Базовый класс для моделей
 Base = declarative_base()
 
-# Функция для получения сессии БД
-def get_db():
+class RequestDB:
     """
-    Генератор сессии базы данных
-    Используется в FastAPI для dependency injection
+    Сессии одного HTTP-запроса, общие для middleware, проверки прав и обработчика.
+    Создаются при первом обращении (соединение - при первом запросе к БД),
+    закрываются один раз в конце запроса (close).
     """
-    db = SessionLocal()
+
+    def __init__(self):
+        self._session: Optional[Session] = None
+        self._async_session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = SessionLocal()
+        return self._session
+
+    @property
+    def async_session(self) -> AsyncSession:
+        if self._async_session is None:
+            self._async_session = AsyncSessionLocal()
+        return self._async_session
+
+    async def run_sync(self, fn: Callable, *args, **kwargs):
+        """
+        fn(session, ...) в уже открытой сессии запроса, чтобы не брать второе соединение:
+        для sync-обработчика - в его Session (в пуле потоков), иначе через AsyncSession
+        """
+        if self._session is not None:
+            return await run_in_threadpool(fn, self._session, *args, **kwargs)
+        return await self.async_session.run_sync(fn, *args, **kwargs)
+
+    async def run_sync_released(self, fn: Callable, *args, **kwargs):
+        """
+        Как run_sync, но транзакция сразу завершается и соединение возвращается в пул.
+        Для middleware: до обработчика неизвестно, какая сессия ему нужна, и соединение
+        не должно простаивать в транзакции, пока sync-обработчик берёт своё.
+        """
+        if self._session is not None:
+            def call():
+                try:
+                    result = fn(self._session, *args, **kwargs)
+                    self._session.commit()
+                    return result
+                except Exception:
+                    self._session.rollback()
+                    raise
+            return await run_in_threadpool(call)
+        session = self.async_session
+        try:
+            result = await session.run_sync(fn, *args, **kwargs)
+            await session.commit()
+            return result
+        except Exception:
+            await session.rollback()
+            raise
+
+    async def close(self) -> None:
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+        if self._session is not None:
+            await run_in_threadpool(self._session.close)
+            self._session = None
+
+
+async def get_request_db(request: Request):
+    """
+    Сессии текущего запроса: создаёт их middleware в main.py (request.state.db);
+    без него - на время одного вызова зависимостей
+    """
+    request_db = getattr(request.state, "db", None)
+    if request_db is not None:
+        yield request_db
+        return
+    request_db = RequestDB()
     try:
-        yield db
+        yield request_db
     finally:
-        db.close()
+        await request_db.close()
+
+
+# Функция для получения сессии БД
+async def get_db(request_db: RequestDB = Depends(get_request_db)) -> Session:
+    """
+    Сессия базы данных текущего запроса
+    Используется в FastAPI для dependency injection
+    """
+    return request_db.session
+
+async def get_async_db(request_db: RequestDB = Depends(get_request_db)) -> AsyncSession:
+    """
+    То же, что get_db, для async-эндпоинтов: соединение берётся из пула
+    только при первом запросе к БД
+    """
+    return request_db.async_session
 
 # Функция для проверки подключения
 def check_connection():
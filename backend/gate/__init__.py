@@ -0,0 +1,3 @@
+"""
+Gate check package.
+"""
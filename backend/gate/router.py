@@ -0,0 +1,27 @@
+"""
+API endpoints for gate check.
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db, read_timeout
+from models import User
+from auth.dependencies import require_view
+from gate.schemas import GateCheckResponse
+from gate.service import GateService
+
+
+router = APIRouter(prefix="/api/gate", tags=["Пост охраны"])
+
+
+@router.get("/check", response_model=GateCheckResponse, dependencies=[Depends(read_timeout)])
+async def check_plate(
+    plate: str = Query(..., min_length=1, max_length=20, description="Гос. номер"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_view),
+):
+    """
+    Можно ли пропустить машину сейчас: активный постоянный пропуск
+    или действующий временный пропуск, одним запросом.
+    """
+    return await db.run_sync(GateService.check_plate, plate)
@@ -0,0 +1,19 @@
+"""
+Schemas for gate check.
+"""
+from pydantic import BaseModel
+from typing import Optional, Union
+from datetime import date, datetime
+
+
+class GateCheckResponse(BaseModel):
+    allowed: bool
+    plate: str
+    pass_kind: Optional[str] = None  # "propusk" | "temporary"
+    pass_id: Optional[int] = None
+    gos_id: Optional[str] = None
+    id_org: Optional[int] = None
+    org_name: Optional[str] = None
+    valid_until: Optional[Union[datetime, date]] = None
+    on_territory: Optional[bool] = None
+    cached: bool = False
@@ -0,0 +1,147 @@
+"""
+Service for gate check: one query over permanent and temporary passes.
+"""
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, union_all, literal, cast, null, and_, Date, DateTime, Boolean
+
+import cache_bus
+from cache import TTLCache
+from config import settings
+from models import Propusk, PropuskStatus, TemporaryPass, Organiz, normalize_plate
+
+
+_verdicts = TTLCache(
+    maxsize=settings.GATE_CHECK_CACHE_MAX_ITEMS,
+    ttl=settings.GATE_CHECK_CACHE_TTL_SECONDS,
+)
+_TOPIC = "gate"
+
+
+class GateService:
+    @staticmethod
+    def _now() -> datetime:
+        if settings.TIMEZONE:
+            return datetime.now(ZoneInfo(settings.TIMEZONE))
+        return datetime.now().astimezone()
+
+    @staticmethod
+    def _build_query(plate_norm: str, now: datetime):
+        permanent = select(
+            literal(0).label("priority"),
+            literal("propusk").label("pass_kind"),
+            Propusk.id_propusk.label("pass_id"),
+            Propusk.gos_id.label("gos_id"),
+            Propusk.id_org.label("id_org"),
+            Propusk.valid_until.label("valid_date"),
+            cast(null(), DateTime(timezone=True)).label("valid_ts"),
+            cast(null(), Boolean).label("on_territory"),
+        ).where(
+            Propusk.gos_id_norm == plate_norm,
+            Propusk.status == PropuskStatus.ACTIVE,
+            Propusk.valid_until >= now.date(),
+        )
+
+        temporary = select(
+            literal(1).label("priority"),
+            literal("temporary").label("pass_kind"),
+            TemporaryPass.id.label("pass_id"),
+            TemporaryPass.gos_id.label("gos_id"),
+            TemporaryPass.id_org.label("id_org"),
+            cast(null(), Date).label("valid_date"),
+            TemporaryPass.valid_until.label("valid_ts"),
+            and_(
+                TemporaryPass.entered_at.is_not(None),
+                TemporaryPass.exited_at.is_(None),
+            ).label("on_territory"),
+        ).where(
+            TemporaryPass.gos_id_norm == plate_norm,
+            TemporaryPass.active_at(now),
+        )
+
+        passes = union_all(permanent, temporary).subquery("passes")
+        return (
+            select(passes, Organiz.org_name)
+            .select_from(passes)
+            .outerjoin(Organiz, Organiz.id_org == passes.c.id_org)
+            .order_by(passes.c.priority, passes.c.pass_id.desc())
+            .limit(1)
+        )
+
+    @staticmethod
+    def check_plate(db: Session, plate: str) -> dict:
+        """
+        Вердикт для поста охраны: пускать ли машину с этим номером прямо сейчас.
+        Постоянные пропуска имеют приоритет над временными.
+        """
+        plate_norm = normalize_plate(plate)
+        if not plate_norm:
+            return {"allowed": False, "plate": ""}
+
+        cached = _verdicts.get(plate_norm)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        now = GateService._now()
+        row = db.execute(GateService._build_query(plate_norm, now)).first()
+        if row is None:
+            verdict = {"allowed": False, "plate": plate_norm}
+        else:
+            data = row._mapping
+            verdict = {
+                "allowed": True,
+                "plate": plate_norm,
+                "pass_kind": data["pass_kind"],
+                "pass_id": data["pass_id"],
+                "gos_id": data["gos_id"],
+                "id_org": data["id_org"],
+                "org_name": data["org_name"],
+                "valid_until": data["valid_ts"] or data["valid_date"],
+                "on_territory": data["on_territory"],
+            }
+
+        if verdict["allowed"]:
+            # Без cache_bus отзыв в другом воркере не сбросит разрешение из этого кэша
+            if not cache_bus.is_live():
+                return verdict
+            valid_until = verdict["valid_until"]
+            if not isinstance(valid_until, datetime):
+                # Постоянный пропуск действует по valid_until включительно
+                valid_until = datetime.combine(valid_until + timedelta(days=1), dt_time(), tzinfo=now.tzinfo)
+            # Не держим в кэше разрешение дольше, чем действует пропуск
+            ttl = min(_verdicts.ttl, max((valid_until - now).total_seconds(), 0))
+            _verdicts.set(plate_norm, verdict, ttl=ttl)
+        else:
+            _verdicts.set(plate_norm, verdict)
+        return verdict
+
+    @staticmethod
+    def invalidate(db: Session, gos_id: Optional[str] = None) -> None:
+        """
+        Сброс кэша вердиктов; вызывается до коммита изменений пропусков.
+        Этот воркер сбрасывает запись сразу, остальные - после коммита через cache_bus.
+        Без номера очищается весь кэш.
+        """
+        plate_norm = normalize_plate(gos_id) if gos_id is not None else ""
+        if gos_id is not None and not plate_norm:
+            return
+        _on_gate_changed(plate_norm)
+        cache_bus.publish(db, _TOPIC, plate_norm)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Сброс кэша вердиктов только в этом процессе (для замеров)"""
+        _verdicts.clear()
+
+
+def _on_gate_changed(payload: str) -> None:
+    if payload:
+        _verdicts.pop(payload)
+    else:
+        _verdicts.clear()
+
+
+cache_bus.subscribe(_TOPIC, _on_gate_changed)
@@ -66,6 +66,7 @@ def show_tables_info():
         ("propusk", "Пропуска (активные)"),
         ("propusk_archive", "Архив отозванных пропусков"),
         ("propusk_history", "История изменений пропусков"),
+        ("propusk_history_archive", "История архивных пропусков"),
         ("tg_sessions", "Telegram сессии"),
         ("temporary_pass", "Временные пропуска"),
         ("temporary_pass_template", "Шаблон PDF временного пропуска"),
@@ -0,0 +1,104 @@
+"""
+Виды фоновых заданий печати: проверка параметров, права и сборка файла.
+"""
+from typing import BinaryIO, Callable
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from propusk.reports import validate_batch_ids, build_batch_pdf, build_all_orgs_report
+from temporary_pass.reports import build_archive_month_report
+
+
+class JobKind:
+    def __init__(
+        self,
+        name: str,
+        title: str,
+        permissions: tuple,
+        normalize: Callable[[dict], dict],
+        build: Callable[..., tuple[BinaryIO, str]],
+    ):
+        self.name = name
+        self.title = title
+        # Достаточно любого из перечисленных прав
+        self.permissions = permissions
+        self.normalize = normalize
+        self.build = build
+
+    def allowed(self, user_permissions: dict) -> bool:
+        return any(user_permissions.get(key, False) for key in self.permissions)
+
+
+def _bad_params(detail: str):
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _normalize_batch(params: dict) -> dict:
+    ids = params.get("propusk_ids")
+    if not isinstance(ids, list) or not all(isinstance(pid, int) for pid in ids):
+        raise _bad_params("propusk_ids должен быть списком id пропусков")
+    validate_batch_ids(ids)
+    return {"propusk_ids": ids}
+
+
+def _build_batch(db: Session, params: dict, progress) -> tuple[BinaryIO, str]:
+    return build_batch_pdf(db, params["propusk_ids"], progress=progress)
+
+
+def _normalize_none(params: dict) -> dict:
+    return {}
+
+
+def _build_orgs_report(db: Session, params: dict, progress) -> tuple[BinaryIO, str]:
+    return build_all_orgs_report(db, progress=progress)
+
+
+def _normalize_month(params: dict) -> dict:
+    try:
+        year = int(params.get("year"))
+        month = int(params.get("month"))
+    except (TypeError, ValueError):
+        raise _bad_params("Нужны year и month")
+    if not (2000 <= year <= 2100 and 1 <= month <= 12):
+        raise _bad_params("Некорректный месяц")
+    return {"year": year, "month": month}
+
+
+def _build_temp_archive_month(db: Session, params: dict, progress) -> tuple[BinaryIO, str]:
+    return build_archive_month_report(db, params["year"], params["month"], progress=progress)
+
+
+JOB_KINDS = {
+    kind.name: kind
+    for kind in [
+        JobKind(
+            name="propusk_batch_pdf",
+            title="Пакетная печать пропусков",
+            permissions=("download_pdf",),
+            normalize=_normalize_batch,
+            build=_build_batch,
+        ),
+        JobKind(
+            name="propusk_orgs_report",
+            title="Отчёт по всем организациям",
+            permissions=("menu_reports", "download_pdf"),
+            normalize=_normalize_none,
+            build=_build_orgs_report,
+        ),
+        JobKind(
+            name="temp_pass_archive_month_report",
+            title="Отчёт по архиву временных пропусков за месяц",
+            permissions=("temp_download",),
+            normalize=_normalize_month,
+            build=_build_temp_archive_month,
+        ),
+    ]
+}
+
+
+def get_kind_or_400(name: str) -> JobKind:
+    kind = JOB_KINDS.get(name)
+    if not kind:
+        raise _bad_params(f"Неизвестный вид задания: {name}")
+    return kind
@@ -0,0 +1,83 @@
+"""
+API endpoints for background print jobs.
+"""
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import User, PrintJob
+from auth.dependencies import require_auth, get_user_permissions
+from jobs.kinds import get_kind_or_400
+from jobs.schemas import JobCreate, JobResponse
+from jobs.service import JobService
+from jobs.worker import wake_workers
+
+
+router = APIRouter(prefix="/api/jobs", tags=["Задания печати"])
+
+
+def _check_access(user: User, kind_name: str) -> None:
+    kind = get_kind_or_400(kind_name)
+    if not kind.allowed(get_user_permissions(user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для выполнения операции",
+        )
+
+
+def _to_response(job: PrintJob) -> JobResponse:
+    response = JobResponse.model_validate(job)
+    if job.status == "done":
+        response.download_url = f"{router.prefix}/{job.id}/file"
+    return response
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_job(
+    payload: JobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_auth),
+):
+    """
+    Поставить отчёт или пакетную печать в очередь.
+    Одинаковое задание, которое уже ждёт или выполняется, не дублируется.
+    """
+    _check_access(current_user, payload.kind)
+    job = JobService.submit(db, get_kind_or_400(payload.kind), payload.params, current_user.id)
+    wake_workers()
+    return _to_response(job)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_auth),
+):
+    job = JobService.get_job_or_404(db, job_id)
+    _check_access(current_user, job.kind)
+    return _to_response(job)
+
+
+@router.get("/{job_id}/file")
+def download_job_file(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_auth),
+):
+    job = JobService.get_job_or_404(db, job_id)
+    _check_access(current_user, job.kind)
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Файл ещё не готов",
+        )
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Файл задания удалён",
+        )
+    return FileResponse(job.file_path, media_type="application/pdf", filename=job.filename)
@@ -0,0 +1,29 @@
+"""
+Schemas for background print jobs.
+"""
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class JobCreate(BaseModel):
+    kind: str = Field(..., description="propusk_batch_pdf, propusk_orgs_report, temp_pass_archive_month_report")
+    params: dict = Field(default_factory=dict)
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: int
+    message: Optional[str] = None
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,245 @@
+"""
+Service for background print jobs: queue in table print_job, results in the spool directory.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional, Tuple
+import hashlib
+import json
+import os
+import uuid
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import PrintJob
+from pdf_output import copy_to
+from jobs.kinds import JobKind
+
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def spool_dir() -> str:
+    path = settings.JOBS_SPOOL_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class JobService:
+    @staticmethod
+    def _utcnow() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def _dedup_key(kind: str, params: dict) -> str:
+        raw = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _find_active(db: Session, dedup_key: str) -> Optional[PrintJob]:
+        return (
+            db.query(PrintJob)
+            .filter(PrintJob.dedup_key == dedup_key, PrintJob.status.in_(ACTIVE_STATUSES))
+            .first()
+        )
+
+    @staticmethod
+    def submit(db: Session, kind: JobKind, params: dict, created_by: int) -> PrintJob:
+        """
+        Ставит задание в очередь. Если такое же задание (вид + параметры)
+        уже ждёт или выполняется, возвращается оно.
+        """
+        params = kind.normalize(params or {})
+        dedup_key = JobService._dedup_key(kind.name, params)
+        existing = JobService._find_active(db, dedup_key)
+        if existing:
+            return existing
+
+        job = PrintJob(
+            id=uuid.uuid4().hex,
+            kind=kind.name,
+            params=json.dumps(params),
+            dedup_key=dedup_key,
+            status="queued",
+            progress=0,
+            attempts=0,
+            created_by=created_by,
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Параллельный запрос успел поставить такое же задание (ux_print_job_dedup_active)
+            db.rollback()
+            existing = JobService._find_active(db, dedup_key)
+            if existing:
+                return existing
+            raise
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get_job_or_404(db: Session, job_id: str) -> PrintJob:
+        job = db.query(PrintJob).filter(PrintJob.id == job_id).first()
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Задание не найдено",
+            )
+        return job
+
+    @staticmethod
+    def claim_next() -> Optional[Tuple[str, int]]:
+        """
+        Забирает самое старое задание из очереди; SKIP LOCKED не даёт двум воркерам взять одно.
+        Возвращает (id, номер попытки): дальнейшие записи воркера действуют только для этой попытки.
+        """
+        with engine.begin() as conn:
+            row = conn.execute(text("""
+                UPDATE print_job
+                SET status = 'running',
+                    started_at = now(),
+                    heartbeat_at = now(),
+                    attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM print_job
+                    WHERE status = 'queued'
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, attempts
+            """)).first()
+        return (row.id, row.attempts) if row else None
+
+    @staticmethod
+    def set_progress(job_id: str, attempt: int, progress: int) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE print_job
+                    SET progress = :progress, heartbeat_at = now()
+                    WHERE id = :id AND status = 'running' AND attempts = :attempt
+                """),
+                {"id": job_id, "attempt": attempt, "progress": max(0, min(int(progress), 99))},
+            )
+
+    @staticmethod
+    def _finish(job_id: str, attempt: int, values: dict) -> bool:
+        """
+        Записывает результат попытки. False, если задание уже не выполняется этой попыткой
+        (requeue_stale вернул его в очередь, и его взял другой воркер, или признал ошибкой).
+        """
+        values = {
+            **values,
+            "id": job_id,
+            "attempt": attempt,
+            "expires_at": JobService._utcnow() + timedelta(seconds=settings.JOBS_RESULT_TTL_SECONDS),
+        }
+        with engine.begin() as conn:
+            result = conn.execute(
+                text("""
+                    UPDATE print_job
+                    SET status = :status,
+                        progress = :progress,
+                        message = :message,
+                        file_path = :file_path,
+                        filename = :filename,
+                        size = :size,
+                        finished_at = now(),
+                        heartbeat_at = now(),
+                        expires_at = :expires_at
+                    WHERE id = :id AND status = 'running' AND attempts = :attempt
+                """),
+                values,
+            )
+        return bool(result.rowcount)
+
+    @staticmethod
+    def complete(job_id: str, attempt: int, content: BinaryIO, filename: str) -> None:
+        # Файл своей попытки: опоздавший воркер не перезапишет результат следующей
+        path = os.path.join(spool_dir(), f"{job_id}-{attempt}.pdf")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            size = copy_to(content, fh)
+        os.replace(tmp_path, path)
+        finished = JobService._finish(job_id, attempt, {
+            "status": "done",
+            "progress": 100,
+            "message": None,
+            "file_path": path,
+            "filename": filename,
+            "size": size,
+        })
+        if not finished:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def fail(job_id: str, attempt: int, message: str) -> None:
+        JobService._finish(job_id, attempt, {
+            "status": "failed",
+            "progress": 0,
+            "message": message,
+            "file_path": None,
+            "filename": None,
+            "size": None,
+        })
+
+    @staticmethod
+    def requeue_stale() -> int:
+        """
+        Задания, чей воркер перестал отмечаться (процесс перезапущен или упал),
+        возвращаются в очередь; после JOBS_MAX_ATTEMPTS попыток считаются ошибкой.
+        """
+        with engine.begin() as conn:
+            stale = {"seconds": settings.JOBS_STALE_SECONDS, "max_attempts": settings.JOBS_MAX_ATTEMPTS}
+            conn.execute(
+                text("""
+                    UPDATE print_job
+                    SET status = 'failed',
+                        message = 'Задание прервано',
+                        finished_at = now(),
+                        expires_at = now() + make_interval(secs => :ttl)
+                    WHERE status = 'running'
+                      AND heartbeat_at < now() - make_interval(secs => :seconds)
+                      AND attempts >= :max_attempts
+                """),
+                {**stale, "ttl": settings.JOBS_RESULT_TTL_SECONDS},
+            )
+            result = conn.execute(
+                text("""
+                    UPDATE print_job
+                    SET status = 'queued', progress = 0
+                    WHERE status = 'running'
+                      AND heartbeat_at < now() - make_interval(secs => :seconds)
+                      AND attempts < :max_attempts
+                """),
+                stale,
+            )
+            return result.rowcount or 0
+
+    @staticmethod
+    def delete_expired() -> int:
+        """Удаляет просроченные результаты вместе с файлами"""
+        with engine.begin() as conn:
+            rows = conn.execute(text("""
+                DELETE FROM print_job
+                WHERE status IN ('done', 'failed') AND expires_at < now()
+                RETURNING file_path
+            """)).fetchall()
+        for (path,) in rows:
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return len(rows)
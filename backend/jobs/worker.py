@@ -0,0 +1,143 @@
+"""
+Worker threads for background print jobs (started from lifespan in main.py).
+"""
+from threading import Event, Thread
+from typing import List
+import traceback
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from config import settings
+from database import SessionLocal, engine, statement_timeout
+from jobs.kinds import JOB_KINDS
+from jobs.service import JobService
+from models import PrintJob
+
+
+_threads: List[Thread] = []
+_stop = Event()
+_wake = Event()
+
+
+class _Heartbeat:
+    """Пока задание выполняется, раз в несколько секунд отмечает, что воркер жив"""
+
+    def __init__(self, job_id: str, attempt: int):
+        self.job_id = job_id
+        self.attempt = attempt
+        self._done = Event()
+        self._thread = Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        interval = max(settings.JOBS_STALE_SECONDS / 3, 1)
+        while not self._done.wait(interval):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("""
+                            UPDATE print_job SET heartbeat_at = now()
+                            WHERE id = :id AND status = 'running' AND attempts = :attempt
+                        """),
+                        {"id": self.job_id, "attempt": self.attempt},
+                    )
+            except Exception:
+                traceback.print_exc()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join(timeout=5)
+        return False
+
+
+def _progress_callback(job_id: str, attempt: int):
+    last = {"value": -1}
+
+    def report(value: int) -> None:
+        # Не пишем в БД на каждый мелкий шаг
+        if value - last["value"] >= 5:
+            last["value"] = value
+            JobService.set_progress(job_id, attempt, value)
+
+    return report
+
+
+def run_job(job_id: str, attempt: int) -> None:
+    db = SessionLocal()
+    try:
+        job = db.query(PrintJob).filter(PrintJob.id == job_id).first()
+        if not job:
+            return
+        kind = JOB_KINDS.get(job.kind)
+        if not kind:
+            JobService.fail(job_id, attempt, f"Неизвестный вид задания: {job.kind}")
+            return
+        params = job.params_json
+        db.rollback()
+
+        with _Heartbeat(job_id, attempt), statement_timeout(settings.DB_STATEMENT_TIMEOUT_REPORT_MS):
+            buffer, filename = kind.build(db, params, _progress_callback(job_id, attempt))
+        try:
+            JobService.complete(job_id, attempt, buffer, filename)
+        finally:
+            buffer.close()
+    except HTTPException as exc:
+        db.rollback()
+        JobService.fail(job_id, attempt, str(exc.detail))
+    except Exception as exc:
+        db.rollback()
+        traceback.print_exc()
+        JobService.fail(job_id, attempt, f"Ошибка формирования файла: {exc}")
+    finally:
+        db.close()
+
+
+def _worker_loop() -> None:
+    while not _stop.is_set():
+        try:
+            claimed = JobService.claim_next()
+        except Exception:
+            traceback.print_exc()
+            claimed = None
+        if claimed:
+            run_job(*claimed)
+            continue
+        _wake.wait(settings.JOBS_POLL_SECONDS)
+        _wake.clear()
+
+
+def wake_workers() -> None:
+    """Будит воркеры этого процесса сразу после постановки задания"""
+    _wake.set()
+
+
+def maintenance() -> None:
+    """Периодически: вернуть зависшие задания в очередь и удалить просроченные файлы"""
+    requeued = JobService.requeue_stale()
+    expired = JobService.delete_expired()
+    if requeued:
+        print(f"⚠️  Возвращено в очередь прерванных заданий печати: {requeued}")
+    if requeued or expired:
+        wake_workers()
+
+
+def start_workers() -> None:
+    if settings.JOBS_WORKERS <= 0:
+        return
+    _stop.clear()
+    for index in range(settings.JOBS_WORKERS):
+        thread = Thread(target=_worker_loop, name=f"print-job-worker-{index}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_workers(timeout: float = 5) -> None:
+    _stop.set()
+    _wake.set()
+    for thread in _threads:
+        thread.join(timeout=timeout)
+    _threads.clear()
@@ -12,12 +12,18 @@ import hmac
 import hashlib
 
 from config import settings
-from database import check_connection, SessionLocal
+from database import check_connection, async_engine, RequestDB
+from scheduler import start_scheduler, stop_scheduler
+from cache_bus import start_listener as start_cache_bus, stop_listener as stop_cache_bus
+from propusk.pdf_batch import shutdown_pool as shutdown_pdf_pool
+from jobs.worker import start_workers as start_job_workers, stop_workers as stop_job_workers
 from auth.router import router as auth_router
 from references.router import router as references_router
 from settings.router import router as settings_router
-from settings.service import get_api_enabled, get_docs_enabled
+from settings.service import get_cached_flag, load_flag
 from temporary_pass.router import router as temporary_pass_router
+from gate.router import router as gate_router
+from jobs.router import router as jobs_router
 
 
 # Lifespan для инициализации при старте
@@ -37,11 +43,20 @@ async def lifespan(app: FastAPI):
     print(f"\n📚 API Документация: http://localhost:8000/docs")
     print(f"🌐 Веб-интерфейс: http://localhost:8000/")
     print("="*60 + "\n")
+
+    start_cache_bus()
+    start_scheduler()
+    start_job_workers()
     
     yield
     
     # Shutdown
     print("\n👋 Завершение работы приложения...")
+    stop_job_workers()
+    stop_scheduler()
+    stop_cache_bus()
+    shutdown_pdf_pool()
+    await async_engine.dispose()
 
 
 # Создание приложения
@@ -108,6 +123,15 @@ def _encode_last_active(timestamp: int) -> str:
     return f"{raw}.{_sign_value(raw)}"
 
 
+async def _flag_enabled(request: Request, key: str) -> bool:
+    # Обычно значение уже в кэше; иначе читаем в короткой транзакции, которая
+    # отдаёт соединение в пул до обработчика (он может работать в другой сессии)
+    value = get_cached_flag(key)
+    if value is None:
+        value = await request.state.db.run_sync_released(load_flag, key)
+    return value
+
+
 @app.middleware("http")
 async def csrf_protect(request: Request, call_next):
     access_cookie = request.cookies.get("access_token")
@@ -126,25 +150,17 @@ async def csrf_protect(request: Request, call_next):
             response.delete_cookie(key=settings.LAST_ACTIVE_COOKIE_NAME)
             return response
     if request.url.path in _DOCS_PATHS:
-        db = SessionLocal()
-        try:
-            if not get_docs_enabled(db):
-                return JSONResponse(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    content={"detail": "Not found"},
-                )
-        finally:
-            db.close()
+        if not await _flag_enabled(request, "docs_enabled"):
+            return JSONResponse(
+                status_code=status.HTTP_404_NOT_FOUND,
+                content={"detail": "Not found"},
+            )
     if request.url.path.startswith("/api") and request.url.path not in _API_TOGGLE_EXEMPT_PATHS:
-        db = SessionLocal()
-        try:
-            if not get_api_enabled(db):
-                return JSONResponse(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    content={"detail": "API disabled by administrator"},
-                )
-        finally:
-            db.close()
+        if not await _flag_enabled(request, "api_enabled"):
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "API disabled by administrator"},
+            )
     if request.method in _CSRF_METHODS:
         access_cookie = request.cookies.get("access_token")
         has_auth_header = request.headers.get("authorization")
@@ -169,11 +185,24 @@ async def csrf_protect(request: Request, call_next):
     return response
 
 
+# Сессии БД на запрос (database.RequestDB): объявлен после csrf_protect, значит
+# выполняется раньше него, и закрывает сессии после всех проверок и обработчика
+@app.middleware("http")
+async def request_db_session(request: Request, call_next):
+    request.state.db = RequestDB()
+    try:
+        return await call_next(request)
+    finally:
+        await request.state.db.close()
+
+
 # Подключение роутеров API
 app.include_router(auth_router)
 app.include_router(references_router)
 app.include_router(settings_router)
 app.include_router(temporary_pass_router)
+app.include_router(gate_router)
+app.include_router(jobs_router)
 
 # Импортируем роутер пропусков
 from propusk.router import router as propusk_router
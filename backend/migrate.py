@@ -18,6 +18,17 @@ from migrate_20260127_temp_pass_report_template import MIGRATION_ID as TEMP_REPO
 from migrate_20260128_free_mesto_limit import MIGRATION_ID as FREE_MESTO_LIMIT_ID, migrate as migrate_free_mesto_limit
 from migrate_20260128_temp_pass_entered_by import MIGRATION_ID as TEMP_PASS_ENTERED_BY_ID, migrate as migrate_temp_pass_entered_by
 from migrate_20260128_temp_pass_exited_by import MIGRATION_ID as TEMP_PASS_EXITED_BY_ID, migrate as migrate_temp_pass_exited_by
+from migrate_20261017_propusk_search_trgm import MIGRATION_ID as PROPUSK_SEARCH_TRGM_ID, migrate as migrate_propusk_search_trgm
+from migrate_20261017_plate_norm import MIGRATION_ID as PLATE_NORM_ID, migrate as migrate_plate_norm
+from migrate_20261017_keyset_indexes import MIGRATION_ID as KEYSET_INDEXES_ID, migrate as migrate_keyset_indexes
+from migrate_20261017_propusk_counters import MIGRATION_ID as PROPUSK_COUNTERS_ID, migrate as migrate_propusk_counters
+from migrate_20261017_print_jobs import MIGRATION_ID as PRINT_JOBS_ID, migrate as migrate_print_jobs
+from migrate_20261017_permission_mask import MIGRATION_ID as PERMISSION_MASK_ID, migrate as migrate_permission_mask
+from migrate_20261017_temp_pass_active import MIGRATION_ID as TEMP_PASS_ACTIVE_ID, migrate as migrate_temp_pass_active
+from migrate_20261017_temp_pass_date_indexes import MIGRATION_ID as TEMP_PASS_DATE_INDEXES_ID, migrate as migrate_temp_pass_date_indexes
+from migrate_20261017_temp_pass_archive_auto import MIGRATION_ID as TEMP_PASS_ARCHIVE_AUTO_ID, migrate as migrate_temp_pass_archive_auto
+from migrate_20261017_propusk_history_archive import MIGRATION_ID as PROPUSK_HISTORY_ARCHIVE_ID, migrate as migrate_propusk_history_archive
+from migrate_20261017_propusk_search_fk_indexes import MIGRATION_ID as PROPUSK_SEARCH_FK_INDEXES_ID, migrate as migrate_propusk_search_fk_indexes
 
 
 MIGRATIONS = [
@@ -29,6 +40,17 @@ MIGRATIONS = [
     (TEMP_PASS_ENTERED_BY_ID, migrate_temp_pass_entered_by),
     (TEMP_PASS_EXITED_BY_ID, migrate_temp_pass_exited_by),
     (FREE_MESTO_LIMIT_ID, migrate_free_mesto_limit),
+    (PROPUSK_SEARCH_TRGM_ID, migrate_propusk_search_trgm),
+    (PLATE_NORM_ID, migrate_plate_norm),
+    (KEYSET_INDEXES_ID, migrate_keyset_indexes),
+    (PROPUSK_COUNTERS_ID, migrate_propusk_counters),
+    (PRINT_JOBS_ID, migrate_print_jobs),
+    (PERMISSION_MASK_ID, migrate_permission_mask),
+    (TEMP_PASS_ACTIVE_ID, migrate_temp_pass_active),
+    (TEMP_PASS_DATE_INDEXES_ID, migrate_temp_pass_date_indexes),
+    (TEMP_PASS_ARCHIVE_AUTO_ID, migrate_temp_pass_archive_auto),
+    (PROPUSK_HISTORY_ARCHIVE_ID, migrate_propusk_history_archive),
+    (PROPUSK_SEARCH_FK_INDEXES_ID, migrate_propusk_search_fk_indexes),
 ]
 
 
@@ -0,0 +1,28 @@
+"""
+Migration: composite (created_at DESC, id DESC) indexes for keyset pagination.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_keyset_indexes"
+
+INDEXES = [
+    ("ix_propusk_created_at_id", "propusk", "created_at DESC, id_propusk DESC"),
+    ("ix_temporary_pass_created_at_id", "temporary_pass", "created_at DESC, id DESC"),
+    ("ix_temporary_pass_archive_created_at_id", "temporary_pass_archive", "created_at DESC, id DESC"),
+]
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        for name, table, columns in INDEXES:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    print("keyset pagination indexes migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,29 @@
+"""
+Migration: users.permission_mask, backfilled from role and extra_permissions.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+from auth.permissions import effective_mask
+from models import User
+
+MIGRATION_ID = "20261017_permission_mask"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS permission_mask BIGINT"))
+        rows = conn.execute(text("SELECT id, role::text, extra_permissions FROM users")).fetchall()
+        for user_id, role, raw in rows:
+            conn.execute(
+                text("UPDATE users SET permission_mask = :mask WHERE id = :id"),
+                {"id": user_id, "mask": effective_mask(role, User._parse_permissions(raw))},
+            )
+    print(f"permission mask migration applied ({len(rows)} users)")
+
+
+if __name__ == "__main__":
+    migrate()
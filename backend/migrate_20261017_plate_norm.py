@@ -0,0 +1,39 @@
+"""
+Migration: normalized plate key (gos_id_norm) for passes and archives.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+from models import PLATE_NORM_SQL
+
+MIGRATION_ID = "20261017_plate_norm"
+
+TABLES = [
+    "propusk",
+    "propusk_archive",
+    "temporary_pass",
+    "temporary_pass_archive",
+]
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    norm_expr = PLATE_NORM_SQL.format(column="gos_id")
+    with engine.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"""
+                ALTER TABLE {table}
+                    ADD COLUMN IF NOT EXISTS gos_id_norm VARCHAR(20);
+                UPDATE {table}
+                    SET gos_id_norm = {norm_expr}
+                    WHERE gos_id_norm IS NULL;
+                CREATE INDEX IF NOT EXISTS ix_{table}_gos_id_norm
+                    ON {table} (gos_id_norm varchar_pattern_ops);
+            """))
+    print("plate normalization migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
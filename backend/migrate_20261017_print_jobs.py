@@ -0,0 +1,48 @@
+"""
+Migration: print_job table for background print jobs.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_print_jobs"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    ddl = """
+    CREATE TABLE IF NOT EXISTS print_job (
+        id VARCHAR(32) PRIMARY KEY,
+        kind VARCHAR(50) NOT NULL,
+        params TEXT NOT NULL DEFAULT '{}',
+        dedup_key VARCHAR(64) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        progress INTEGER NOT NULL DEFAULT 0,
+        message TEXT,
+        file_path VARCHAR(500),
+        filename VARCHAR(255),
+        size BIGINT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_by INTEGER NOT NULL REFERENCES users(id),
+        created_at TIMESTAMPTZ DEFAULT now(),
+        started_at TIMESTAMPTZ,
+        heartbeat_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        expires_at TIMESTAMPTZ
+    );
+    CREATE INDEX IF NOT EXISTS ix_print_job_dedup_key ON print_job (dedup_key);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_print_job_dedup_active
+        ON print_job (dedup_key) WHERE status IN ('queued', 'running');
+    CREATE INDEX IF NOT EXISTS ix_print_job_status_created ON print_job (status, created_at);
+    """
+
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+
+    print("print_job migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
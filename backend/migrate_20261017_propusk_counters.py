@@ -0,0 +1,38 @@
+"""
+Migration: propusk_counter table with per-status counters, filled from propusk.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection, SessionLocal
+
+MIGRATION_ID = "20261017_propusk_counters"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    ddl = """
+    CREATE TABLE IF NOT EXISTS propusk_counter (
+        scope VARCHAR(10) NOT NULL,
+        scope_id INTEGER NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, scope_id, status)
+    );
+    """
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+
+    from propusk import counters
+
+    db = SessionLocal()
+    try:
+        counters.reconcile(db)
+    finally:
+        db.close()
+    print("propusk counters migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
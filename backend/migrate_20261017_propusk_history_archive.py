@@ -0,0 +1,38 @@
+"""
+Migration: archive-side table for propusk history - archiving a pass moves its
+history rows here instead of deleting them together with the pass.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_propusk_history_archive"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS propusk_history_archive (
+                id INTEGER PRIMARY KEY,
+                id_propusk INTEGER NOT NULL,
+                action VARCHAR(50) NOT NULL,
+                changed_by INTEGER NOT NULL REFERENCES users(id),
+                old_values TEXT,
+                new_values TEXT,
+                comment TEXT,
+                timestamp TIMESTAMPTZ,
+                archived_at TIMESTAMPTZ DEFAULT now()
+            );
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_propusk_history_archive_id_propusk
+                ON propusk_history_archive (id_propusk);
+        """))
+    print("propusk history archive migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,26 @@
+"""
+Migration: btree indexes on propusk.id_org and propusk.id_fio - the organization
+and owner branches of the propusk search UNION look passes up by these columns.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_propusk_search_fk_indexes"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    ddl = """
+    CREATE INDEX IF NOT EXISTS ix_propusk_id_org ON propusk (id_org);
+    CREATE INDEX IF NOT EXISTS ix_propusk_id_fio ON propusk (id_fio);
+    """
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    print("propusk search fk indexes migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+"""
+Migration: pg_trgm GIN indexes for propusk search (gos_id, org_name, abonent FIO).
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_propusk_search_trgm"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    ddl = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS ix_propusk_gos_id_trgm
+        ON propusk USING gin (gos_id gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_organiz_org_name_trgm
+        ON organiz USING gin (org_name gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_abonent_surname_trgm
+        ON abonent USING gin (surname gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_abonent_name_trgm
+        ON abonent USING gin (name gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_abonent_otchestvo_trgm
+        ON abonent USING gin (otchestvo gin_trgm_ops);
+    """
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    print("propusk search trigram indexes migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,58 @@
+"""
+Migration: validity range column and "one active pass per plate" exclusion
+constraint for temporary passes (its partial GiST index also serves the
+duplicate check and the "active now" listings).
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_temp_pass_active"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE EXTENSION IF NOT EXISTS btree_gist;
+            ALTER TABLE temporary_pass
+                ADD COLUMN IF NOT EXISTS valid_range tstzrange
+                GENERATED ALWAYS AS (tstzrange(valid_from, valid_until)) STORED;
+        """))
+        conflicts = conn.execute(text("""
+            SELECT a.id, b.id, a.gos_id
+            FROM temporary_pass a
+            JOIN temporary_pass b
+                ON b.gos_id_norm = a.gos_id_norm
+                AND b.id > a.id
+                AND b.valid_range && a.valid_range
+            WHERE a.revoked_at IS NULL AND b.revoked_at IS NULL
+            ORDER BY a.id
+        """)).fetchall()
+        if conflicts:
+            pairs = ", ".join(f"{row[0]}/{row[1]} ({row[2]})" for row in conflicts[:20])
+            raise SystemExit(
+                "Есть неотозванные временные пропуска с пересекающимся сроком на один номер: "
+                f"{pairs}. Отзовите лишние и повторите миграцию."
+            )
+        conn.execute(text("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = 'ex_temporary_pass_active_plate'
+                ) THEN
+                    ALTER TABLE temporary_pass
+                        ADD CONSTRAINT ex_temporary_pass_active_plate
+                        EXCLUDE USING gist (gos_id_norm WITH =, valid_range WITH &&)
+                        INCLUDE (id, entered_at, exited_at)
+                        WHERE (revoked_at IS NULL);
+                END IF;
+            END $$;
+        """))
+    print("temporary pass active plate constraint migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
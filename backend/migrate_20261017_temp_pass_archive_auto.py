@@ -0,0 +1,25 @@
+"""
+Migration: allow automatic (scheduled) archiving of temporary passes -
+archived_by is empty when no user started the run.
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_temp_pass_archive_auto"
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            ALTER TABLE temporary_pass_archive
+                ALTER COLUMN archived_by DROP NOT NULL;
+        """))
+    print("temporary pass archive auto migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
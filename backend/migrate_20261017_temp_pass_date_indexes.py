@@ -0,0 +1,30 @@
+"""
+Migration: indexes for date filters of temporary pass listings
+(valid_from/valid_until compared as timestamps, not through date()).
+"""
+from sqlalchemy import text
+
+from database import engine, check_connection
+
+MIGRATION_ID = "20261017_temp_pass_date_indexes"
+
+INDEXES = [
+    ("ix_temporary_pass_org_valid_from", "temporary_pass", "id_org, valid_from"),
+    ("ix_temporary_pass_valid_from", "temporary_pass", "valid_from"),
+    ("ix_temporary_pass_valid_until", "temporary_pass", "valid_until"),
+    # Сортировка списков - ix_temporary_pass_created_at_id (20261017_keyset_indexes)
+]
+
+
+def migrate():
+    if not check_connection():
+        raise SystemExit("DB connection failed")
+
+    with engine.begin() as conn:
+        for name, table, columns in INDEXES:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    print("temporary pass date filter indexes migration applied")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,14 +1,40 @@
 ﻿"""
 Модели базы данных для системы управления пропусками
 """
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, ForeignKey, Text, Enum as SQLEnum
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, ForeignKey, Text, Index, Computed, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy.sql import func, text, and_, literal
 from datetime import datetime
 import enum
 import json
 
 from database import Base
+from auth.permissions import effective_mask
+
+
+# Буквы госномера, одинаковые по начертанию в латинице и кириллице.
+# Нормализованный номер хранится в кириллице.
+_PLATE_LATIN = "ABEKMHOPCTYX"
+_PLATE_CYRILLIC = "АВЕКМНОРСТУХ"
+_PLATE_FOLD = str.maketrans(_PLATE_LATIN, _PLATE_CYRILLIC)
+
+# SQL-эквивалент normalize_plate (для миграций и массовых операций)
+PLATE_NORM_SQL = (
+    "translate(regexp_replace(upper({column}), '[^[:alnum:]]', '', 'g'), "
+    f"'{_PLATE_LATIN}', '{_PLATE_CYRILLIC}')"
+)
+
+
+def normalize_plate(value):
+    """
+    Ключ госномера для поиска: верхний регистр, без пробелов и разделителей,
+    латинские двойники букв заменены кириллицей ("a 123 ab 777" -> "А123АВ777").
+    """
+    if value is None:
+        return None
+    cleaned = "".join(ch for ch in str(value).upper() if ch.isalnum())
+    return cleaned.translate(_PLATE_FOLD)
 
 
 # Enum для ролей пользователей
@@ -53,19 +79,33 @@ class User(Base):
     # Дополнительные права (JSON)
     # Пример: {"can_activate": true, "can_archive": true, "can_manage_users": false}
     extra_permissions = Column(Text, default='{}')
+    # Итоговые права битовой маской (auth.permissions.PERMISSION_BITS), считаются при записи роли и прав
+    permission_mask = Column(BigInteger, nullable=True)
     
     # Связи
     created_propusks = relationship("Propusk", back_populates="creator", foreign_keys="Propusk.created_by")
 
-    @property
-    def permissions(self):
-        """Returns user permissions from JSON."""
+    @staticmethod
+    def _parse_permissions(raw):
         try:
-            data = json.loads(self.extra_permissions or "{}")
+            data = json.loads(raw or "{}")
             return data if isinstance(data, dict) else {}
         except Exception:
             return {}
 
+    @property
+    def permissions(self):
+        """Returns user permissions from JSON."""
+        return User._parse_permissions(self.extra_permissions)
+
+    @validates("role", "extra_permissions")
+    def _sync_permission_mask(self, key, value):
+        role = value if key == "role" else self.role
+        raw = value if key == "extra_permissions" else self.extra_permissions
+        role_value = role.value if hasattr(role, "value") else (str(role) if role else "viewer")
+        self.permission_mask = effective_mask(role_value, User._parse_permissions(raw))
+        return value
+
 
 
 # 2. Таблица организаций
@@ -139,6 +179,7 @@ class Propusk(Base):
     
     id_propusk = Column(Integer, primary_key=True, index=True)
     gos_id = Column(String(20), nullable=False, index=True)  # Гос. номер
+    gos_id_norm = Column(String(20))  # Нормализованный гос. номер (normalize_plate)
     id_mark_auto = Column(Integer, ForeignKey("mark_auto.id_mark"), nullable=False)
     id_model_auto = Column(Integer, ForeignKey("model_auto.id_model"), nullable=False)
     id_org = Column(Integer, ForeignKey("organiz.id_org"), nullable=False)
@@ -160,6 +201,19 @@ class Propusk(Base):
     creator = relationship("User", back_populates="created_propusks", foreign_keys=[created_by])
     history = relationship("PropuskHistory", back_populates="propusk", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_propusk_gos_id_norm", "gos_id_norm", postgresql_ops={"gos_id_norm": "varchar_pattern_ops"}),
+        Index("ix_propusk_created_at_id", created_at.desc(), id_propusk.desc()),
+        # Ветки поиска по организации и владельцу (PropuskService._apply_filters)
+        Index("ix_propusk_id_org", "id_org"),
+        Index("ix_propusk_id_fio", "id_fio"),
+    )
+
+    @validates("gos_id")
+    def _set_gos_id_norm(self, key, value):
+        self.gos_id_norm = normalize_plate(value)
+        return value
+
 
 # 7. Таблица архива пропусков
 class PropuskArchive(Base):
@@ -168,6 +222,7 @@ class PropuskArchive(Base):
     id = Column(Integer, primary_key=True, index=True)
     id_propusk = Column(Integer, nullable=False, index=True)  # Оригинальный ID
     gos_id = Column(String(20), nullable=False, index=True)
+    gos_id_norm = Column(String(20))
     id_mark_auto = Column(Integer, nullable=False)
     id_model_auto = Column(Integer, nullable=False)
     id_org = Column(Integer, nullable=False)
@@ -184,6 +239,15 @@ class PropuskArchive(Base):
     # Связи
     archiver = relationship("User")
 
+    __table_args__ = (
+        Index("ix_propusk_archive_gos_id_norm", "gos_id_norm", postgresql_ops={"gos_id_norm": "varchar_pattern_ops"}),
+    )
+
+    @validates("gos_id")
+    def _set_gos_id_norm(self, key, value):
+        self.gos_id_norm = normalize_plate(value)
+        return value
+
 
 # 8. Таблица истории изменений пропусков
 class PropuskHistory(Base):
@@ -203,6 +267,21 @@ class PropuskHistory(Base):
     user = relationship("User")
 
 
+# 8a. История архивных пропусков (переносится из propusk_history при архивации)
+class PropuskHistoryArchive(Base):
+    __tablename__ = "propusk_history_archive"
+
+    id = Column(Integer, primary_key=True)  # id из propusk_history
+    id_propusk = Column(Integer, nullable=False, index=True)
+    action = Column(String(50), nullable=False)  # HistoryAction.value
+    changed_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    old_values = Column(Text)
+    new_values = Column(Text)
+    comment = Column(Text)
+    timestamp = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 # 9. Таблица лога уведомлений
 class NotificationLog(Base):
     __tablename__ = "notifications_log"
@@ -220,10 +299,14 @@ class TemporaryPass(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     gos_id = Column(String(20), nullable=False, index=True)
+    gos_id_norm = Column(String(20))
     id_org = Column(Integer, ForeignKey("organiz.id_org"), nullable=False, index=True)
     phone = Column(String(30))
     valid_from = Column(DateTime(timezone=True), nullable=False)
     valid_until = Column(DateTime(timezone=True), nullable=False)
+    # [valid_from, valid_until) - ограничение ex_temporary_pass_active_plate (миграция
+    # 20261017_temp_pass_active): у номера не больше одного неотозванного пропуска на время
+    valid_range = Column(TSTZRANGE, Computed("tstzrange(valid_from, valid_until)", persisted=True))
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     revoked_at = Column(DateTime(timezone=True))
@@ -240,6 +323,19 @@ class TemporaryPass(Base):
     enterer = relationship("User", foreign_keys=[entered_by])
     exiter = relationship("User", foreign_keys=[exited_by])
 
+    __table_args__ = (
+        Index("ix_temporary_pass_gos_id_norm", "gos_id_norm", postgresql_ops={"gos_id_norm": "varchar_pattern_ops"}),
+        Index("ix_temporary_pass_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_temporary_pass_org_valid_from", "id_org", "valid_from"),
+        Index("ix_temporary_pass_valid_from", "valid_from"),
+        Index("ix_temporary_pass_valid_until", "valid_until"),
+    )
+
+    @validates("gos_id")
+    def _set_gos_id_norm(self, key, value):
+        self.gos_id_norm = normalize_plate(value)
+        return value
+
     @property
     def status(self):
         if self.revoked_at:
@@ -252,6 +348,24 @@ class TemporaryPass(Base):
             return "on_territory"
         return "active"
 
+    @classmethod
+    def active_at(cls, moment: datetime):
+        """Неотозван и действует в момент moment - условие по индексу ex_temporary_pass_active_plate"""
+        return and_(
+            cls.revoked_at.is_(None),
+            cls.valid_range.contains(literal(moment, DateTime(timezone=True))),
+        )
+
+    @classmethod
+    def overlapping(cls, start: datetime, end: datetime):
+        """Неотозван и пересекается с [start, end) - то же, что проверяет ограничение"""
+        return and_(
+            cls.revoked_at.is_(None),
+            cls.valid_range.overlaps(
+                func.tstzrange(literal(start, DateTime(timezone=True)), literal(end, DateTime(timezone=True)))
+            ),
+        )
+
 # 11. Temporary pass archive
 class TemporaryPassArchive(Base):
     __tablename__ = "temporary_pass_archive"
@@ -259,6 +373,7 @@ class TemporaryPassArchive(Base):
     id = Column(Integer, primary_key=True, index=True)
     temp_pass_id = Column(Integer, nullable=False, index=True)
     gos_id = Column(String(20), nullable=False, index=True)
+    gos_id_norm = Column(String(20))
     id_org = Column(Integer, ForeignKey("organiz.id_org"), nullable=False, index=True)
     phone = Column(String(30))
     valid_from = Column(DateTime(timezone=True), nullable=False)
@@ -274,7 +389,7 @@ class TemporaryPassArchive(Base):
     comment = Column(Text)
     status = Column(String(20), nullable=False)
     archived_at = Column(DateTime(timezone=True), server_default=func.now())
-    archived_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    archived_by = Column(Integer, ForeignKey("users.id"))  # NULL - плановая архивация
 
     organization = relationship("Organiz")
     creator = relationship("User", foreign_keys=[created_by])
@@ -283,6 +398,16 @@ class TemporaryPassArchive(Base):
     exiter = relationship("User", foreign_keys=[exited_by])
     archiver = relationship("User", foreign_keys=[archived_by])
 
+    __table_args__ = (
+        Index("ix_temporary_pass_archive_gos_id_norm", "gos_id_norm", postgresql_ops={"gos_id_norm": "varchar_pattern_ops"}),
+        Index("ix_temporary_pass_archive_created_at_id", created_at.desc(), id.desc()),
+    )
+
+    @validates("gos_id")
+    def _set_gos_id_norm(self, key, value):
+        self.gos_id_norm = normalize_plate(value)
+        return value
+
 # 11. Temporary pass PDF templates
 class TemporaryPassTemplate(Base):
     __tablename__ = "temporary_pass_template"
@@ -372,3 +497,53 @@ class AppSetting(Base):
     key = Column(String(100), primary_key=True)
     value = Column(Text, nullable=False, default="{}")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# 14. Счётчики пропусков по статусам (ведутся в propusk/counters.py)
+class PropuskCounter(Base):
+    __tablename__ = "propusk_counter"
+
+    scope = Column(String(10), primary_key=True)  # all, org, creator
+    scope_id = Column(Integer, primary_key=True)  # id_org / id пользователя, 0 для all
+    status = Column(String(20), primary_key=True)  # PropuskStatus.value
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+# 15. Фоновые задания печати (jobs/)
+class PrintJob(Base):
+    __tablename__ = "print_job"
+
+    id = Column(String(32), primary_key=True)  # uuid4().hex
+    kind = Column(String(50), nullable=False)
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    dedup_key = Column(String(64), nullable=False, index=True)  # sha256(kind + params)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    progress = Column(Integer, nullable=False, default=0)  # 0..100
+    message = Column(Text)  # текст ошибки
+    file_path = Column(String(500))
+    filename = Column(String(255))
+    size = Column(BigInteger)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Одинаковое задание может стоять в очереди или выполняться только одно
+        Index(
+            "ux_print_job_dedup_active", "dedup_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_print_job_status_created", "status", "created_at"),
+    )
+
+    @property
+    def params_json(self) -> dict:
+        try:
+            return json.loads(self.params or "{}")
+        except Exception:
+            return {}
@@ -0,0 +1,171 @@
+"""
+Пагинация списков: курсор по паре (created_at, id) и общее количество записей
+"""
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Optional, Sequence
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+import cache_bus
+from cache import TTLCache
+from config import settings
+
+
+TOTAL_MODES = ("exact", "estimate")
+TOTAL_MODE_PATTERN = "^(exact|estimate)$"
+
+_totals = TTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_ITEMS,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+_versions: dict[str, int] = {}
+_versions_lock = Lock()
+_subscribed: set[str] = set()
+_TOPIC_PREFIX = "totals."
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Непрозрачный токен следующей страницы"""
+    payload = json.dumps(
+        {"c": created_at.isoformat(), "i": int(item_id)},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[tuple[datetime, int]]:
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор страницы"
+        )
+
+
+def apply_keyset(query, created_col, id_col, cursor: Optional[tuple[datetime, int]]):
+    """
+    Условие «после курсора» для сортировки created_at DESC, id DESC.
+    Сравнение строк (created_at, id) < (...) идёт по составному индексу.
+    """
+    if cursor is None:
+        return query
+    return query.filter(tuple_(created_col, id_col) < tuple_(*cursor))
+
+
+def next_cursor(items: Sequence[Any], limit: int, id_field: str) -> Optional[str]:
+    """Курсор на следующую страницу, если текущая заполнена целиком"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, dict):
+        created_at, item_id = last["created_at"], last[id_field]
+    else:
+        created_at, item_id = last.created_at, getattr(last, id_field)
+    if created_at is None:
+        return None
+    return encode_cursor(created_at, item_id)
+
+
+def _bump(namespaces) -> None:
+    # Старые записи не удаляются, а перестают совпадать по версии и вытесняются по TTL
+    with _versions_lock:
+        for namespace in namespaces:
+            _versions[namespace] = _versions.get(namespace, 0) + 1
+
+
+def _on_totals_changed(namespace: str) -> Callable[[str], None]:
+    def handler(payload: str) -> None:
+        _bump([namespace])
+    return handler
+
+
+def _subscribe(namespace: str) -> None:
+    with _versions_lock:
+        if namespace in _subscribed:
+            return
+        _subscribed.add(namespace)
+    cache_bus.subscribe(_TOPIC_PREFIX + namespace, _on_totals_changed(namespace))
+
+
+def invalidate_totals(db: Session, *namespaces: str) -> None:
+    """
+    Сбрасывает закэшированные количества; вызывается до коммита изменений.
+    Этот воркер сбрасывает их сразу, все воркеры (и этот ещё раз) - после коммита
+    через cache_bus, тема totals.<namespace>.
+    """
+    _bump(namespaces)
+    for namespace in namespaces:
+        _subscribe(namespace)
+        cache_bus.publish(db, _TOPIC_PREFIX + namespace)
+
+
+def _totals_key(namespace: str, filters: dict) -> tuple:
+    with _versions_lock:
+        version = _versions.get(namespace, 0)
+    signature = json.dumps(filters, sort_keys=True, default=str)
+    return namespace, version, signature
+
+
+def estimate_rows(db: Session, query) -> Optional[int]:
+    """
+    Оценка количества строк по плану PostgreSQL (EXPLAIN), без выполнения запроса.
+    None, если план получить не удалось.
+    """
+    statement = getattr(query, "statement", query)
+    try:
+        compiled = statement.compile(
+            dialect=db.get_bind().dialect,
+            compile_kwargs={"literal_binds": True, "render_postcompile": True},
+        )
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        return None
+
+
+def resolve_total(
+    db: Session,
+    namespace: str,
+    filters: dict,
+    count: Callable[[], int],
+    rows_query=None,
+    total_mode: str = "exact",
+    cacheable: bool = True,
+) -> tuple[int, bool]:
+    """
+    Общее количество для страницы списка: (total, total_exact).
+
+    exact - точный COUNT, кэшируется по набору фильтров до изменения данных
+    (invalidate_totals) или истечения COUNT_CACHE_TTL_SECONDS. Кэш используется,
+    только пока работает cache_bus (иначе запись в другом воркере его не сбросит),
+    и не используется при cacheable=False - для фильтров, зависящих от текущего времени.
+    estimate - оценка планировщика по rows_query; маленькие оценки
+    (меньше COUNT_ESTIMATE_MIN_ROWS) всё равно досчитываются точно.
+    """
+    if total_mode == "estimate" and rows_query is not None:
+        estimate = estimate_rows(db, rows_query)
+        if estimate is not None and estimate >= settings.COUNT_ESTIMATE_MIN_ROWS:
+            return estimate, False
+
+    if not cacheable or not cache_bus.is_live():
+        return count(), True
+
+    _subscribe(namespace)
+    key = _totals_key(namespace, filters)
+    total = _totals.get(key)
+    if total is None:
+        total = count()
+        _totals.set(key, total)
+    return total, True
@@ -0,0 +1,48 @@
+"""
+Буферы для больших PDF (пакеты, отчёты): в памяти до порога, дальше во временном файле
+
+ReportLab собирает документ целиком до canvas.save(), поэтому отдавать страницы
+клиенту по мере готовности нельзя. Но готовый файл не держится в памяти
+всё время, пока клиент его скачивает, а страницы хранятся сжатыми.
+"""
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator
+import shutil
+
+from config import settings
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def new_buffer() -> BinaryIO:
+    return SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_MEMORY_BYTES, mode="w+b")
+
+
+def canvas_options() -> dict:
+    return {"pageCompression": 1 if settings.PDF_PAGE_COMPRESSION else 0}
+
+
+def iter_file(fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Отдаёт файл кусками для StreamingResponse и закрывает его в конце"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def copy_to(fileobj: BinaryIO, target: BinaryIO) -> int:
+    """Копирует файл целиком в target, возвращает размер"""
+    fileobj.seek(0)
+    shutil.copyfileobj(fileobj, target, CHUNK_SIZE)
+    return fileobj.tell()
+
+
+def read_all(fileobj: BinaryIO) -> bytes:
+    fileobj.seek(0)
+    return fileobj.read()
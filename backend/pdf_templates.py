@@ -0,0 +1,276 @@
+"""
+Компиляция JSON-шаблонов PDF (пропуск, отчёт, временный пропуск, отчёт по временным)
+в неизменяемый план отрисовки
+
+Координаты переводятся в пункты, цвета разбираются, шрифты выбираются,
+а логотипы декодируются один раз на версию шаблона, а не на каждую карточку.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Optional, Tuple
+import base64
+
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+
+from cache import TTLCache
+
+
+KNOWN_FONTS = ("DejaVu", "DejaVu-Bold", "Helvetica", "Helvetica-Bold")
+
+Color = Tuple[float, float, float]
+
+# Скомпилированные шаблоны по (таблица, id, версия); версии не меняются после сохранения
+_compiled = TTLCache(maxsize=64, ttl=24 * 60 * 60)
+
+
+@dataclass(frozen=True)
+class TextOp:
+    kind: str  # "text" или "field"
+    x: float
+    y: float  # базовая линия
+    width: float
+    align: str
+    font: str
+    font_size: float
+    color: Color
+    value: str  # готовый текст для "text", имя поля для "field"
+
+
+@dataclass(frozen=True)
+class LineOp:
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    stroke: Color
+    line_width: float
+    kind: str = "line"
+
+
+@dataclass(frozen=True)
+class RectOp:
+    x: float
+    y: float  # нижний край
+    width: float
+    height: float
+    stroke: Color
+    line_width: float
+    fill: Optional[Color]
+    kind: str = "rect"
+
+
+@dataclass(frozen=True)
+class ImageOp:
+    image: Any  # ImageReader
+    x: float
+    y: float
+    width: float
+    height: float
+    kind: str = "logo"
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    width: float
+    height: float
+    font_regular: str
+    font_bold: str
+    ops: tuple
+    data: dict  # исходный JSON: page, meta, table_rows и прочие редкие настройки
+
+
+def parse_color(value, default: Color = (0, 0, 0)) -> Color:
+    if not value:
+        return default
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return tuple(value)
+    if isinstance(value, str) and value.startswith("#") and len(value) == 7:
+        r = int(value[1:3], 16) / 255.0
+        g = int(value[3:5], 16) / 255.0
+        b = int(value[5:7], 16) / 255.0
+        return (r, g, b)
+    return default
+
+
+def _num(value, default: float = 0) -> float:
+    return float(value or default)
+
+
+def _decode_image(data_url: str):
+    try:
+        header, encoded = data_url.split(",", 1)
+        return ImageReader(BytesIO(base64.b64decode(encoded)))
+    except Exception:
+        return None
+
+
+def _compile_element(el: dict, height: float, font_regular: str, font_bold: str):
+    etype = el.get("type")
+    w_mm = _num(el.get("width", 0))
+    h_mm = _num(el.get("height", 0))
+    x = _num(el.get("x", 0)) * mm
+    y_top = height - _num(el.get("y", 0)) * mm
+
+    if etype in ("field", "text"):
+        font = el.get("font", font_regular)
+        if font not in KNOWN_FONTS:
+            font = font_regular
+        if el.get("bold"):
+            font = font_bold
+        font_size = _num(el.get("font_size", 10), 10)
+        return TextOp(
+            kind=etype,
+            x=x,
+            y=y_top - font_size,
+            width=w_mm * mm,
+            align=el.get("align", "left"),
+            font=font,
+            font_size=font_size,
+            color=parse_color(el.get("color")),
+            value=str(el.get("text", "")) if etype == "text" else el.get("field"),
+        )
+
+    if etype == "line":
+        x2_mm = el.get("x2")
+        y2_mm = el.get("y2")
+        if x2_mm is not None and y2_mm is not None:
+            x2 = float(x2_mm) * mm
+            y2 = height - float(y2_mm) * mm
+        else:
+            x2 = x + w_mm * mm
+            y2 = y_top - h_mm * mm
+        return LineOp(
+            x1=x,
+            y1=y_top,
+            x2=x2,
+            y2=y2,
+            stroke=parse_color(el.get("stroke")),
+            line_width=_num(el.get("stroke_width", 1), 1),
+        )
+
+    if etype == "rect":
+        fill = el.get("fill")
+        return RectOp(
+            x=x,
+            y=y_top - h_mm * mm,
+            width=w_mm * mm,
+            height=h_mm * mm,
+            stroke=parse_color(el.get("stroke")),
+            line_width=_num(el.get("stroke_width", 1), 1),
+            fill=parse_color(fill) if fill else None,
+        )
+
+    if etype == "logo":
+        data_url = el.get("data_url")
+        image = _decode_image(data_url) if data_url else None
+        if image is None:
+            return None
+        return ImageOp(image=image, x=x, y=y_top - h_mm * mm, width=w_mm * mm, height=h_mm * mm)
+
+    return None
+
+
+def compile_template(
+    data: dict,
+    font_regular: str,
+    font_bold: str,
+    default_page: Tuple[float, float],
+) -> CompiledTemplate:
+    data = data or {}
+    page = data.get("page") or {}
+    width = _num(page.get("width_mm", default_page[0]), default_page[0]) * mm
+    height = _num(page.get("height_mm", default_page[1]), default_page[1]) * mm
+    ops = []
+    for el in data.get("elements", []) or []:
+        op = _compile_element(el, height, font_regular, font_bold)
+        if op is not None:
+            ops.append(op)
+    return CompiledTemplate(
+        width=width,
+        height=height,
+        font_regular=font_regular,
+        font_bold=font_bold,
+        ops=tuple(ops),
+        data=data,
+    )
+
+
+def get_compiled(
+    template,
+    font_regular: str,
+    font_bold: str,
+    default_page: Tuple[float, float],
+) -> Optional[CompiledTemplate]:
+    """
+    План для ORM-шаблона (любой из четырёх таблиц) из кэша или после компиляции.
+    None, если данных шаблона нет или они не разбираются: генераторы рисуют стандартный макет.
+    """
+    if template is None:
+        return None
+    key = (template.__tablename__, template.id, template.version, font_regular, font_bold, default_page)
+    plan = _compiled.get(key)
+    if plan is None:
+        data = template.data_json
+        if not data:
+            return None
+        plan = compile_template(data, font_regular, font_bold, default_page)
+        _compiled.set(key, plan)
+    return plan
+
+
+def ensure_compiled(
+    template_data,
+    font_regular: str,
+    font_bold: str,
+    default_page: Tuple[float, float],
+) -> Optional[CompiledTemplate]:
+    """
+    Генераторы принимают и готовый план, и словарь шаблона (например, в процессах пула).
+    Пустой шаблон - None, как и без шаблона.
+    """
+    if not template_data:
+        return None
+    if isinstance(template_data, CompiledTemplate):
+        return template_data
+    return compile_template(template_data, font_regular, font_bold, default_page)
+
+
+def draw_ops(c, plan: CompiledTemplate, data_map: dict, kinds: Optional[tuple] = None, styled: bool = True) -> None:
+    """
+    Рисует элементы плана. kinds ограничивает типы элементов,
+    styled=False рисует текст и рамки текущим цветом холста без заливки.
+    """
+    for op in plan.ops:
+        if kinds is not None and op.kind not in kinds:
+            continue
+
+        if isinstance(op, TextOp):
+            value = op.value if op.kind == "text" else str(data_map.get(op.value, ""))
+            if styled:
+                c.setFillColorRGB(*op.color)
+            c.setFont(op.font, op.font_size)
+            if op.align == "center" and op.width:
+                c.drawCentredString(op.x + op.width / 2, op.y, value)
+            elif op.align == "right" and op.width:
+                c.drawRightString(op.x + op.width, op.y, value)
+            else:
+                c.drawString(op.x, op.y, value)
+        elif isinstance(op, LineOp):
+            c.setStrokeColorRGB(*op.stroke)
+            c.setLineWidth(op.line_width)
+            c.line(op.x1, op.y1, op.x2, op.y2)
+        elif isinstance(op, RectOp):
+            if styled:
+                c.setStrokeColorRGB(*op.stroke)
+            c.setLineWidth(op.line_width)
+            fill_flag = 0
+            if styled and op.fill:
+                c.setFillColorRGB(*op.fill)
+                fill_flag = 1
+            c.rect(op.x, op.y, op.width, op.height, stroke=1, fill=fill_flag)
+        elif isinstance(op, ImageOp):
+            try:
+                c.drawImage(op.image, op.x, op.y, width=op.width, height=op.height, preserveAspectRatio=True)
+            except Exception:
+                pass
@@ -0,0 +1,150 @@
+"""
+Счётчики пропусков по статусам (таблица propusk_counter)
+
+Счётчики меняются в той же транзакции, что и сам пропуск, поэтому
+/api/propusk/stats читает несколько строк вместо GROUP BY по всей таблице.
+reconcile() пересчитывает их по propusk и исправляет расхождения.
+"""
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import PropuskCounter
+
+
+SCOPE_ALL = "all"
+SCOPE_ORG = "org"
+SCOPE_CREATOR = "creator"
+
+# Ключ advisory-блокировки, чтобы сверку одновременно выполнял только один воркер
+_RECONCILE_LOCK_KEY = 0x70726F70  # "prop"
+
+
+def _status_key(status) -> str:
+    return status.value if hasattr(status, "value") else str(status)
+
+
+def snapshot(propusk) -> tuple:
+    """То, что влияет на счётчики: (status, id_org, created_by)"""
+    return _status_key(propusk.status), propusk.id_org, propusk.created_by
+
+
+def _keys(state: tuple) -> list:
+    status, id_org, created_by = state
+    return [
+        (SCOPE_ALL, 0, status),
+        (SCOPE_ORG, id_org, status),
+        (SCOPE_CREATOR, created_by, status),
+    ]
+
+
+def change(db: Session, old: Optional[tuple] = None, new: Optional[tuple] = None) -> None:
+    """
+    Переносит пропуск из состояния old в new (снимки из snapshot()).
+    old=None - пропуск появился, new=None - пропуск удалён из таблицы.
+    Коммит остаётся за вызывающим кодом.
+    """
+    deltas = defaultdict(int)
+    if old is not None:
+        for key in _keys(old):
+            deltas[key] -= 1
+    if new is not None:
+        for key in _keys(new):
+            deltas[key] += 1
+    _apply(db, deltas)
+
+
+def remove_many(db: Session, status, groups: dict) -> None:
+    """
+    Массовое удаление пропусков одного статуса: groups - {(id_org, created_by): сколько}.
+    Коммит остаётся за вызывающим кодом.
+    """
+    deltas = defaultdict(int)
+    for (id_org, created_by), count in groups.items():
+        for key in _keys((_status_key(status), id_org, created_by)):
+            deltas[key] -= count
+    _apply(db, deltas)
+
+
+def _apply(db: Session, deltas: dict) -> None:
+    rows = [
+        {"scope": scope, "scope_id": scope_id, "status": status, "value": delta}
+        for (scope, scope_id, status), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    # Строки отсортированы, чтобы параллельные транзакции брали блокировки в одном порядке
+    stmt = pg_insert(PropuskCounter).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PropuskCounter.scope, PropuskCounter.scope_id, PropuskCounter.status],
+        set_={"value": PropuskCounter.value + stmt.excluded.value},
+    )
+    db.execute(stmt)
+
+
+def get_counts(db: Session, scope: str = SCOPE_ALL, scope_id: int = 0) -> dict:
+    rows = db.query(PropuskCounter.status, PropuskCounter.value).filter(
+        PropuskCounter.scope == scope,
+        PropuskCounter.scope_id == scope_id
+    ).all()
+    return {status: int(value) for status, value in rows}
+
+
+# Расхождения счётчиков с propusk одним запросом: в READ COMMITTED весь запрос
+# видит один снимок, а счётчики меняются в тех же транзакциях, что и пропуска,
+# поэтому разница в снимке - это именно ошибка счётчиков, а не чужие незавершённые изменения.
+# Статусы в propusk хранятся именами enum (ACTIVE), в счётчиках - значениями (active).
+_DRIFT_SQL = text("""
+    WITH grouped AS (
+        SELECT lower(CAST(status AS text)) AS status, id_org, created_by, count(*) AS n
+        FROM propusk
+        GROUP BY status, id_org, created_by
+    ),
+    actual AS (
+        SELECT k.scope, k.scope_id, g.status, sum(g.n) AS value
+        FROM grouped AS g
+        CROSS JOIN LATERAL (
+            VALUES (CAST(:scope_all AS varchar), 0), (:scope_org, g.id_org), (:scope_creator, g.created_by)
+        ) AS k(scope, scope_id)
+        GROUP BY k.scope, k.scope_id, g.status
+    )
+    SELECT
+        COALESCE(a.scope, c.scope) AS scope,
+        COALESCE(a.scope_id, c.scope_id) AS scope_id,
+        COALESCE(a.status, c.status) AS status,
+        COALESCE(a.value, 0) - COALESCE(c.value, 0) AS diff
+    FROM actual AS a
+    FULL JOIN propusk_counter AS c
+        ON c.scope = a.scope AND c.scope_id = a.scope_id AND c.status = a.status
+    WHERE COALESCE(a.value, 0) <> COALESCE(c.value, 0)
+""")
+
+
+def reconcile(db: Session) -> Optional[int]:
+    """
+    Сверка счётчиков с таблицей propusk.
+    Возвращает число исправленных строк или None, если сверку уже выполняет другой процесс.
+    Таблица propusk не блокируется: поправки прибавляются к счётчикам, поэтому
+    изменения, завершившиеся после снимка, не теряются.
+    """
+    locked = db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _RECONCILE_LOCK_KEY}
+    ).scalar()
+    if not locked:
+        db.rollback()
+        return None
+
+    rows = db.execute(_DRIFT_SQL, {
+        "scope_all": SCOPE_ALL,
+        "scope_org": SCOPE_ORG,
+        "scope_creator": SCOPE_CREATOR,
+    }).all()
+    deltas = {(row.scope, row.scope_id, row.status): int(row.diff) for row in rows}
+    _apply(db, deltas)
+    db.query(PropuskCounter).filter(PropuskCounter.value == 0).delete(synchronize_session=False)
+    db.commit()
+    return len(deltas)
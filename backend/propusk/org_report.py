@@ -1,6 +1,5 @@
-from io import BytesIO
 from datetime import datetime
-from typing import List, Optional
+from typing import BinaryIO, Iterable, List, Optional
 
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm
@@ -9,6 +8,8 @@ from reportlab.pdfgen import canvas
 
 from models import Propusk
 from propusk.pdf_generator import _FONTS_AVAILABLE
+from pdf_templates import CompiledTemplate, draw_ops, ensure_compiled, get_compiled
+from pdf_output import canvas_options, new_buffer
 
 DEFAULT_REPORT_TEMPLATE = {
     "page": {"width_mm": 297, "height_mm": 210},
@@ -208,105 +209,33 @@ DEFAULT_REPORT_TEMPLATE = {
 }
 
 
-def _parse_color(value, default=(0, 0, 0)):
-    if not value:
-        return default
-    if isinstance(value, (list, tuple)) and len(value) == 3:
-        return tuple(value)
-    if isinstance(value, str) and value.startswith("#") and len(value) == 7:
-        r = int(value[1:3], 16) / 255.0
-        g = int(value[3:5], 16) / 255.0
-        b = int(value[5:7], 16) / 255.0
-        return (r, g, b)
-    return default
-
-
 def _get_fonts():
     if _FONTS_AVAILABLE:
         return "DejaVu", "DejaVu-Bold"
     return "Helvetica", "Helvetica-Bold"
 
 
-def _draw_elements(c, elements, data_map, page_width, page_height, font_regular, font_bold):
-    for el in elements:
-        etype = el.get("type")
-        x_mm = float(el.get("x", 0) or 0)
-        y_mm = float(el.get("y", 0) or 0)
-        w_mm = float(el.get("width", 0) or 0)
-        h_mm = float(el.get("height", 0) or 0)
-        x = x_mm * mm
-        y_top = page_height - y_mm * mm
-
-        if etype in ("field", "text"):
-            value = el.get("text", "") if etype == "text" else data_map.get(el.get("field"), "")
-            font = el.get("font", font_regular)
-            if font not in ("DejaVu", "DejaVu-Bold", "Helvetica", "Helvetica-Bold"):
-                font = font_regular
-            if el.get("bold"):
-                font = font_bold
-            font_size = float(el.get("font_size", 10) or 10)
-            r, g, b = _parse_color(el.get("color"))
-            c.setFillColorRGB(r, g, b)
-            c.setFont(font, font_size)
-            y = y_top - font_size
-            align = el.get("align", "left")
-            if align == "center" and w_mm:
-                c.drawCentredString(x + (w_mm * mm) / 2, y, str(value))
-            elif align == "right" and w_mm:
-                c.drawRightString(x + (w_mm * mm), y, str(value))
-            else:
-                c.drawString(x, y, str(value))
-            continue
-
-        if etype == "line":
-            r, g, b = _parse_color(el.get("stroke"))
-            c.setStrokeColorRGB(r, g, b)
-            c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-            x2_mm = el.get("x2")
-            y2_mm = el.get("y2")
-            if x2_mm is not None and y2_mm is not None:
-                x2 = float(x2_mm) * mm
-                y2 = page_height - float(y2_mm) * mm
-            else:
-                x2 = x + w_mm * mm
-                y2 = y_top - h_mm * mm
-            c.line(x, y_top, x2, y2)
-            continue
-
-        if etype == "rect":
-            r, g, b = _parse_color(el.get("stroke"))
-            c.setStrokeColorRGB(r, g, b)
-            c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-            fill = el.get("fill")
-            if fill:
-                fr, fg, fb = _parse_color(fill)
-                c.setFillColorRGB(fr, fg, fb)
-                fill_flag = 1
-            else:
-                fill_flag = 0
-            c.rect(x, y_top - h_mm * mm, w_mm * mm, h_mm * mm, stroke=1, fill=fill_flag)
-            continue
-
-        if etype == "logo":
-            data_url = el.get("data_url")
-            if data_url:
-                try:
-                    import base64
-                    from reportlab.lib.utils import ImageReader
-
-                    header, encoded = data_url.split(",", 1)
-                    image_bytes = base64.b64decode(encoded)
-                    img = ImageReader(BytesIO(image_bytes))
-                    c.drawImage(
-                        img,
-                        x,
-                        y_top - h_mm * mm,
-                        width=w_mm * mm,
-                        height=h_mm * mm,
-                        preserveAspectRatio=True,
-                    )
-                except Exception:
-                    pass
+REPORT_PAGE_MM = (297, 210)
+
+
+def compile_report_template(template) -> Optional[CompiledTemplate]:
+    """План отрисовки шаблона отчёта (кэшируется по id и версии шаблона)"""
+    return get_compiled(template, *_get_fonts(), default_page=REPORT_PAGE_MM)
+
+
+def _plan(template_data) -> CompiledTemplate:
+    if isinstance(template_data, CompiledTemplate):
+        if template_data.data.get("elements"):
+            return template_data
+        template_data = template_data.data
+    # Без шаблона или без элементов рисуем стандартные элементы
+    data = template_data or {}
+    data = {
+        **data,
+        "page": data.get("page") or DEFAULT_REPORT_TEMPLATE["page"],
+        "elements": data.get("elements") or DEFAULT_REPORT_TEMPLATE["elements"],
+    }
+    return ensure_compiled(data, *_get_fonts(), default_page=REPORT_PAGE_MM)
 
 
 def _find_table_body(elements):
@@ -381,17 +310,10 @@ def _draw_table(c, propusks, table_rect, page_height, font_regular, font_bold):
             c.drawString(x_text, y, str(val))
 
 
-def _render_report_page(c, template, data_map, propusks_page):
-    page = template.get("page", {}) if template else {}
-    page_width = float(page.get("width_mm", 297) or 297) * mm
-    page_height = float(page.get("height_mm", 210) or 210) * mm
-
-    font_regular, font_bold = _get_fonts()
-    elements = (template or {}).get("elements") or DEFAULT_REPORT_TEMPLATE["elements"]
-
-    _draw_elements(c, elements, data_map, page_width, page_height, font_regular, font_bold)
-    table_rect = _find_table_body(elements) or _find_table_body(DEFAULT_REPORT_TEMPLATE["elements"])
-    _draw_table(c, propusks_page, table_rect, page_height, font_regular, font_bold)
+def _render_report_page(c, plan: CompiledTemplate, data_map, propusks_page):
+    draw_ops(c, plan, data_map)
+    table_rect = _find_table_body(plan.data["elements"]) or _find_table_body(DEFAULT_REPORT_TEMPLATE["elements"])
+    _draw_table(c, propusks_page, table_rect, plan.height, plan.font_regular, plan.font_bold)
 
 
 def _split_pages(propusks, rows_per_page):
@@ -404,16 +326,13 @@ def generate_org_report(
     free_mesto: int,
     permanent_count: int,
     propusks: List[Propusk],
-    template_data: Optional[dict] = None,
-) -> BytesIO:
-    buffer = BytesIO()
-    page = (template_data or {}).get("page") or DEFAULT_REPORT_TEMPLATE["page"]
-    page_width = float(page.get("width_mm", 297) or 297) * mm
-    page_height = float(page.get("height_mm", 210) or 210) * mm
-
-    c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
+    template_data=None,
+) -> BinaryIO:
+    plan = _plan(template_data)
+    buffer = new_buffer()
+    c = canvas.Canvas(buffer, pagesize=(plan.width, plan.height), **canvas_options())
 
-    rows_per_page = int(float((template_data or {}).get("table_rows", 15) or 15))
+    rows_per_page = int(float(plan.data.get("table_rows", 15) or 15))
     rows_per_page = max(rows_per_page, 1)
 
     data_map = {
@@ -425,7 +344,7 @@ def generate_org_report(
 
     pages = list(_split_pages(propusks, rows_per_page)) or [[]]
     for idx, page_rows in enumerate(pages):
-        _render_report_page(c, template_data or DEFAULT_REPORT_TEMPLATE, data_map, page_rows)
+        _render_report_page(c, plan, data_map, page_rows)
         if idx < len(pages) - 1:
             c.showPage()
 
@@ -434,17 +353,16 @@ def generate_org_report(
     return buffer
 
 
-def generate_all_orgs_report(org_items: list, template_data: Optional[dict] = None) -> BytesIO:
-    buffer = BytesIO()
-    page = (template_data or {}).get("page") or DEFAULT_REPORT_TEMPLATE["page"]
-    page_width = float(page.get("width_mm", 297) or 297) * mm
-    page_height = float(page.get("height_mm", 210) or 210) * mm
-
-    c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
-    rows_per_page = int(float((template_data or {}).get("table_rows", 15) or 15))
+def generate_all_orgs_report(org_items: Iterable[dict], template_data=None) -> BinaryIO:
+    """org_items может быть генератором: организации рисуются по мере получения"""
+    plan = _plan(template_data)
+    buffer = new_buffer()
+    c = canvas.Canvas(buffer, pagesize=(plan.width, plan.height), **canvas_options())
+    rows_per_page = int(float(plan.data.get("table_rows", 15) or 15))
     rows_per_page = max(rows_per_page, 1)
 
-    for idx, item in enumerate(org_items):
+    first_page = True
+    for item in org_items:
         data_map = {
             "org_name": item.get("org_name", ""),
             "free_mesto": item.get("free_mesto", 0),
@@ -453,10 +371,11 @@ def generate_all_orgs_report(org_items: list, template_data: Optional[dict] = No
         }
         propusks = item.get("propusks", [])
         pages = list(_split_pages(propusks, rows_per_page)) or [[]]
-        for page_idx, page_rows in enumerate(pages):
-            _render_report_page(c, template_data or DEFAULT_REPORT_TEMPLATE, data_map, page_rows)
-            if page_idx < len(pages) - 1 or idx < len(org_items) - 1:
+        for page_rows in pages:
+            if not first_page:
                 c.showPage()
+            first_page = False
+            _render_report_page(c, plan, data_map, page_rows)
 
     c.save()
     buffer.seek(0)
@@ -0,0 +1,142 @@
+"""
+Пакетная печать пропусков: одна выборка из БД и отрисовка страниц в пуле процессов
+"""
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from threading import Lock
+from types import SimpleNamespace
+from typing import BinaryIO, List, Optional
+import multiprocessing
+import os
+
+from sqlalchemy.orm import Session, joinedload
+
+from config import settings
+from models import Propusk, PropuskStatus
+from propusk.pdf_generator import PropuskPDFGenerator
+from pdf_templates import CompiledTemplate
+from pdf_output import new_buffer, read_all
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # без pypdf части не склеить, печатаем в одном процессе
+    PdfReader = PdfWriter = None
+
+
+# Пропусков на листе A4 в generate_multiple_propusks_pdf (2 колонки × 5 рядов)
+CARDS_PER_PAGE = 10
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def load_active_propusks(db: Session, propusk_ids: List[int]) -> List[Propusk]:
+    """
+    Активные пропуска одним запросом IN со справочниками,
+    в порядке переданных id (повторы сохраняются, как при поштучной выборке).
+    """
+    unique_ids = list(dict.fromkeys(propusk_ids))
+    rows = db.query(Propusk).options(
+        joinedload(Propusk.mark),
+        joinedload(Propusk.model),
+        joinedload(Propusk.organization),
+        joinedload(Propusk.abonent),
+    ).filter(
+        Propusk.id_propusk.in_(unique_ids),
+        Propusk.status == PropuskStatus.ACTIVE
+    ).all()
+    by_id = {row.id_propusk: row for row in rows}
+    return [by_id[pid] for pid in propusk_ids if pid in by_id]
+
+
+def snapshot(propusk) -> SimpleNamespace:
+    """
+    Копия полей, которые читает PropuskPDFGenerator, без ORM-объектов:
+    её можно передать в другой процесс.
+    """
+    org = propusk.organization
+    return SimpleNamespace(
+        id_propusk=propusk.id_propusk,
+        gos_id=propusk.gos_id,
+        pass_type=propusk.pass_type,
+        release_date=propusk.release_date,
+        valid_until=propusk.valid_until,
+        mark=SimpleNamespace(mark_name=propusk.mark.mark_name) if propusk.mark else None,
+        model=SimpleNamespace(model_name=propusk.model.model_name) if propusk.model else None,
+        organization=SimpleNamespace(
+            org_name=org.org_name,
+            free_mesto=org.free_mesto,
+            free_mesto_limit=org.free_mesto_limit,
+        ) if org else None,
+        abonent=SimpleNamespace(full_name=propusk.abonent.full_name) if propusk.abonent else None,
+    )
+
+
+def _render_chunk(cards: list, template_data: Optional[dict]) -> bytes:
+    buffer = PropuskPDFGenerator.generate_multiple_propusks_pdf(cards, template_data=template_data)
+    try:
+        return read_all(buffer)
+    finally:
+        buffer.close()
+
+
+def _workers() -> int:
+    return settings.PDF_BATCH_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: рабочие процессы не наследуют потоки и соединения с БД веб-сервера
+            _pool = ProcessPoolExecutor(
+                max_workers=_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _merge(parts: List[bytes]) -> BinaryIO:
+    writer = PdfWriter()
+    for part in parts:
+        for page in PdfReader(BytesIO(part)).pages:
+            writer.add_page(page)
+    buffer = new_buffer()
+    writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def render_batch(propusks: list, template_data=None) -> BinaryIO:
+    """
+    PDF с пропусками по 10 на лист A4.
+    Большие пакеты делятся на части по целым листам, части рисуются
+    в пуле процессов и склеиваются в один документ.
+    """
+    cards = [snapshot(propusk) for propusk in propusks]
+    parallel = (
+        PdfWriter is not None
+        and _workers() > 1
+        and len(cards) >= settings.PDF_BATCH_PARALLEL_THRESHOLD
+    )
+    if not parallel:
+        return PropuskPDFGenerator.generate_multiple_propusks_pdf(cards, template_data=template_data)
+
+    pages_per_chunk = max(1, settings.PDF_BATCH_CHUNK_SIZE // CARDS_PER_PAGE)
+    chunk_size = pages_per_chunk * CARDS_PER_PAGE
+    chunks = [cards[i:i + chunk_size] for i in range(0, len(cards), chunk_size)]
+    # Готовый план с декодированными картинками не передать в другой процесс,
+    # поэтому туда уходит словарь шаблона, а каждая часть компилирует его сама
+    if isinstance(template_data, CompiledTemplate):
+        template_data = template_data.data
+    pool = _get_pool()
+    parts = list(pool.map(_render_chunk, chunks, [template_data] * len(chunks)))
+    return _merge(parts)
@@ -0,0 +1,152 @@
+"""
+Кэш готовых PDF одиночных пропусков: память процесса (LRU) и, по желанию, каталог на диске
+
+Ключ (он же ETag) строится из id пропуска, updated_at, id/версии активного шаблона
+и полей, которые попадают на карточку. Поэтому переименование организации
+или марки, как и смена числа мест организации, тоже даёт новый ключ,
+хотя сам пропуск не менялся.
+"""
+from typing import Optional
+import hashlib
+import json
+import os
+
+from cache import TTLCache
+from config import settings
+from propusk import pdf_generator
+
+
+# Одна запись на пропуск: (etag, pdf). Старая версия вытесняется новой
+_memory = TTLCache(maxsize=settings.PDF_CACHE_MAX_ITEMS, ttl=settings.PDF_CACHE_TTL_SECONDS)
+
+
+def _disk_dir() -> Optional[str]:
+    path = settings.PDF_CACHE_DIR
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _card_fields(propusk) -> dict:
+    return {
+        "gos_id": propusk.gos_id,
+        "pass_type": propusk.pass_type,
+        "release_date": propusk.release_date.isoformat() if propusk.release_date else None,
+        "valid_until": propusk.valid_until.isoformat() if propusk.valid_until else None,
+        "mark": propusk.mark.mark_name if propusk.mark else None,
+        "model": propusk.model.model_name if propusk.model else None,
+        "org": propusk.organization.org_name if propusk.organization else None,
+        # Макет по умолчанию печатает число мест организации
+        "free_mesto": propusk.organization.free_mesto if propusk.organization else None,
+        "free_mesto_limit": propusk.organization.free_mesto_limit if propusk.organization else None,
+        "abonent": propusk.abonent.full_name if propusk.abonent else None,
+    }
+
+
+def make_etag(propusk, template) -> str:
+    raw = json.dumps(
+        {
+            "id": propusk.id_propusk,
+            "updated_at": propusk.updated_at.isoformat() if propusk.updated_at else None,
+            "template": [template.id, template.version] if template else None,
+            "fonts": pdf_generator._FONTS_AVAILABLE,
+            "card": _card_fields(propusk),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Разбор заголовка If-None-Match (список, слабые теги, *)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def _disk_path(directory: str, propusk_id: int, etag: str) -> str:
+    return os.path.join(directory, f"{propusk_id}-{etag}.pdf")
+
+
+def get(propusk_id: int, etag: str) -> Optional[bytes]:
+    item = _memory.get(propusk_id)
+    if item and item[0] == etag:
+        return item[1]
+
+    directory = _disk_dir()
+    if not directory:
+        return None
+    try:
+        with open(_disk_path(directory, propusk_id, etag), "rb") as fh:
+            content = fh.read()
+    except FileNotFoundError:
+        return None
+    _memory.set(propusk_id, (etag, content))
+    return content
+
+
+def put(propusk_id: int, etag: str, content: bytes) -> None:
+    _memory.set(propusk_id, (etag, content))
+
+    directory = _disk_dir()
+    if not directory:
+        return
+    _remove_files(directory, propusk_id)
+    path = _disk_path(directory, propusk_id, etag)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+    _prune(directory)
+
+
+def _remove_files(directory: str, propusk_id: Optional[int] = None) -> None:
+    prefix = f"{propusk_id}-" if propusk_id is not None else ""
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".pdf") and entry.name.startswith(prefix):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def _prune(directory: str) -> None:
+    """Удаляет самые старые файлы сверх PDF_CACHE_DISK_MAX_FILES"""
+    limit = settings.PDF_CACHE_DISK_MAX_FILES
+    entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".pdf")]
+    if limit <= 0 or len(entries) <= limit:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - limit]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def invalidate(propusk_id: int) -> None:
+    """Сбрасывает закэшированный PDF пропуска (после изменения)"""
+    _memory.pop(propusk_id)
+    directory = _disk_dir()
+    if directory:
+        _remove_files(directory, propusk_id)
+
+
+def clear() -> None:
+    """Сбрасывает весь кэш (после сохранения нового шаблона пропуска)"""
+    _memory.clear()
+    directory = _disk_dir()
+    if directory:
+        _remove_files(directory)
@@ -6,13 +6,14 @@ from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.utils import ImageReader
 from io import BytesIO
 from datetime import datetime
-from typing import Optional
+from typing import BinaryIO, Optional
 import os
 
 from models import Propusk
+from pdf_templates import CompiledTemplate, draw_ops, ensure_compiled, get_compiled
+from pdf_output import canvas_options, new_buffer
 
 
 # Глобальная регистрация шрифтов при импорте модуля
@@ -64,17 +65,34 @@ class PropuskPDFGenerator:
     MARGIN = 3 * mm
     
     @staticmethod
-    def generate_propusk_pdf(propusk: Propusk, logo_path: Optional[str] = None, template_data: Optional[dict] = None) -> BytesIO:
+    def _fonts() -> tuple[str, str]:
+        if _FONTS_AVAILABLE:
+            return "DejaVu", "DejaVu-Bold"
+        return "Helvetica", "Helvetica-Bold"
+
+    @staticmethod
+    def compile_template(template) -> Optional[CompiledTemplate]:
+        """План отрисовки шаблона пропуска (кэшируется по id и версии шаблона)"""
+        return get_compiled(template, *PropuskPDFGenerator._fonts(), default_page=(90, 50))
+
+    @staticmethod
+    def _plan(template_data) -> Optional[CompiledTemplate]:
+        return ensure_compiled(template_data, *PropuskPDFGenerator._fonts(), default_page=(90, 50))
+
+    @staticmethod
+    def generate_propusk_pdf(propusk: Propusk, logo_path: Optional[str] = None, template_data=None) -> BytesIO:
         """
         Генерация PDF для одного пропуска
         
         Args:
             propusk: объект пропуска
             logo_path: путь к файлу логотипа (опционально)
+            template_data: план из compile_template() или словарь шаблона
             
         Returns:
             BytesIO: PDF файл в памяти
         """
+        template_data = PropuskPDFGenerator._plan(template_data)
         buffer = BytesIO()
         
         # Создаём PDF
@@ -93,19 +111,22 @@ class PropuskPDFGenerator:
         return buffer
     
     @staticmethod
-    def generate_multiple_propusks_pdf(propusks: list, logo_path: Optional[str] = None, template_data: Optional[dict] = None) -> BytesIO:
+    def generate_multiple_propusks_pdf(propusks: list, logo_path: Optional[str] = None, template_data=None) -> BinaryIO:
         """
         Генерация PDF для нескольких пропусков (на одной странице A4 несколько пропусков)
         
         Args:
             propusks: список объектов пропусков
             logo_path: путь к файлу логотипа
+            template_data: план из compile_template() или словарь шаблона
             
         Returns:
-            BytesIO: PDF файл в памяти
+            PDF файл (в памяти или во временном файле, см. pdf_output)
         """
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
+        # Шаблон разбирается один раз на весь пакет, а не на каждую карточку
+        template_data = PropuskPDFGenerator._plan(template_data)
+        buffer = new_buffer()
+        c = canvas.Canvas(buffer, pagesize=A4, **canvas_options())
         
         # Размещаем пропуска на листе A4 (210 × 297 mm)
         # Делаем 2 колонки × 5 рядов = 10 пропусков на лист с отступами
@@ -277,20 +298,8 @@ class PropuskPDFGenerator:
         date_str = datetime.now().strftime("%Y%m%d")
         return f"propusk_{propusk.id_propusk}_{gos_clean}_{date_str}.pdf"
     @staticmethod
-    def _draw_from_template(c: canvas.Canvas, propusk: Propusk, template: dict):
-        width_mm = template.get("page", {}).get("width_mm", 90)
-        height_mm = template.get("page", {}).get("height_mm", 50)
-        width = width_mm * mm
-        height = height_mm * mm
-
-        if _FONTS_AVAILABLE:
-            font_regular = "DejaVu"
-            font_bold = "DejaVu-Bold"
-        else:
-            font_regular = "Helvetica"
-            font_bold = "Helvetica-Bold"
-
-        meta = template.get("meta", {}) or {}
+    def _draw_from_template(c: canvas.Canvas, propusk: Propusk, template: CompiledTemplate):
+        meta = template.data.get("meta", {}) or {}
         year_mode = meta.get("year_mode", "release_date")
         year_value = meta.get("year_value")
         if year_mode == "fixed" and year_value:
@@ -310,88 +319,4 @@ class PropuskPDFGenerator:
             "release_date": propusk.release_date.strftime("%d.%m.%Y") if propusk.release_date else "",
             "year": year_text,
         }
-
-        def parse_color(value, default=(0, 0, 0)):
-            if not value:
-                return default
-            if isinstance(value, (list, tuple)) and len(value) == 3:
-                return tuple(value)
-            if isinstance(value, str) and value.startswith("#") and len(value) == 7:
-                r = int(value[1:3], 16) / 255.0
-                g = int(value[3:5], 16) / 255.0
-                b = int(value[5:7], 16) / 255.0
-                return (r, g, b)
-            return default
-
-        elements = template.get("elements", [])
-        for el in elements:
-            etype = el.get("type")
-            x_mm = float(el.get("x", 0) or 0)
-            y_mm = float(el.get("y", 0) or 0)
-            w_mm = float(el.get("width", 0) or 0)
-            h_mm = float(el.get("height", 0) or 0)
-            x = x_mm * mm
-            y_top = height - y_mm * mm
-
-            if etype in ("field", "text"):
-                value = el.get("text", "") if etype == "text" else data_map.get(el.get("field"), "")
-                font = el.get("font", font_regular)
-                if font not in ("DejaVu", "DejaVu-Bold", "Helvetica", "Helvetica-Bold"):
-                    font = font_regular
-                if el.get("bold"):
-                    font = font_bold
-                font_size = float(el.get("font_size", 10) or 10)
-                r, g, b = parse_color(el.get("color"))
-                c.setFillColorRGB(r, g, b)
-                c.setFont(font, font_size)
-                y = y_top - font_size
-                align = el.get("align", "left")
-                if align == "center" and w_mm:
-                    c.drawCentredString(x + (w_mm * mm) / 2, y, str(value))
-                elif align == "right" and w_mm:
-                    c.drawRightString(x + (w_mm * mm), y, str(value))
-                else:
-                    c.drawString(x, y, str(value))
-                continue
-
-            if etype == "line":
-                r, g, b = parse_color(el.get("stroke"))
-                c.setStrokeColorRGB(r, g, b)
-                c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-                x2_mm = el.get("x2")
-                y2_mm = el.get("y2")
-                if x2_mm is not None and y2_mm is not None:
-                    x2 = float(x2_mm) * mm
-                    y2 = height - float(y2_mm) * mm
-                else:
-                    x2 = x + w_mm * mm
-                    y2 = y_top - h_mm * mm
-                c.line(x, y_top, x2, y2)
-                continue
-
-            if etype == "rect":
-                r, g, b = parse_color(el.get("stroke"))
-                c.setStrokeColorRGB(r, g, b)
-                c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-                fill = el.get("fill")
-                if fill:
-                    fr, fg, fb = parse_color(fill)
-                    c.setFillColorRGB(fr, fg, fb)
-                    fill_flag = 1
-                else:
-                    fill_flag = 0
-                c.rect(x, y_top - h_mm * mm, w_mm * mm, h_mm * mm, stroke=1, fill=fill_flag)
-                continue
-
-            if etype == "logo":
-                data_url = el.get("data_url")
-                if data_url:
-                    try:
-                        import base64
-                        header, encoded = data_url.split(",", 1)
-                        image_bytes = base64.b64decode(encoded)
-                        img = ImageReader(BytesIO(image_bytes))
-                        c.drawImage(img, x, y_top - h_mm * mm, width=w_mm * mm, height=h_mm * mm, preserveAspectRatio=True)
-                    except Exception:
-                        pass
-        return
+        draw_ops(c, template, data_map)
@@ -0,0 +1,134 @@
+"""
+Сборка PDF-отчётов и пакетной печати пропусков.
+Используется и HTTP-эндпоинтами, и фоновыми заданиями (jobs).
+"""
+from datetime import datetime
+from itertools import groupby
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, contains_eager, joinedload
+
+from config import settings
+from models import Organiz, Propusk, PropuskStatus
+from propusk import counters
+from propusk.pdf_batch import load_active_propusks, render_batch
+from propusk.org_report import compile_report_template, generate_org_report, generate_all_orgs_report
+from propusk.pdf_generator import PropuskPDFGenerator
+from settings.service import get_active_template, get_active_report_template
+
+
+def _free_mesto(org: Organiz) -> int:
+    return org.free_mesto_limit if org.free_mesto_limit is not None else (org.free_mesto or 0)
+
+
+def validate_batch_ids(propusk_ids: List[int]) -> None:
+    if not propusk_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Список пропусков пуст"
+        )
+
+    if len(propusk_ids) > settings.PDF_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Максимум {settings.PDF_BATCH_MAX_ITEMS} пропусков за раз"
+        )
+
+
+def build_batch_pdf(
+    db: Session,
+    propusk_ids: List[int],
+    progress: Optional[Callable[[int], None]] = None
+) -> tuple[BinaryIO, str]:
+    """PDF для нескольких пропусков (по 10 на лист A4)"""
+    validate_batch_ids(propusk_ids)
+
+    # Получаем пропуска одним запросом
+    propusks = load_active_propusks(db, propusk_ids)
+
+    if not propusks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нет активных пропусков для печати"
+        )
+    if progress:
+        progress(10)
+
+    template = get_active_template(db)
+    template_data = PropuskPDFGenerator.compile_template(template)
+    pdf_buffer = render_batch(propusks, template_data=template_data)
+
+    filename = f"propuski_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return pdf_buffer, filename
+
+
+def _active_propusks_query(db: Session):
+    """Активные пропуска с организацией, маркой и абонентом - всё, что печатается в отчёте"""
+    return db.query(Propusk).join(Propusk.organization).options(
+        contains_eager(Propusk.organization),
+        joinedload(Propusk.mark),
+        joinedload(Propusk.abonent),
+    ).filter(Propusk.status == PropuskStatus.ACTIVE)
+
+
+def _iter_org_items(db: Session, progress: Optional[Callable[[int], None]] = None) -> Iterator[dict]:
+    """
+    Данные отчёта по всем организациям одним запросом, по порядку названий.
+    Строки читаются порциями, в памяти держится только текущая организация.
+    """
+    total = counters.get_counts(db).get(PropuskStatus.ACTIVE.value, 0)
+    rows = _active_propusks_query(db).order_by(
+        Organiz.org_name,
+        Organiz.id_org,
+        Propusk.created_at.desc(),
+        Propusk.id_propusk.desc()
+    ).execution_options(yield_per=settings.REPORT_FETCH_BATCH_SIZE)
+
+    done = 0
+    for _, group in groupby(rows, key=lambda propusk: propusk.id_org):
+        propusks = list(group)
+        org = propusks[0].organization
+        done += len(propusks)
+        if progress and total:
+            progress(min(int(done * 90 / total), 90))
+        yield {
+            "org_name": org.org_name,
+            "free_mesto": _free_mesto(org),
+            "permanent_count": len(propusks),
+            "propusks": propusks
+        }
+
+
+def build_all_orgs_report(
+    db: Session,
+    progress: Optional[Callable[[int], None]] = None
+) -> tuple[BinaryIO, str]:
+    """Отчёт по пропускам всех организаций (табличный вид)"""
+    report_template = get_active_report_template(db)
+    template_data = compile_report_template(report_template)
+    pdf_buffer = generate_all_orgs_report(_iter_org_items(db, progress), template_data=template_data)
+    return pdf_buffer, "orgs_report.pdf"
+
+
+def build_org_report(db: Session, org_id: int) -> tuple[BinaryIO, str]:
+    """Отчёт по пропускам организации (табличный вид)"""
+    org = db.query(Organiz).filter(Organiz.id_org == org_id).first()
+    if not org:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Организация не найдена")
+
+    propusks = _active_propusks_query(db).filter(Propusk.id_org == org_id).order_by(
+        Propusk.created_at.desc(),
+        Propusk.id_propusk.desc()
+    ).all()
+
+    report_template = get_active_report_template(db)
+    template_data = compile_report_template(report_template)
+    pdf_buffer = generate_org_report(
+        org_name=org.org_name,
+        free_mesto=_free_mesto(org),
+        permanent_count=len(propusks),
+        propusks=propusks,
+        template_data=template_data
+    )
+    return pdf_buffer, f"org_{org_id}_report.pdf"
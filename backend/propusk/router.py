@@ -1,25 +1,30 @@
 ﻿"""
 API endpoints для пропусков
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
 
-from database import get_db
-from models import User, PropuskStatus, Organiz
+from database import get_db, get_async_db, read_timeout, report_timeout
+from models import User, PropuskStatus
 from propusk.schemas import (
     PropuskCreate, PropuskUpdate, PropuskResponse,
-    PropuskStatusChange, PropuskHistoryResponse, PropuskListResponse, PropuskStatsResponse
+    PropuskStatusChange, PropuskHistoryResponse, PropuskListResponse, PropuskStatsResponse,
+    PropuskLookupResponse
 )
 
 from urllib.parse import quote
 
 from propusk.service import PropuskService
+from pagination import decode_cursor, next_cursor, TOTAL_MODE_PATTERN
 from propusk.pdf_generator import PropuskPDFGenerator
-from propusk.org_report import generate_org_report, generate_all_orgs_report
-from settings.service import get_active_template, get_active_report_template
+from propusk import pdf_cache
+from pdf_output import iter_file
+from propusk.reports import build_batch_pdf, build_all_orgs_report, build_org_report
+from settings.service import get_active_template
 from auth.dependencies import (
     require_view, require_create, require_edit, require_delete, require_annul, require_mark_delete, require_activate,
     require_download_pdf, require_reports_access, get_user_permissions
@@ -74,8 +79,8 @@ def create_propusk(
     return propusk
 
 
-@router.get("", response_model=List[PropuskResponse])
-def get_propusks(
+@router.get("", response_model=List[PropuskResponse], dependencies=[Depends(read_timeout)])
+async def get_propusks(
     status: Optional[PropuskStatus] = Query(None, description="Фильтр по статусу"),
     id_org: Optional[int] = Query(None, description="Фильтр по организации"),
     gos_id: Optional[str] = Query(None, description="Поиск по гос. номеру"),
@@ -86,7 +91,7 @@ def get_propusks(
     search: Optional[str] = Query(None, description="Поиск по номеру или ФИО"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_view)
 ):
     """
@@ -99,8 +104,8 @@ def get_propusks(
             return []
         status = status or allowed_statuses
 
-    propusks = PropuskService.get_propusks(
-        db=db,
+    rows = await db.run_sync(
+        PropuskService.get_propusk_rows,
         status=status,
         id_org=id_org,
         gos_id=gos_id,
@@ -113,18 +118,23 @@ def get_propusks(
         limit=limit
     )
     
-    # Обогащаем данными
-    result = [_enrich_propusk(db, p) for p in propusks]
-    return result
+    return [_row_to_response(row) for row in rows]
 
 
-@router.get("/stats", response_model=PropuskStatsResponse)
-def get_propusk_stats(
-    db: Session = Depends(get_db),
+@router.get("/stats", response_model=PropuskStatsResponse, dependencies=[Depends(read_timeout)])
+async def get_propusk_stats(
+    id_org: Optional[int] = Query(None, description="Только по организации"),
+    created_by: Optional[int] = Query(None, description="Только по создателю"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_view)
 ):
     allowed_statuses = _get_allowed_statuses(current_user)
-    counts = PropuskService.count_by_status(db, allowed_statuses=allowed_statuses)
+    counts = await db.run_sync(
+        PropuskService.count_by_status,
+        allowed_statuses=allowed_statuses,
+        id_org=id_org,
+        created_by=created_by
+    )
     active = counts.get(PropuskStatus.ACTIVE.value, 0)
     draft = counts.get(PropuskStatus.DRAFT.value, 0)
     revoked = counts.get(PropuskStatus.REVOKED.value, 0)
@@ -139,8 +149,8 @@ def get_propusk_stats(
     }
 
 
-@router.get("/paged", response_model=PropuskListResponse)
-def get_propusks_paged(
+@router.get("/paged", response_model=PropuskListResponse, dependencies=[Depends(read_timeout)])
+async def get_propusks_paged(
     status: Optional[PropuskStatus] = Query(None, description="Фильтр по статусу"),
     id_org: Optional[int] = Query(None, description="Фильтр по организации"),
     gos_id: Optional[str] = Query(None, description="Поиск по гос. номеру"),
@@ -151,28 +161,39 @@ def get_propusks_paged(
     search: Optional[str] = Query(None, description="Поиск по номеру или ФИО"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor); skip при этом не используется"),
+    include_total: bool = Query(True, description="Считать общее количество записей"),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact - точно, estimate - оценка планировщика"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_view)
 ):
+    page_cursor = decode_cursor(cursor)
+    if page_cursor is not None:
+        skip = 0
+
     allowed_statuses = _get_allowed_statuses(current_user)
     if allowed_statuses:
         if status and status not in allowed_statuses:
             return {"items": [], "total": 0, "skip": skip, "limit": limit}
         status = status or allowed_statuses
 
-    total = PropuskService.count_propusks(
-        db=db,
-        status=status,
-        id_org=id_org,
-        gos_id=gos_id,
-        id_fio=id_fio,
-        created_by=created_by,
-        date_from=date_from,
-        date_to=date_to,
-        search=search
-    )
-    propusks = PropuskService.get_propusks(
-        db=db,
+    total = None
+    total_exact = True
+    if include_total:
+        total, total_exact = await db.run_sync(
+            PropuskService.total_propusks,
+            total_mode=total_mode,
+            status=status,
+            id_org=id_org,
+            gos_id=gos_id,
+            id_fio=id_fio,
+            created_by=created_by,
+            date_from=date_from,
+            date_to=date_to,
+            search=search
+        )
+    rows = await db.run_sync(
+        PropuskService.get_propusk_rows,
         status=status,
         id_org=id_org,
         gos_id=gos_id,
@@ -182,10 +203,39 @@ def get_propusks_paged(
         date_to=date_to,
         search=search,
         skip=skip,
+        limit=limit,
+        cursor=page_cursor
+    )
+    items = [_row_to_response(row) for row in rows]
+    return {
+        "items": items,
+        "total": total,
+        "total_exact": total_exact,
+        "skip": skip,
+        "limit": limit,
+        "next_cursor": next_cursor(rows, limit, "id_propusk"),
+    }
+
+
+@router.get("/lookup", response_model=List[PropuskLookupResponse], dependencies=[Depends(read_timeout)])
+async def lookup_propusks_by_plate(
+    plate: str = Query(..., min_length=1, max_length=20, description="Гос. номер (полностью или начало)"),
+    prefix: bool = Query(True, description="Искать по началу номера"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_view)
+):
+    """
+    Быстрый поиск пропуска по госномеру для поста охраны.
+    Регистр, пробелы и латинские/кириллические двойники букв не важны.
+    """
+    return await db.run_sync(
+        PropuskService.lookup_by_plate,
+        plate=plate,
+        prefix=prefix,
+        statuses=_get_allowed_statuses(current_user),
         limit=limit
     )
-    items = [_enrich_propusk(db, p) for p in propusks]
-    return {"items": items, "total": total, "skip": skip, "limit": limit}
 
 
 @router.get("/{propusk_id}", response_model=PropuskResponse)
@@ -340,6 +390,25 @@ def archive_propusk(
     return result
 
 
+@router.post("/archive/bulk")
+def archive_revoked_propusks(
+    revoked_before: date = Query(..., description="archive passes revoked before this day"),
+    id_org: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_delete)
+):
+    """
+    Массовое архивирование отозванных пропусков
+    Возвращает число перенесённых пропусков и записей истории, время и скорость переноса
+    """
+    return PropuskService.archive_revoked_bulk(
+        db=db,
+        revoked_before=revoked_before,
+        user_id=current_user.id,
+        id_org=id_org
+    )
+
+
 @router.get("/{propusk_id}/history", response_model=List[PropuskHistoryResponse])
 def get_propusk_history(
     propusk_id: int,
@@ -379,10 +448,11 @@ def get_propusk_history(
 @router.get("/{propusk_id}/pdf")
 def download_propusk_pdf(
     propusk_id: int,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_download_pdf)
 ):
-    propusk = PropuskService.get_propusk_by_id(db, propusk_id)
+    propusk = PropuskService.get_propusk_by_id(db, propusk_id, with_relations=True)
     
     if not propusk:
         raise HTTPException(
@@ -397,17 +467,30 @@ def download_propusk_pdf(
         )
     
     template = get_active_template(db)
-    template_data = template.data_json if template else None
-    pdf_buffer = PropuskPDFGenerator.generate_propusk_pdf(propusk, template_data=template_data)
+    etag = pdf_cache.make_etag(propusk, template)
+    cache_headers = {
+        "ETag": f'"{etag}"',
+        # браузер и PWA хранят файл, но перед использованием переспрашивают сервер
+        "Cache-Control": "private, no-cache",
+    }
+    if pdf_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    content = pdf_cache.get(propusk.id_propusk, etag)
+    if content is None:
+        template_data = PropuskPDFGenerator.compile_template(template)
+        content = PropuskPDFGenerator.generate_propusk_pdf(propusk, template_data=template_data).getvalue()
+        pdf_cache.put(propusk.id_propusk, etag, content)
 
     # корректный UTF-8 filename
     raw_filename = PropuskPDFGenerator.get_filename(propusk)
     encoded_filename = quote(raw_filename)
 
-    return StreamingResponse(
-        pdf_buffer,
+    return Response(
+        content=content,
         media_type="application/pdf",
         headers={
+            **cache_headers,
             "Content-Disposition": (
                 f"attachment; filename*=UTF-8''{encoded_filename}"
             )
@@ -415,7 +498,7 @@ def download_propusk_pdf(
     )
 
 
-@router.post("/pdf/batch")
+@router.post("/pdf/batch", dependencies=[Depends(report_timeout)])
 def download_multiple_propusks_pdf(
     propusk_ids: List[int],
     db: Session = Depends(get_db),
@@ -424,42 +507,10 @@ def download_multiple_propusks_pdf(
     """
     Скачать PDF для нескольких пропусков (на одном листе A4)
     """
-    if not propusk_ids:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Список пропусков пуст"
-        )
-    
-    if len(propusk_ids) > 50:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Максимум 50 пропусков за раз"
-        )
-    
-    # Получаем пропуска
-    propusks = []
-    for pid in propusk_ids:
-        propusk = PropuskService.get_propusk_by_id(db, pid)
-        if propusk and propusk.status == PropuskStatus.ACTIVE:
-            propusks.append(propusk)
-    
-    if not propusks:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Нет активных пропусков для печати"
-        )
-    
-    # Генерируем PDF
-    template = get_active_template(db)
-    template_data = template.data_json if template else None
-    pdf_buffer = PropuskPDFGenerator.generate_multiple_propusks_pdf(propusks, template_data=template_data)
-    
-    # Имя файла
-    from datetime import datetime
-    filename = f"propuski_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    pdf_buffer, filename = build_batch_pdf(db, propusk_ids)
     
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_buffer),
         media_type="application/pdf",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
@@ -467,7 +518,7 @@ def download_multiple_propusks_pdf(
     )
 
 
-@router.get("/reports/org/all/pdf")
+@router.get("/reports/org/all/pdf", dependencies=[Depends(report_timeout)])
 def download_all_orgs_report_pdf(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_reports_access)
@@ -475,40 +526,15 @@ def download_all_orgs_report_pdf(
     """
     Отчёт по пропускам всех организаций (табличный вид).
     """
-    orgs = db.query(Organiz).order_by(Organiz.org_name).all()
-    items = []
-    for org in orgs:
-        propusks = PropuskService.get_propusks(
-            db=db,
-            id_org=org.id_org,
-            status=PropuskStatus.ACTIVE,
-            limit=1000
-        )
-        for p in propusks:
-            _enrich_propusk(db, p)
-        if not propusks:
-            continue
-        items.append(
-            {
-                "org_name": org.org_name,
-                "free_mesto": org.free_mesto_limit if org.free_mesto_limit is not None else (org.free_mesto or 0),
-                "permanent_count": len(propusks),
-                "propusks": propusks
-            }
-        )
-
-    report_template = get_active_report_template(db)
-    template_data = report_template.data_json if report_template else None
-    pdf_buffer = generate_all_orgs_report(items, template_data=template_data)
-    filename = "orgs_report.pdf"
+    pdf_buffer, filename = build_all_orgs_report(db)
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_buffer),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
-@router.get("/reports/org/{org_id}/pdf")
+@router.get("/reports/org/{org_id}/pdf", dependencies=[Depends(report_timeout)])
 def download_org_report_pdf(
     org_id: int,
     db: Session = Depends(get_db),
@@ -517,32 +543,9 @@ def download_org_report_pdf(
     """
     Отчёт по пропускам организации (табличный вид).
     """
-    org = db.query(Organiz).filter(Organiz.id_org == org_id).first()
-    if not org:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Организация не найдена")
-
-    propusks = PropuskService.get_propusks(
-        db=db,
-        id_org=org_id,
-        status=PropuskStatus.ACTIVE,
-        limit=1000
-    )
-
-    for p in propusks:
-        _enrich_propusk(db, p)
-
-    report_template = get_active_report_template(db)
-    template_data = report_template.data_json if report_template else None
-    pdf_buffer = generate_org_report(
-        org_name=org.org_name,
-        free_mesto=org.free_mesto_limit if org.free_mesto_limit is not None else (org.free_mesto or 0),
-        permanent_count=len(propusks),
-        propusks=propusks,
-        template_data=template_data
-    )
-    filename = f"org_{org_id}_report.pdf"
+    pdf_buffer, filename = build_org_report(db, org_id)
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_buffer),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -573,3 +576,13 @@ def _enrich_propusk(db: Session, propusk) -> PropuskResponse:
         propusk.creator_name = propusk.creator.full_name
     
     return propusk
+
+
+def _row_to_response(row: dict) -> PropuskResponse:
+    """
+    Строка из PropuskService.get_propusk_rows уже содержит все поля ответа,
+    поэтому модель собирается из неё напрямую, без ORM-объекта и _enrich_propusk
+    (при отдаче FastAPI всё равно проверяет ответ по response_model).
+    Совпадение с ORM-путём: python test_propusk_rows.py
+    """
+    return PropuskResponse.model_construct(**row)
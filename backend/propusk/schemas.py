@@ -63,9 +63,20 @@ class PropuskResponse(PropuskBase):
 
 class PropuskListResponse(BaseModel):
     items: List[PropuskResponse]
-    total: int
+    total: Optional[int] = None
+    total_exact: bool = True
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class PropuskLookupResponse(BaseModel):
+    id_propusk: int
+    gos_id: str
+    status: PropuskStatus
+    valid_until: date
+    id_org: int
+    org_name: Optional[str] = None
 
 
 class PropuskStatsResponse(BaseModel):
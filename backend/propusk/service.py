@@ -1,19 +1,26 @@
 ﻿"""
 Сервис для работы с пропусками
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, text
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_, func, text, select, union
 from sqlalchemy.exc import IntegrityError
 from psycopg.errors import UniqueViolation
 from fastapi import HTTPException, status
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime, time as dt_time
+from zoneinfo import ZoneInfo
 import json
+import time
 
 from models import (
     Propusk, PropuskStatus, PropuskArchive, PropuskHistory, 
-    HistoryAction, User, UserRole, Organiz, MarkAuto, ModelAuto, Abonent
+    HistoryAction, User, UserRole, Organiz, MarkAuto, ModelAuto, Abonent,
+    normalize_plate
 )
+from gate.service import GateService
+from propusk import counters, pdf_cache
+from pagination import apply_keyset, invalidate_totals, resolve_total
+from config import settings
 
 
 class PropuskService:
@@ -55,6 +62,8 @@ class PropuskService:
             ))
             db.commit()
             propusk = _insert_propusk()
+
+        counters.change(db, new=counters.snapshot(propusk))
         
         # Записываем в историю
         PropuskService._add_history(
@@ -66,6 +75,7 @@ class PropuskService:
             comment="Пропуск создан"
         )
         
+        invalidate_totals(db, "propusk")
         db.commit()
         db.refresh(propusk)
         return propusk
@@ -103,10 +113,14 @@ class PropuskService:
             "info": propusk.info
         }
         
+        old_state = counters.snapshot(propusk)
+
         # Обновляем поля
         for field, value in update_data.items():
             if value is not None and hasattr(propusk, field):
                 setattr(propusk, field, value)
+
+        counters.change(db, old=old_state, new=counters.snapshot(propusk))
         
         # Записываем в историю
         PropuskService._add_history(
@@ -119,7 +133,11 @@ class PropuskService:
             comment="Пропуск изменён"
         )
         
+        invalidate_totals(db, "propusk")
+        GateService.invalidate(db, old_values["gos_id"])
+        GateService.invalidate(db, propusk.gos_id)
         db.commit()
+        pdf_cache.invalidate(propusk.id_propusk)
         db.refresh(propusk)
         return propusk
     
@@ -143,7 +161,9 @@ class PropuskService:
                 detail=f"Нельзя активировать пропуск в статусе '{propusk.status.value}'"
             )
         
+        old_state = counters.snapshot(propusk)
         propusk.status = PropuskStatus.ACTIVE
+        counters.change(db, old=old_state, new=counters.snapshot(propusk))
         
         PropuskService._add_history(
             db=db,
@@ -155,6 +175,8 @@ class PropuskService:
             comment=comment or "Пропуск активирован"
         )
         
+        invalidate_totals(db, "propusk")
+        GateService.invalidate(db, propusk.gos_id)
         db.commit()
         db.refresh(propusk)
         return propusk
@@ -179,7 +201,9 @@ class PropuskService:
                 detail=f"Нельзя пометить на удаление пропуск в статусе '{propusk.status.value}'"
             )
         
+        old_state = counters.snapshot(propusk)
         propusk.status = PropuskStatus.PENDING_DELETE
+        counters.change(db, old=old_state, new=counters.snapshot(propusk))
         
         PropuskService._add_history(
             db=db,
@@ -191,6 +215,8 @@ class PropuskService:
             comment=comment or "Помечен на удаление"
         )
         
+        invalidate_totals(db, "propusk")
+        GateService.invalidate(db, propusk.gos_id)
         db.commit()
         db.refresh(propusk)
         return propusk
@@ -216,7 +242,9 @@ class PropuskService:
             )
         
         old_status = propusk.status.value
+        old_state = counters.snapshot(propusk)
         propusk.status = PropuskStatus.REVOKED
+        counters.change(db, old=old_state, new=counters.snapshot(propusk))
         
         PropuskService._add_history(
             db=db,
@@ -228,6 +256,8 @@ class PropuskService:
             comment=comment or "Пропуск отозван"
         )
         
+        invalidate_totals(db, "propusk")
+        GateService.invalidate(db, propusk.gos_id)
         db.commit()
         db.refresh(propusk)
         return propusk
@@ -272,16 +302,165 @@ class PropuskService:
         
         db.add(archive)
         
+        # История переезжает в propusk_history_archive, каскад удаляет уже пустой список
+        PropuskService._archive_history(db, [propusk.id_propusk])
+        db.expire(propusk, ["history"])
+
         # Удаляем из основной таблицы
+        counters.change(db, old=counters.snapshot(propusk))
         db.delete(propusk)
         
+        invalidate_totals(db, "propusk")
         db.commit()
+        pdf_cache.invalidate(archive.id_propusk)
         
         return {
             "message": "Пропуск успешно архивирован",
             "archive_id": archive.id,
             "original_id": archive.id_propusk
         }
+
+    _ARCHIVE_HISTORY_SQL = text("""
+        WITH moved AS (
+            DELETE FROM propusk_history
+            WHERE id_propusk = ANY(CAST(:ids AS integer[]))
+            RETURNING id, id_propusk, action, changed_by, old_values, new_values, comment, timestamp
+        ),
+        archived AS (
+            INSERT INTO propusk_history_archive (
+                id, id_propusk, action, changed_by, old_values, new_values, comment, timestamp
+            )
+            SELECT id, id_propusk, lower(CAST(action AS text)), changed_by, old_values, new_values, comment, timestamp
+            FROM moved
+            RETURNING 1
+        )
+        SELECT count(*) FROM archived
+    """)
+
+    _RESTORE_HISTORY_SQL = text("""
+        WITH moved AS (
+            DELETE FROM propusk_history_archive
+            WHERE id_propusk = :id_propusk
+            RETURNING id, id_propusk, action, changed_by, old_values, new_values, comment, timestamp
+        )
+        INSERT INTO propusk_history (
+            id, id_propusk, action, changed_by, old_values, new_values, comment, timestamp
+        )
+        SELECT id, id_propusk, CAST(upper(action) AS historyaction), changed_by, old_values, new_values, comment, timestamp
+        FROM moved
+    """)
+
+    # Строки propusk_history уже перенесены: внешний ключ на propusk не мешает удалению
+    _ARCHIVE_BATCH_SQL = text("""
+        WITH moved AS (
+            DELETE FROM propusk
+            WHERE id_propusk = ANY(CAST(:ids AS integer[]))
+            RETURNING id_propusk, gos_id, gos_id_norm, id_mark_auto, id_model_auto, id_org,
+                release_date, valid_until, id_fio, info, created_by, created_at
+        ),
+        archived AS (
+            INSERT INTO propusk_archive (
+                id_propusk, gos_id, gos_id_norm, id_mark_auto, id_model_auto, id_org,
+                release_date, valid_until, id_fio, status, info, created_by, created_at, archived_by
+            )
+            SELECT
+                id_propusk, gos_id, gos_id_norm, id_mark_auto, id_model_auto, id_org,
+                release_date, valid_until, id_fio, CAST(:status AS varchar), info, created_by,
+                COALESCE(created_at, now()), CAST(:archived_by AS integer)
+            FROM moved
+            RETURNING id_org, created_by
+        )
+        SELECT id_org, created_by, count(*) AS moved
+        FROM archived
+        GROUP BY id_org, created_by
+    """)
+
+    @staticmethod
+    def _archive_history(db: Session, ids: List[int]) -> int:
+        return db.execute(PropuskService._ARCHIVE_HISTORY_SQL, {"ids": ids}).scalar() or 0
+
+    @staticmethod
+    def _restore_history(db: Session, propusk_id: int) -> None:
+        db.execute(PropuskService._RESTORE_HISTORY_SQL, {"id_propusk": propusk_id})
+
+    @staticmethod
+    def _revoked_before_query(db: Session, id_org: Optional[int], revoked_before: date):
+        """Отозванные пропуска, последний отзыв которых был до начала дня revoked_before"""
+        tzinfo = ZoneInfo(settings.TIMEZONE) if settings.TIMEZONE else datetime.now().astimezone().tzinfo
+        cutoff = datetime.combine(revoked_before, dt_time(0, 0), tzinfo=tzinfo)
+        last_revoked = (
+            select(func.max(PropuskHistory.timestamp))
+            .where(
+                PropuskHistory.id_propusk == Propusk.id_propusk,
+                PropuskHistory.action == HistoryAction.REVOKED,
+            )
+            .correlate(Propusk)
+            .scalar_subquery()
+        )
+        query = db.query(Propusk.id_propusk).filter(
+            Propusk.status == PropuskStatus.REVOKED,
+            # Для пропусков без записи об отзыве в истории - время последнего изменения
+            func.coalesce(last_revoked, Propusk.updated_at, Propusk.created_at) < cutoff,
+        )
+        if id_org:
+            query = query.filter(Propusk.id_org == id_org)
+        return query
+
+    @staticmethod
+    def archive_revoked_bulk(
+        db: Session,
+        revoked_before: date,
+        user_id: int,
+        id_org: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> dict:
+        """
+        Массовое архивирование отозванных пропусков (по организации и дате отзыва).
+        Порция за транзакцию: история и пропуска переносятся INSERT ... SELECT из DELETE ... RETURNING,
+        прерванный перенос продолжается повторным вызовом.
+        """
+        batch_size = batch_size or settings.PROPUSK_ARCHIVE_BATCH_SIZE
+        started = time.perf_counter()
+        archived = history = batches = 0
+        while True:
+            # Строки, занятые другой транзакцией (отзыв/восстановление), пропускаем
+            ids = [
+                row.id_propusk
+                for row in PropuskService._revoked_before_query(db, id_org, revoked_before)
+                .order_by(Propusk.id_propusk)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True, of=Propusk)
+            ]
+            if not ids:
+                db.rollback()
+                break
+            history += PropuskService._archive_history(db, ids)
+            groups = {
+                (row.id_org, row.created_by): int(row.moved)
+                for row in db.execute(
+                    PropuskService._ARCHIVE_BATCH_SQL,
+                    {"ids": ids, "status": PropuskStatus.REVOKED.value, "archived_by": user_id},
+                )
+            }
+            counters.remove_many(db, PropuskStatus.REVOKED, groups)
+            invalidate_totals(db, "propusk")
+            db.commit()
+            archived += sum(groups.values())
+            batches += 1
+            for propusk_id in ids:
+                pdf_cache.invalidate(propusk_id)
+            if len(ids) < batch_size:
+                break
+
+        elapsed = time.perf_counter() - started
+        return {
+            "archived": archived,
+            "history_archived": history,
+            "batches": batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "per_second": round(archived / elapsed, 1) if elapsed > 0 else None,
+        }
+
     @staticmethod
     def restore_propusk(db: Session, propusk_id: int, user_id: int, comment: Optional[str] = None) -> Propusk:
         """
@@ -297,7 +476,9 @@ class PropuskService:
                     detail="Можно восстановить только аннулированный пропуск"
                 )
             old_status = propusk.status.value
+            old_state = counters.snapshot(propusk)
             propusk.status = PropuskStatus.DRAFT
+            counters.change(db, old=old_state, new=counters.snapshot(propusk))
             PropuskService._add_history(
                 db=db,
                 propusk_id=propusk.id_propusk,
@@ -307,6 +488,7 @@ class PropuskService:
                 new_values=json.dumps({"status": PropuskStatus.DRAFT.value}),
                 comment=comment or "Пропуск восстановлен"
             )
+            invalidate_totals(db, "propusk")
             db.commit()
             db.refresh(propusk)
             return propusk
@@ -348,6 +530,9 @@ class PropuskService:
 
         db.add(propusk)
         db.delete(archive)
+        db.flush()
+        PropuskService._restore_history(db, propusk.id_propusk)
+        counters.change(db, new=counters.snapshot(propusk))
 
         PropuskService._add_history(
             db=db,
@@ -359,14 +544,23 @@ class PropuskService:
             comment=comment or "Пропуск восстановлен из архива"
         )
 
+        invalidate_totals(db, "propusk")
         db.commit()
         db.refresh(propusk)
         return propusk
     
     @staticmethod
-    def get_propusk_by_id(db: Session, propusk_id: int) -> Optional[Propusk]:
-        """Получение пропуска по ID"""
-        return db.query(Propusk).filter(Propusk.id_propusk == propusk_id).first()
+    def get_propusk_by_id(db: Session, propusk_id: int, with_relations: bool = False) -> Optional[Propusk]:
+        """
+        Получение пропуска по ID
+
+        with_relations=True подгружает марку, модель, организацию, абонента
+        и создателя тем же запросом (для карточки PDF и её ETag).
+        """
+        query = db.query(Propusk)
+        if with_relations:
+            query = query.options(*PropuskService._listing_options())
+        return query.filter(Propusk.id_propusk == propusk_id).first()
     
     @staticmethod
     def get_propusks(
@@ -385,9 +579,153 @@ class PropuskService:
         """
         Получение списка пропусков с фильтрацией
         """
-        query = db.query(Propusk)
+        query = PropuskService._apply_filters(
+            db.query(Propusk),
+            status=status,
+            id_org=id_org,
+            gos_id=gos_id,
+            id_fio=id_fio,
+            created_by=created_by,
+            date_from=date_from,
+            date_to=date_to,
+            search=search
+        )
         
-        # Фильтры
+        return query.order_by(Propusk.created_at.desc(), Propusk.id_propusk.desc())\
+            .offset(skip).limit(limit).all()
+
+    @staticmethod
+    def get_propusk_rows(
+        db: Session,
+        status: Optional[object] = None,
+        id_org: Optional[int] = None,
+        gos_id: Optional[str] = None,
+        id_fio: Optional[int] = None,
+        created_by: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[tuple] = None
+    ) -> List[dict]:
+        """
+        Плоская выборка для списков: только поля PropuskResponse
+        и названия из справочников, без создания ORM-объектов Propusk.
+        С cursor (created_at, id_propusk) страница берётся после курсора, skip не используется.
+        """
+        query = db.query(
+            Propusk.id_propusk,
+            Propusk.gos_id,
+            Propusk.id_mark_auto,
+            Propusk.id_model_auto,
+            Propusk.id_org,
+            Propusk.pass_type,
+            Propusk.release_date,
+            Propusk.valid_until,
+            Propusk.id_fio,
+            Propusk.info,
+            Propusk.status,
+            Propusk.created_by,
+            Propusk.created_at,
+            Propusk.updated_at,
+            MarkAuto.mark_name,
+            ModelAuto.model_name,
+            Organiz.org_name,
+            # То же, что Abonent.full_name: пустое отчество пропускается
+            func.concat_ws(
+                " ", Abonent.surname, Abonent.name, func.nullif(Abonent.otchestvo, "")
+            ).label("abonent_fio"),
+            User.full_name.label("creator_name"),
+        )\
+            .select_from(Propusk)\
+            .outerjoin(MarkAuto, MarkAuto.id_mark == Propusk.id_mark_auto)\
+            .outerjoin(ModelAuto, ModelAuto.id_model == Propusk.id_model_auto)\
+            .outerjoin(Organiz, Organiz.id_org == Propusk.id_org)\
+            .outerjoin(Abonent, Abonent.id_fio == Propusk.id_fio)\
+            .outerjoin(User, User.id == Propusk.created_by)
+
+        query = PropuskService._apply_filters(
+            query,
+            status=status,
+            id_org=id_org,
+            gos_id=gos_id,
+            id_fio=id_fio,
+            created_by=created_by,
+            date_from=date_from,
+            date_to=date_to,
+            search=search
+        )
+
+        if cursor is not None:
+            query = apply_keyset(query, Propusk.created_at, Propusk.id_propusk, cursor)
+            skip = 0
+
+        rows = query.order_by(Propusk.created_at.desc(), Propusk.id_propusk.desc())\
+            .offset(skip).limit(limit).all()
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def lookup_by_plate(
+        db: Session,
+        plate: str,
+        prefix: bool = True,
+        statuses: Optional[list] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        """
+        Поиск по нормализованному госномеру (точное совпадение или префикс).
+        Идёт по индексу ix_propusk_gos_id_norm (varchar_pattern_ops).
+        """
+        plate_norm = normalize_plate(plate)
+        if not plate_norm:
+            return []
+
+        query = db.query(
+            Propusk.id_propusk,
+            Propusk.gos_id,
+            Propusk.status,
+            Propusk.valid_until,
+            Propusk.id_org,
+            Organiz.org_name,
+        ).outerjoin(Organiz, Organiz.id_org == Propusk.id_org)
+
+        if prefix:
+            # В нормализованном номере только буквы и цифры, экранирование не нужно
+            query = query.filter(Propusk.gos_id_norm.like(f"{plate_norm}%"))
+        else:
+            query = query.filter(Propusk.gos_id_norm == plate_norm)
+
+        if statuses:
+            query = query.filter(Propusk.status.in_(list(statuses)))
+
+        rows = query.order_by(Propusk.gos_id_norm, Propusk.id_propusk).limit(limit).all()
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def _listing_options() -> list:
+        """Опции загрузки связей, которые читают _enrich_propusk и карточка PDF"""
+        return [
+            joinedload(Propusk.mark),
+            joinedload(Propusk.model),
+            joinedload(Propusk.organization),
+            joinedload(Propusk.abonent),
+            joinedload(Propusk.creator),
+        ]
+
+    @staticmethod
+    def _apply_filters(
+        query,
+        status: Optional[object] = None,
+        id_org: Optional[int] = None,
+        gos_id: Optional[str] = None,
+        id_fio: Optional[int] = None,
+        created_by: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        search: Optional[str] = None
+    ):
+        """Общие фильтры списка, выборки строк и подсчёта"""
         if status:
             if isinstance(status, (list, tuple, set)):
                 query = query.filter(Propusk.status.in_(list(status)))
@@ -412,19 +750,27 @@ class PropuskService:
         if date_to:
             query = query.filter(Propusk.valid_until <= date_to)
 
-        # Поиск по гос. номеру или ФИО владельца
+        # Поиск по гос. номеру, организации или ФИО владельца.
+        # Совпадения собираются одним UNION по id: подзапросы внутри OR PostgreSQL
+        # выполняет фильтром по всей таблице, а у каждой ветки UNION свой индекс
+        # (GIN pg_trgm по gos_id, ix_propusk_id_org, ix_propusk_id_fio).
         if search:
-            query = query.join(Abonent).join(Organiz).filter(
+            pattern = f"%{search}%"
+            org_ids = select(Organiz.id_org).where(Organiz.org_name.ilike(pattern))
+            abonent_ids = select(Abonent.id_fio).where(
                 or_(
-                    Propusk.gos_id.ilike(f"%{search}%"),
-                    Organiz.org_name.ilike(f"%{search}%"),
-                    Abonent.surname.ilike(f"%{search}%"),
-                    Abonent.name.ilike(f"%{search}%"),
-                    Abonent.otchestvo.ilike(f"%{search}%")
+                    Abonent.surname.ilike(pattern),
+                    Abonent.name.ilike(pattern),
+                    Abonent.otchestvo.ilike(pattern)
                 )
             )
-        
-        return query.order_by(Propusk.created_at.desc()).offset(skip).limit(limit).all()
+            matched_ids = union(
+                select(Propusk.id_propusk).where(Propusk.gos_id.ilike(pattern)),
+                select(Propusk.id_propusk).where(Propusk.id_org.in_(org_ids)),
+                select(Propusk.id_propusk).where(Propusk.id_fio.in_(abonent_ids)),
+            )
+            query = query.filter(Propusk.id_propusk.in_(matched_ids))
+        return query
 
     @staticmethod
     def count_propusks(
@@ -439,58 +785,80 @@ class PropuskService:
         search: Optional[str] = None
     ) -> int:
         query = db.query(func.count(Propusk.id_propusk))
-
-        if status:
-            if isinstance(status, (list, tuple, set)):
-                query = query.filter(Propusk.status.in_(list(status)))
-            else:
-                query = query.filter(Propusk.status == status)
-
-        if id_org:
-            query = query.filter(Propusk.id_org == id_org)
-
-        if gos_id:
-            query = query.filter(Propusk.gos_id.ilike(f"%{gos_id}%"))
-
-        if id_fio:
-            query = query.filter(Propusk.id_fio == id_fio)
-
-        if created_by:
-            query = query.filter(Propusk.created_by == created_by)
-
-        if date_from:
-            query = query.filter(Propusk.release_date >= date_from)
-        
-        if date_to:
-            query = query.filter(Propusk.valid_until <= date_to)
-
-        if search:
-            query = query.join(Abonent).join(Organiz).filter(
-                or_(
-                    Propusk.gos_id.ilike(f"%{search}%"),
-                    Organiz.org_name.ilike(f"%{search}%"),
-                    Abonent.surname.ilike(f"%{search}%"),
-                    Abonent.name.ilike(f"%{search}%"),
-                    Abonent.otchestvo.ilike(f"%{search}%")
-                )
-            )
+        query = PropuskService._apply_filters(
+            query,
+            status=status,
+            id_org=id_org,
+            gos_id=gos_id,
+            id_fio=id_fio,
+            created_by=created_by,
+            date_from=date_from,
+            date_to=date_to,
+            search=search
+        )
 
         total = query.scalar()
         return int(total or 0)
 
+    @staticmethod
+    def total_propusks(
+        db: Session,
+        total_mode: str = "exact",
+        status: Optional[object] = None,
+        id_org: Optional[int] = None,
+        gos_id: Optional[str] = None,
+        id_fio: Optional[int] = None,
+        created_by: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        search: Optional[str] = None
+    ) -> tuple[int, bool]:
+        """
+        Общее количество для постраничного списка: (total, total_exact).
+        Точный подсчёт кэшируется до изменения пропусков, estimate берёт оценку планировщика.
+        """
+        filters = {
+            "status": status,
+            "id_org": id_org,
+            "gos_id": gos_id,
+            "id_fio": id_fio,
+            "created_by": created_by,
+            "date_from": date_from,
+            "date_to": date_to,
+            "search": search,
+        }
+        return resolve_total(
+            db,
+            "propusk",
+            filters,
+            count=lambda: PropuskService.count_propusks(db, **filters),
+            rows_query=PropuskService._apply_filters(db.query(Propusk.id_propusk), **filters),
+            total_mode=total_mode,
+        )
+
     @staticmethod
     def count_by_status(
         db: Session,
-        allowed_statuses: Optional[list] = None
+        allowed_statuses: Optional[list] = None,
+        id_org: Optional[int] = None,
+        created_by: Optional[int] = None
     ) -> dict:
-        query = db.query(Propusk.status, func.count(Propusk.id_propusk))
+        """
+        Количество пропусков по статусам из таблицы счётчиков (propusk/counters.py),
+        всего или по организации / создателю.
+        """
+        if id_org:
+            counts = counters.get_counts(db, counters.SCOPE_ORG, id_org)
+        elif created_by:
+            counts = counters.get_counts(db, counters.SCOPE_CREATOR, created_by)
+        else:
+            counts = counters.get_counts(db)
         if allowed_statuses:
-            query = query.filter(Propusk.status.in_(allowed_statuses))
-        rows = query.group_by(Propusk.status).all()
-        counts = {}
-        for status, count in rows:
-            key = status.value if hasattr(status, "value") else str(status)
-            counts[key] = int(count)
+            allowed = {
+                status.value if hasattr(status, "value") else str(status)
+                for status in allowed_statuses
+            }
+            counts = {key: value for key, value in counts.items() if key in allowed}
         return counts
     
     @staticmethod
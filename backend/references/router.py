@@ -17,6 +17,7 @@ from references.schemas import (
     AbonentCreate, AbonentUpdate, AbonentResponse, AbonentListResponse
 )
 from auth.dependencies import require_auth, require_admin, require_edit_organization
+from pagination import invalidate_totals, resolve_total, TOTAL_MODE_PATTERN
 
 
 router = APIRouter(prefix="/api/references", tags=["Справочники"])
@@ -134,6 +135,8 @@ def update_organization(
     for field, value in update_data.items():
         setattr(org, field, value)
     
+    # Поиск пропусков идёт и по названию организации
+    invalidate_totals(db, "propusk")
     db.commit()
     db.refresh(org)
     return org
@@ -414,6 +417,7 @@ def get_abonents_paged(
     search: Optional[str] = Query(None, description="Поиск по ФИО"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact - точно, estimate - оценка планировщика"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_auth)
 ):
@@ -430,14 +434,27 @@ def get_abonents_paged(
             (Abonent.otchestvo.ilike(search_filter))
         )
 
-    total = query.with_entities(func.count(Abonent.id_fio)).scalar()
+    total, total_exact = resolve_total(
+        db,
+        "abonent",
+        {"org_id": org_id, "search": search},
+        count=lambda: int(query.with_entities(func.count(Abonent.id_fio)).scalar() or 0),
+        rows_query=query.with_entities(Abonent.id_fio),
+        total_mode=total_mode,
+    )
     abonents = query.order_by(Abonent.surname, Abonent.name).offset(skip).limit(limit).all()
 
     for abonent in abonents:
         if abonent.organization:
             abonent.org_name = abonent.organization.org_name
 
-    return {"items": abonents, "total": int(total or 0), "skip": skip, "limit": limit}
+    return {
+        "items": abonents,
+        "total": total,
+        "total_exact": total_exact,
+        "skip": skip,
+        "limit": limit,
+    }
 
 
 @router.post("/abonents", response_model=AbonentResponse, status_code=status.HTTP_201_CREATED)
@@ -458,6 +475,7 @@ def create_abonent(
     def _insert_abonent() -> Abonent:
         abonent = Abonent(**abonent_data.dict())
         db.add(abonent)
+        invalidate_totals(db, "abonent")
         db.commit()
         db.refresh(abonent)
         return abonent
@@ -521,6 +539,8 @@ def update_abonent(
     for field, value in update_data.items():
         setattr(abonent, field, value)
     
+    # Поиск пропусков идёт и по ФИО владельца
+    invalidate_totals(db, "abonent", "propusk")
     db.commit()
     db.refresh(abonent)
     
@@ -551,5 +571,6 @@ def delete_abonent(
         )
     
     db.delete(abonent)
+    invalidate_totals(db, "abonent")
     db.commit()
     return {"message": "Абонент успешно удалён"}
@@ -119,6 +119,7 @@ class AbonentResponse(BaseModel):
 class AbonentListResponse(BaseModel):
     items: List[AbonentResponse]
     total: int
+    total_exact: bool = True
     skip: int
     limit: int
 
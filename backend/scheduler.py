@@ -0,0 +1,100 @@
+"""
+Фоновые периодические задачи приложения (запускаются из lifespan в main.py)
+"""
+from threading import Event, Thread
+from typing import Callable, List
+import traceback
+
+from config import settings
+from database import SessionLocal
+
+
+class PeriodicTask:
+    """Задача в отдельном daemon-потоке: выполняется сразу при старте и затем раз в interval секунд"""
+
+    def __init__(self, name: str, interval: float, func: Callable):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.func()
+            except Exception:
+                print(f"❌ Фоновая задача {self.name} завершилась с ошибкой:")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        self._thread = Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def _reconcile_propusk_counters() -> None:
+    from propusk import counters
+
+    db = SessionLocal()
+    try:
+        fixed = counters.reconcile(db)
+        if fixed:
+            print(f"⚠️  Счётчики пропусков расходились с таблицей, исправлено строк: {fixed}")
+    finally:
+        db.close()
+
+
+def _print_jobs_maintenance() -> None:
+    from jobs.worker import maintenance
+
+    maintenance()
+
+
+def _archive_temporary_passes() -> None:
+    from temporary_pass.service import TemporaryPassService
+
+    db = SessionLocal()
+    try:
+        archived = TemporaryPassService.archive_closed_months(db, settings.TEMP_PASS_AUTO_ARCHIVE_KEEP_MONTHS)
+        if archived:
+            print(f"📦 Временные пропуска закрытых месяцев перенесены в архив: {archived}")
+    finally:
+        db.close()
+
+
+def start_scheduler() -> None:
+    if settings.JOBS_MAINTENANCE_SECONDS > 0:
+        _tasks.append(PeriodicTask(
+            "print-jobs-maintenance",
+            settings.JOBS_MAINTENANCE_SECONDS,
+            _print_jobs_maintenance,
+        ))
+    if settings.PROPUSK_COUNTERS_RECONCILE_SECONDS > 0:
+        _tasks.append(PeriodicTask(
+            "propusk-counters",
+            settings.PROPUSK_COUNTERS_RECONCILE_SECONDS,
+            _reconcile_propusk_counters,
+        ))
+    if settings.TEMP_PASS_AUTO_ARCHIVE_SECONDS > 0:
+        _tasks.append(PeriodicTask(
+            "temp-pass-archive",
+            settings.TEMP_PASS_AUTO_ARCHIVE_SECONDS,
+            _archive_temporary_passes,
+        ))
+    for task in _tasks:
+        task.start()
+
+
+def stop_scheduler() -> None:
+    for task in _tasks:
+        task.stop()
+    _tasks.clear()
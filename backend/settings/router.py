@@ -2,7 +2,7 @@ import json
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, pool_status
 from models import User, PropuskTemplate, TemporaryPassTemplate, TemporaryPassReportTemplate
 from auth.dependencies import require_admin
 from settings.schemas import PropuskTemplatePayload, PropuskTemplateResponse, ApiTogglePayload, ApiToggleResponse, DocsTogglePayload, DocsToggleResponse
@@ -29,6 +29,14 @@ from settings.service import (
 router = APIRouter(prefix="/api/settings", tags=["Settings"])
 
 
+@router.get("/db-pool")
+def get_db_pool_state(
+    current_user: User = Depends(require_admin),
+):
+    """Пулы соединений этого воркера: занято/свободно, сколько ждали соединение"""
+    return pool_status()
+
+
 @router.get("/api-enabled", response_model=ApiToggleResponse)
 def get_api_enabled_state(
     db: Session = Depends(get_db),
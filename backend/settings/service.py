@@ -1,7 +1,17 @@
 import json
+from typing import Optional
 from sqlalchemy.orm import Session
 
+import cache_bus
+from cache import TTLCache
+from config import settings
 from models import PropuskTemplate, ReportTemplate, AppSetting, TemporaryPassTemplate, TemporaryPassReportTemplate
+from propusk import pdf_cache
+
+
+# Флаги api_enabled/docs_enabled для middleware: читаются из БД не чаще раза в TTL
+_flags = TTLCache(maxsize=8, ttl=settings.APP_SETTINGS_CACHE_TTL_SECONDS)
+_FLAGS_TOPIC = "app_setting"
 
 
 def get_active_template(db: Session):
@@ -33,6 +43,8 @@ def save_template(db: Session, data: dict, created_by: int) -> PropuskTemplate:
     recent_ids = {t.id for t in recent}
     db.query(PropuskTemplate).filter(~PropuskTemplate.id.in_(recent_ids)).delete(synchronize_session=False)
     db.commit()
+    # новый шаблон меняет ключ кэша, старые PDF больше не понадобятся
+    pdf_cache.clear()
 
     return template
 
@@ -154,7 +166,9 @@ def set_api_enabled(db: Session, enabled: bool) -> AppSetting:
         db.add(setting)
     else:
         setting.value = json.dumps(bool(enabled))
+    cache_bus.publish(db, _FLAGS_TOPIC, "api_enabled")
     db.commit()
+    _flags.pop("api_enabled")
     db.refresh(setting)
     return setting
 
@@ -180,6 +194,36 @@ def set_docs_enabled(db: Session, enabled: bool) -> AppSetting:
         db.add(setting)
     else:
         setting.value = json.dumps(bool(enabled))
+    cache_bus.publish(db, _FLAGS_TOPIC, "docs_enabled")
     db.commit()
+    _flags.pop("docs_enabled")
     db.refresh(setting)
     return setting
+
+
+_FLAG_LOADERS = {
+    "api_enabled": get_api_enabled,
+    "docs_enabled": get_docs_enabled,
+}
+
+
+def get_cached_flag(key: str) -> Optional[bool]:
+    """Значение из кэша процесса или None, если его нужно прочитать из БД"""
+    return _flags.get(key)
+
+
+def load_flag(db: Session, key: str) -> bool:
+    """Читает флаг из БД и кладёт в кэш (вызывается через RequestDB.run_sync)"""
+    value = _FLAG_LOADERS[key](db)
+    _flags.set(key, value)
+    return value
+
+
+def _invalidate_flags(payload: str) -> None:
+    if payload:
+        _flags.pop(payload)
+    else:
+        _flags.clear()
+
+
+cache_bus.subscribe(_FLAGS_TOPIC, _invalidate_flags)
@@ -9,6 +9,8 @@ from io import BytesIO
 from datetime import datetime
 import os
 
+from pdf_templates import CompiledTemplate, draw_ops, ensure_compiled, get_compiled
+
 
 def _register_fonts():
     try:
@@ -34,7 +36,19 @@ class TemporaryPassPDFGenerator:
     MARGIN = 3 * mm
 
     @staticmethod
-    def generate_pdf(temp_pass, template_data: dict | None = None) -> BytesIO:
+    def _fonts() -> tuple[str, str]:
+        if _FONTS_AVAILABLE:
+            return "DejaVu", "DejaVu-Bold"
+        return "Helvetica", "Helvetica-Bold"
+
+    @staticmethod
+    def compile_template(template) -> CompiledTemplate | None:
+        """Plan for the temporary pass template, cached by template id and version."""
+        return get_compiled(template, *TemporaryPassPDFGenerator._fonts(), default_page=(90, 50))
+
+    @staticmethod
+    def generate_pdf(temp_pass, template_data=None) -> BytesIO:
+        template_data = ensure_compiled(template_data, *TemporaryPassPDFGenerator._fonts(), default_page=(90, 50))
         buffer = BytesIO()
         c = canvas.Canvas(buffer, pagesize=(TemporaryPassPDFGenerator.WIDTH, TemporaryPassPDFGenerator.HEIGHT))
         if template_data:
@@ -109,19 +123,7 @@ class TemporaryPassPDFGenerator:
         return dt.strftime("%d.%m.%Y %H:%M")
 
     @staticmethod
-    def _draw_from_template(c: canvas.Canvas, temp_pass, template: dict):
-        width_mm = template.get("page", {}).get("width_mm", 90)
-        height_mm = template.get("page", {}).get("height_mm", 50)
-        width = width_mm * mm
-        height = height_mm * mm
-
-        if _FONTS_AVAILABLE:
-            font_regular = "DejaVu"
-            font_bold = "DejaVu-Bold"
-        else:
-            font_regular = "Helvetica"
-            font_bold = "Helvetica-Bold"
-
+    def _draw_from_template(c: canvas.Canvas, temp_pass, template: CompiledTemplate):
         data_map = {
             "user_name": temp_pass.creator.full_name if temp_pass.creator else "",
             "org_name": temp_pass.organization.org_name if temp_pass.organization else "",
@@ -132,89 +134,4 @@ class TemporaryPassPDFGenerator:
             "exited_at": TemporaryPassPDFGenerator._fmt_dt(temp_pass.exited_at),
             "created_at": TemporaryPassPDFGenerator._fmt_dt(temp_pass.created_at),
         }
-
-        def parse_color(value, default=(0, 0, 0)):
-            if not value:
-                return default
-            if isinstance(value, (list, tuple)) and len(value) == 3:
-                return tuple(value)
-            if isinstance(value, str) and value.startswith("#") and len(value) == 7:
-                r = int(value[1:3], 16) / 255.0
-                g = int(value[3:5], 16) / 255.0
-                b = int(value[5:7], 16) / 255.0
-                return (r, g, b)
-            return default
-
-        elements = template.get("elements", [])
-        for el in elements:
-            etype = el.get("type")
-            x_mm = float(el.get("x", 0) or 0)
-            y_mm = float(el.get("y", 0) or 0)
-            w_mm = float(el.get("width", 0) or 0)
-            h_mm = float(el.get("height", 0) or 0)
-            x = x_mm * mm
-            y_top = height - y_mm * mm
-
-            if etype in ("field", "text"):
-                value = el.get("text", "") if etype == "text" else data_map.get(el.get("field"), "")
-                font = el.get("font", font_regular)
-                if font not in ("DejaVu", "DejaVu-Bold", "Helvetica", "Helvetica-Bold"):
-                    font = font_regular
-                if el.get("bold"):
-                    font = font_bold
-                font_size = float(el.get("font_size", 10) or 10)
-                r, g, b = parse_color(el.get("color"))
-                c.setFillColorRGB(r, g, b)
-                c.setFont(font, font_size)
-                y = y_top - font_size
-                align = el.get("align", "left")
-                if align == "center" and w_mm:
-                    c.drawCentredString(x + (w_mm * mm) / 2, y, str(value))
-                elif align == "right" and w_mm:
-                    c.drawRightString(x + (w_mm * mm), y, str(value))
-                else:
-                    c.drawString(x, y, str(value))
-                continue
-
-            if etype == "line":
-                r, g, b = parse_color(el.get("stroke"))
-                c.setStrokeColorRGB(r, g, b)
-                c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-                x2_mm = el.get("x2")
-                y2_mm = el.get("y2")
-                if x2_mm is not None and y2_mm is not None:
-                    x2 = float(x2_mm) * mm
-                    y2 = height - float(y2_mm) * mm
-                else:
-                    x2 = x + w_mm * mm
-                    y2 = y_top - h_mm * mm
-                c.line(x, y_top, x2, y2)
-                continue
-
-            if etype == "rect":
-                r, g, b = parse_color(el.get("stroke"))
-                c.setStrokeColorRGB(r, g, b)
-                c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-                fill = el.get("fill")
-                if fill:
-                    fr, fg, fb = parse_color(fill)
-                    c.setFillColorRGB(fr, fg, fb)
-                    fill_flag = 1
-                else:
-                    fill_flag = 0
-                c.rect(x, y_top - h_mm * mm, w_mm * mm, h_mm * mm, stroke=1, fill=fill_flag)
-                continue
-
-            if etype == "logo":
-                data_url = el.get("data_url")
-                if data_url:
-                    try:
-                        import base64
-                        header, encoded = data_url.split(",", 1)
-                        image_bytes = base64.b64decode(encoded)
-                        from reportlab.lib.utils import ImageReader
-                        img = ImageReader(BytesIO(image_bytes))
-                        c.drawImage(img, x, y_top - h_mm * mm, width=w_mm * mm, height=h_mm * mm, preserveAspectRatio=True)
-                    except Exception:
-                        pass
-        return
+        draw_ops(c, template, data_map)
@@ -6,10 +6,13 @@ from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from io import BytesIO
+from typing import BinaryIO
 from datetime import datetime
 import os
 
+from pdf_templates import CompiledTemplate, draw_ops, ensure_compiled, get_compiled
+from pdf_output import canvas_options, new_buffer
+
 
 def _register_fonts():
     try:
@@ -29,14 +32,27 @@ def _register_fonts():
 _FONTS_AVAILABLE = _register_fonts()
 
 
+def _fonts() -> tuple[str, str]:
+    if _FONTS_AVAILABLE:
+        return "DejaVu", "DejaVu-Bold"
+    return "Helvetica", "Helvetica-Bold"
+
+
 class TemporaryPassReportGenerator:
     @staticmethod
-    def generate_report(groups: list, template_data: dict | None = None) -> BytesIO:
-        buffer = BytesIO()
+    def compile_template(template) -> CompiledTemplate | None:
+        """Plan for the temporary pass report template, cached by template id and version."""
+        return get_compiled(template, *_fonts(), default_page=(297, 210))
+
+    @staticmethod
+    def generate_report(groups: list, template_data=None) -> BinaryIO:
+        plan = ensure_compiled(template_data, *_fonts(), default_page=(297, 210))
+        template_data = plan.data if plan else None
+        buffer = new_buffer()
         page = (template_data or {}).get("page") or {}
         width_mm = page.get("width_mm", 297)
         height_mm = page.get("height_mm", 210)
-        c = canvas.Canvas(buffer, pagesize=(width_mm * mm, height_mm * mm))
+        c = canvas.Canvas(buffer, pagesize=(width_mm * mm, height_mm * mm), **canvas_options())
 
         if _FONTS_AVAILABLE:
             font_regular = "DejaVu"
@@ -60,38 +76,15 @@ class TemporaryPassReportGenerator:
         def _draw_template_elements():
             if not template_data:
                 return
-            elements = template_data.get("elements", [])
-            for el in elements:
-                etype = el.get("type")
-                x_mm = float(el.get("x", 0) or 0)
-                y_mm = float(el.get("y", 0) or 0)
-                w_mm = float(el.get("width", 0) or 0)
-                h_mm = float(el.get("height", 0) or 0)
-                x = x_mm * mm
-                y_top = height - y_mm * mm
-                if etype in ("field", "text"):
-                    value = el.get("text", "") if etype == "text" else {
-                        "report_date": datetime.now().strftime("%d.%m.%Y %H:%M"),
-                    }.get(el.get("field"), "")
-                    font = el.get("font", font_regular)
-                    if font not in ("DejaVu", "DejaVu-Bold", "Helvetica", "Helvetica-Bold"):
-                        font = font_regular
-                    if el.get("bold"):
-                        font = font_bold
-                    font_size = float(el.get("font_size", 10) or 10)
-                    c.setFont(font, font_size)
-                    y = y_top - font_size
-                    align = el.get("align", "left")
-                    if align == "center" and w_mm:
-                        c.drawCentredString(x + (w_mm * mm) / 2, y, str(value))
-                    elif align == "right" and w_mm:
-                        c.drawRightString(x + (w_mm * mm), y, str(value))
-                    else:
-                        c.drawString(x, y, str(value))
-                elif etype == "rect":
-                    c.setLineWidth(float(el.get("stroke_width", 1) or 1))
-                    c.rect(x, y_top - h_mm * mm, w_mm * mm, h_mm * mm, stroke=1, fill=0)
-
+            # This report draws only text and frames, in the current canvas colour
+            draw_ops(
+                c,
+                plan,
+                {"report_date": datetime.now().strftime("%d.%m.%Y %H:%M")},
+                kinds=("field", "text", "rect"),
+                styled=False,
+            )
+
         def _truncate(value: str, max_len: int) -> str:
             if not value:
                 return ""
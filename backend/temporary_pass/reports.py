@@ -0,0 +1,33 @@
+"""
+PDF reports for temporary passes (used by HTTP endpoints and background jobs).
+"""
+from typing import BinaryIO, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from settings.service import get_active_temp_pass_report_template
+from temporary_pass.service import TemporaryPassService
+from temporary_pass.report_generator import TemporaryPassReportGenerator
+
+
+def build_archive_month_report(
+    db: Session,
+    year: int,
+    month: int,
+    progress: Optional[Callable[[int], None]] = None,
+) -> tuple[BinaryIO, str]:
+    items = TemporaryPassService.list_archive_all(db, year=year, month=month)
+    if progress:
+        progress(30)
+    grouped = {}
+    for item in items:
+        org_name = item.organization.org_name if item.organization else "Без организации"
+        grouped.setdefault(org_name, []).append(item)
+    groups = [
+        {"org_name": name, "items": grouped[name]}
+        for name in sorted(grouped.keys())
+    ]
+    report_template = get_active_temp_pass_report_template(db)
+    report_template_data = TemporaryPassReportGenerator.compile_template(report_template)
+    pdf_buffer = TemporaryPassReportGenerator.generate_report(groups, template_data=report_template_data)
+    return pdf_buffer, f"temporary_passes_archive_{year:04d}-{month:02d}.pdf"
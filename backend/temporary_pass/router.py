@@ -4,11 +4,12 @@ API endpoints for temporary passes.
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date, datetime
-from sqlalchemy import or_, and_
+from sqlalchemy import or_
 
-from database import get_db
+from database import get_db, get_async_db, read_timeout, report_timeout
 from models import User, TemporaryPass, TemporaryPassArchive
 from settings.service import get_active_temp_pass_template, get_active_temp_pass_report_template
 from auth.dependencies import (
@@ -30,6 +31,9 @@ from temporary_pass.schemas import (
 from temporary_pass.service import TemporaryPassService
 from temporary_pass.pdf_generator import TemporaryPassPDFGenerator
 from temporary_pass.report_generator import TemporaryPassReportGenerator
+from temporary_pass.reports import build_archive_month_report
+from pagination import decode_cursor, next_cursor, TOTAL_MODE_PATTERN
+from pdf_output import iter_file
 
 
 router = APIRouter(prefix="/api/temporary-pass", tags=["Временные пропуска"])
@@ -49,8 +53,8 @@ def create_temporary_pass(
     return _enrich_temp_pass(temp_pass)
 
 
-@router.get("", response_model=TemporaryPassListResponse)
-def list_temporary_passes(
+@router.get("", response_model=TemporaryPassListResponse, dependencies=[Depends(read_timeout)])
+async def list_temporary_passes(
     status_filter: Optional[str] = Query(None, description="active, on_territory, expired, revoked"),
     id_org: Optional[int] = Query(None),
     gos_id: Optional[str] = Query(None),
@@ -58,39 +62,57 @@ def list_temporary_passes(
     date_to: Optional[date] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from previous page; skip is ignored"),
+    include_total: bool = Query(True),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_view),
 ):
+    page_cursor = decode_cursor(cursor)
+    if page_cursor is not None:
+        skip = 0
     permissions = get_user_permissions(current_user)
     if not permissions.get("temp_view_all", False):
         status_filter = "active"
-    items = TemporaryPassService.list_passes(
-        db=db,
-        status_filter=status_filter,
-        id_org=id_org,
-        gos_id=gos_id,
-        date_from=date_from,
-        date_to=date_to,
-        skip=skip,
-        limit=limit,
-    )
-    total = TemporaryPassService.count_passes(
-        db=db,
-        status_filter=status_filter,
-        id_org=id_org,
-        gos_id=gos_id,
-        date_from=date_from,
-        date_to=date_to,
-    )
-    return {
-        "items": [_enrich_temp_pass(item) for item in items],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-    }
+
+    def load(session: Session) -> dict:
+        # _enrich_temp_pass читает связи, поэтому тоже внутри run_sync
+        items = TemporaryPassService.list_passes(
+            db=session,
+            status_filter=status_filter,
+            id_org=id_org,
+            gos_id=gos_id,
+            date_from=date_from,
+            date_to=date_to,
+            skip=skip,
+            limit=limit,
+            cursor=page_cursor,
+        )
+        total = None
+        total_exact = True
+        if include_total:
+            total, total_exact = TemporaryPassService.total_passes(
+                db=session,
+                total_mode=total_mode,
+                status_filter=status_filter,
+                id_org=id_org,
+                gos_id=gos_id,
+                date_from=date_from,
+                date_to=date_to,
+            )
+        return {
+            "items": [_enrich_temp_pass(item) for item in items],
+            "total": total,
+            "total_exact": total_exact,
+            "skip": skip,
+            "limit": limit,
+            "next_cursor": next_cursor(items, limit, "id"),
+        }
+
+    return await db.run_sync(load)
 
 
-@router.get("/reports/all/pdf")
+@router.get("/reports/all/pdf", dependencies=[Depends(report_timeout)])
 def download_all_temporary_passes_report(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_temp_download),
@@ -101,11 +123,7 @@ def download_all_temporary_passes_report(
         .filter(
             or_(
                 TemporaryPass.revoked_at.is_not(None),
-                and_(
-                    TemporaryPass.revoked_at.is_(None),
-                    TemporaryPass.valid_from <= now,
-                    TemporaryPass.valid_until > now,
-                ),
+                TemporaryPass.active_at(now),
             )
         )
         .order_by(TemporaryPass.created_at.desc())
@@ -120,11 +138,11 @@ def download_all_temporary_passes_report(
         for name in sorted(grouped.keys())
     ]
     report_template = get_active_temp_pass_report_template(db)
-    report_template_data = report_template.data_json if report_template else None
+    report_template_data = TemporaryPassReportGenerator.compile_template(report_template)
     pdf_buffer = TemporaryPassReportGenerator.generate_report(groups, template_data=report_template_data)
     filename = "temporary_passes_report.pdf"
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_buffer),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -138,9 +156,15 @@ def list_temporary_pass_archive(
     gos_id: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from previous page; skip is ignored"),
+    include_total: bool = Query(True),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_view),
 ):
+    page_cursor = decode_cursor(cursor)
+    if page_cursor is not None:
+        skip = 0
     items = TemporaryPassService.list_archive(
         db=db,
         year=year,
@@ -149,19 +173,26 @@ def list_temporary_pass_archive(
         gos_id=gos_id,
         skip=skip,
         limit=limit,
+        cursor=page_cursor,
     )
-    total = TemporaryPassService.count_archive(
-        db=db,
-        year=year,
-        month=month,
-        id_org=id_org,
-        gos_id=gos_id,
-    )
+    total = None
+    total_exact = True
+    if include_total:
+        total, total_exact = TemporaryPassService.total_archive(
+            db=db,
+            year=year,
+            month=month,
+            id_org=id_org,
+            gos_id=gos_id,
+            total_mode=total_mode,
+        )
     return {
         "items": [_enrich_temp_pass_archive(item) for item in items],
         "total": total,
+        "total_exact": total_exact,
         "skip": skip,
         "limit": limit,
+        "next_cursor": next_cursor(items, limit, "id"),
     }
 
 
@@ -176,28 +207,16 @@ def archive_temporary_pass_month(
     return {"archived": archived}
 
 
-@router.get("/archive/reports/month/pdf")
+@router.get("/archive/reports/month/pdf", dependencies=[Depends(report_timeout)])
 def download_archive_report_by_month(
     year: int = Query(..., ge=2000, le=2100),
     month: int = Query(..., ge=1, le=12),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_temp_download),
 ):
-    items = TemporaryPassService.list_archive_all(db, year=year, month=month)
-    grouped = {}
-    for item in items:
-        org_name = item.organization.org_name if item.organization else "Без организации"
-        grouped.setdefault(org_name, []).append(item)
-    groups = [
-        {"org_name": name, "items": grouped[name]}
-        for name in sorted(grouped.keys())
-    ]
-    report_template = get_active_temp_pass_report_template(db)
-    report_template_data = report_template.data_json if report_template else None
-    pdf_buffer = TemporaryPassReportGenerator.generate_report(groups, template_data=report_template_data)
-    filename = f"temporary_passes_archive_{year:04d}-{month:02d}.pdf"
+    pdf_buffer, filename = build_archive_month_report(db, year, month)
     return StreamingResponse(
-        pdf_buffer,
+        iter_file(pdf_buffer),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -247,7 +266,7 @@ def download_temporary_pass_pdf(
             detail="Временный пропуск не найден",
         )
     template = get_active_temp_pass_template(db)
-    template_data = template.data_json if template else None
+    template_data = TemporaryPassPDFGenerator.compile_template(template)
     pdf_buffer = TemporaryPassPDFGenerator.generate_pdf(temp_pass, template_data=template_data)
     filename = TemporaryPassPDFGenerator.get_filename(temp_pass)
     return StreamingResponse(
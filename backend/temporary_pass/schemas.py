@@ -45,9 +45,11 @@ class TemporaryPassResponse(BaseModel):
 
 class TemporaryPassListResponse(BaseModel):
     items: List[TemporaryPassResponse]
-    total: int
+    total: Optional[int] = None
+    total_exact: bool = True
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 class TemporaryPassArchiveResponse(BaseModel):
@@ -69,7 +71,7 @@ class TemporaryPassArchiveResponse(BaseModel):
     exited_by: Optional[int] = None
     status: str
     archived_at: datetime
-    archived_by: int
+    archived_by: Optional[int] = None  # пусто - плановая архивация
 
     org_name: Optional[str] = None
     creator_name: Optional[str] = None
@@ -81,6 +83,8 @@ class TemporaryPassArchiveResponse(BaseModel):
 
 class TemporaryPassArchiveListResponse(BaseModel):
     items: List[TemporaryPassArchiveResponse]
-    total: int
+    total: Optional[int] = None
+    total_exact: bool = True
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
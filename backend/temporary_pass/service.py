@@ -1,16 +1,19 @@
 """
 Service for temporary passes.
 """
-from datetime import datetime, time as dt_time, date as dt_date
+from datetime import datetime, time as dt_time, date as dt_date, timedelta
 from zoneinfo import ZoneInfo
-from typing import Optional, List
+from typing import Callable, Optional, List
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, update, delete, text
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 
-from models import TemporaryPass, TemporaryPassArchive, Organiz
+from models import TemporaryPass, TemporaryPassArchive, Organiz, normalize_plate
 from config import settings
+from gate.service import GateService
+from pagination import apply_keyset, invalidate_totals, resolve_total
 
 
 class TemporaryPassService:
@@ -31,6 +34,10 @@ class TemporaryPassService:
         end_dt = datetime.combine(day, TemporaryPassService.END_TIME, tzinfo=tz)
         return start_dt, end_dt
 
+    @staticmethod
+    def _day_start(day: dt_date, tzinfo) -> datetime:
+        return datetime.combine(day, dt_time(0, 0), tzinfo=tzinfo)
+
     @staticmethod
     def _get_month_range(year: int, month: int, tzinfo) -> tuple[datetime, datetime]:
         start = datetime(year, month, 1, tzinfo=tzinfo)
@@ -65,13 +72,37 @@ class TemporaryPassService:
         return temp_pass
 
     @staticmethod
-    def _holds_guest_slot(item: TemporaryPass) -> bool:
-        return item.revoked_at is None
+    def _reserve_guest_slot(db: Session, id_org: int) -> None:
+        """
+        Занимает гостевое место одним условным UPDATE: проверка и уменьшение
+        атомарны, параллельные выдачи не уведут счётчик ниже нуля.
+        """
+        reserved = db.execute(
+            update(Organiz)
+            .where(Organiz.id_org == id_org, Organiz.free_mesto > 0)
+            .values(free_mesto=Organiz.free_mesto - 1)
+            .returning(Organiz.free_mesto)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if reserved is None:
+            TemporaryPassService._get_org_or_404(db, id_org)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="У организации нет свободных гостевых мест",
+            )
 
     @staticmethod
-    def _release_guest_slot_if_needed(item: TemporaryPass) -> None:
-        if TemporaryPassService._holds_guest_slot(item) and item.organization:
-            TemporaryPassService._change_free_mesto(item.organization, 1)
+    def _release_guest_slot(db: Session, id_org: Optional[int]) -> None:
+        """Возвращает место в пределах лимита (без лимита - не выше текущего, как раньше)"""
+        if id_org is None:
+            return
+        current = func.coalesce(Organiz.free_mesto, 0)
+        db.execute(
+            update(Organiz)
+            .where(Organiz.id_org == id_org)
+            .values(free_mesto=func.least(current + 1, func.coalesce(Organiz.free_mesto_limit, current)))
+            .execution_options(synchronize_session=False)
+        )
 
     @staticmethod
     def _ensure_can_enter(item: TemporaryPass, now: datetime) -> None:
@@ -146,51 +177,42 @@ class TemporaryPassService:
             )
         return org
 
-    @staticmethod
-    def _check_capacity(db: Session, id_org: int, now: datetime) -> None:
-        org = TemporaryPassService._get_org_or_404(db, id_org)
-        if not org.free_mesto or org.free_mesto <= 0:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="У организации нет свободных гостевых мест",
-            )
+    ACTIVE_PLATE_CONSTRAINT = "ex_temporary_pass_active_plate"
 
     @staticmethod
-    def _change_free_mesto(org: Organiz, delta: int) -> None:
-        current = org.free_mesto or 0
-        limit = org.free_mesto_limit if org.free_mesto_limit is not None else current
-        new_value = current + delta
-        if new_value < 0:
-            new_value = 0
-        if limit is not None and new_value > limit:
-            new_value = limit
-        org.free_mesto = new_value
+    def _duplicate_gos_id_error() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Активный временный пропуск для этого госномера уже существует",
+        )
 
     @staticmethod
-    def _check_duplicate_gos_id(db: Session, gos_id: str, now: datetime) -> None:
+    def _check_duplicate_gos_id(db: Session, gos_id: str, start_dt: datetime, end_dt: datetime) -> None:
+        """
+        Быстрая проверка до резервирования места (index-only по индексу ограничения).
+        Окончательно дубль отсекает само ограничение при вставке.
+        """
         exists = (
             db.query(TemporaryPass.id)
             .filter(
-                TemporaryPass.gos_id == gos_id,
-                TemporaryPass.revoked_at.is_(None),
-                TemporaryPass.valid_from <= now,
-                TemporaryPass.valid_until > now,
+                TemporaryPass.gos_id_norm == normalize_plate(gos_id),
+                TemporaryPass.overlapping(start_dt, end_dt),
             )
             .first()
         )
         if exists:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Активный временный пропуск для этого госномера уже существует",
-            )
+            raise TemporaryPassService._duplicate_gos_id_error()
 
     @staticmethod
     def create_pass(db: Session, payload: dict, created_by: int) -> TemporaryPass:
         now = TemporaryPassService._now()
         start_dt, end_dt = TemporaryPassService._ensure_business_hours(now)
-        TemporaryPassService._check_capacity(db, payload.get("id_org"), now)
-        TemporaryPassService._check_duplicate_gos_id(db, payload.get("gos_id"), now)
-        org = TemporaryPassService._get_org_or_404(db, payload.get("id_org"))
+        TemporaryPassService._check_duplicate_gos_id(db, payload.get("gos_id"), start_dt, end_dt)
+        try:
+            TemporaryPassService._reserve_guest_slot(db, payload.get("id_org"))
+        except HTTPException:
+            db.rollback()
+            raise
 
         temp_pass = TemporaryPass(
             gos_id=payload.get("gos_id"),
@@ -201,9 +223,18 @@ class TemporaryPassService:
             valid_until=end_dt,
             created_by=created_by,
         )
-        TemporaryPassService._change_free_mesto(org, -1)
         db.add(temp_pass)
-        db.commit()
+        invalidate_totals(db, "temporary_pass")
+        GateService.invalidate(db, temp_pass.gos_id)
+        try:
+            db.commit()
+        except IntegrityError as exc:
+            # Параллельная выдача на тот же номер успела раньше; место вернул откат
+            db.rollback()
+            diag = getattr(exc.orig, "diag", None)
+            if getattr(diag, "constraint_name", None) == TemporaryPassService.ACTIVE_PLATE_CONSTRAINT:
+                raise TemporaryPassService._duplicate_gos_id_error()
+            raise
         db.refresh(temp_pass)
         return temp_pass
 
@@ -214,26 +245,50 @@ class TemporaryPassService:
         user_id: int,
         comment: Optional[str] = None,
     ) -> TemporaryPass:
-        temp_pass = TemporaryPassService._get_pass_or_404(db, pass_id)
-        if temp_pass.revoked_at:
+        values = {"revoked_at": TemporaryPassService._now(), "revoked_by": user_id}
+        if comment:
+            values["comment"] = comment
+        # Отзывает только тот, чей UPDATE нашёл пропуск неотозванным: место возвращается один раз
+        revoked = db.execute(
+            update(TemporaryPass)
+            .where(TemporaryPass.id == pass_id, TemporaryPass.revoked_at.is_(None))
+            .values(**values)
+            .returning(TemporaryPass.id_org, TemporaryPass.gos_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if revoked is None:
+            db.rollback()
+            TemporaryPassService._get_pass_or_404(db, pass_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Временный пропуск уже отозван",
             )
-        TemporaryPassService._release_guest_slot_if_needed(temp_pass)
-        temp_pass.revoked_at = TemporaryPassService._now()
-        temp_pass.revoked_by = user_id
-        if comment:
-            temp_pass.comment = comment
+        TemporaryPassService._release_guest_slot(db, revoked.id_org)
+        invalidate_totals(db, "temporary_pass")
+        GateService.invalidate(db, revoked.gos_id)
         db.commit()
+        temp_pass = TemporaryPassService._get_pass_or_404(db, pass_id)
         db.refresh(temp_pass)
         return temp_pass
 
     @staticmethod
     def delete_pass(db: Session, pass_id: int) -> None:
-        temp_pass = TemporaryPassService._get_pass_or_404(db, pass_id)
-        TemporaryPassService._release_guest_slot_if_needed(temp_pass)
-        db.delete(temp_pass)
+        deleted = db.execute(
+            delete(TemporaryPass)
+            .where(TemporaryPass.id == pass_id)
+            .returning(TemporaryPass.id_org, TemporaryPass.gos_id, TemporaryPass.revoked_at)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if deleted is None:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Временный пропуск не найден",
+            )
+        if deleted.revoked_at is None:
+            TemporaryPassService._release_guest_slot(db, deleted.id_org)
+        invalidate_totals(db, "temporary_pass")
+        GateService.invalidate(db, deleted.gos_id)
         db.commit()
 
     @staticmethod
@@ -243,6 +298,8 @@ class TemporaryPassService:
         TemporaryPassService._ensure_can_enter(temp_pass, now)
         temp_pass.entered_at = now
         temp_pass.entered_by = user_id
+        invalidate_totals(db, "temporary_pass")
+        GateService.invalidate(db, temp_pass.gos_id)
         db.commit()
         db.refresh(temp_pass)
         return temp_pass
@@ -252,11 +309,27 @@ class TemporaryPassService:
         temp_pass = TemporaryPassService._get_pass_or_404(db, pass_id)
         now = TemporaryPassService._now()
         TemporaryPassService._ensure_can_exit(temp_pass, now)
-        TemporaryPassService._release_guest_slot_if_needed(temp_pass)
-        temp_pass.exited_at = now
-        temp_pass.exited_by = user_id
-        temp_pass.revoked_at = temp_pass.exited_at
-        temp_pass.revoked_by = user_id
+        exited = db.execute(
+            update(TemporaryPass)
+            .where(
+                TemporaryPass.id == pass_id,
+                TemporaryPass.revoked_at.is_(None),
+                TemporaryPass.exited_at.is_(None),
+            )
+            .values(exited_at=now, exited_by=user_id, revoked_at=now, revoked_by=user_id)
+            .returning(TemporaryPass.id_org)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if exited is None:
+            # Параллельный выезд или отзыв успел раньше
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Выезд уже отмечен",
+            )
+        TemporaryPassService._release_guest_slot(db, exited.id_org)
+        invalidate_totals(db, "temporary_pass")
+        GateService.invalidate(db, temp_pass.gos_id)
         db.commit()
         db.refresh(temp_pass)
         return temp_pass
@@ -266,41 +339,40 @@ class TemporaryPassService:
         return db.query(TemporaryPass).filter(TemporaryPass.id == pass_id).first()
 
     @staticmethod
-    def list_passes(
-        db: Session,
+    def _apply_filters(
+        query,
         status_filter: Optional[str] = None,
         id_org: Optional[int] = None,
         gos_id: Optional[str] = None,
         date_from: Optional[dt_date] = None,
         date_to: Optional[dt_date] = None,
-        skip: int = 0,
-        limit: int = 50,
-    ) -> List[TemporaryPass]:
-        query = db.query(TemporaryPass)
+    ):
         if id_org:
             query = query.filter(TemporaryPass.id_org == id_org)
         if gos_id:
             query = query.filter(TemporaryPass.gos_id.ilike(f"%{gos_id}%"))
+        now = TemporaryPassService._now()
+        # Даты - полуоткрытые интервалы по времени в TIMEZONE, без date() над колонкой,
+        # чтобы работали индексы (id_org, valid_from) и по valid_until
         if date_from:
-            query = query.filter(func.date(TemporaryPass.valid_from) >= date_from)
+            query = query.filter(
+                TemporaryPass.valid_from >= TemporaryPassService._day_start(date_from, now.tzinfo)
+            )
         if date_to:
-            query = query.filter(func.date(TemporaryPass.valid_until) <= date_to)
+            query = query.filter(
+                TemporaryPass.valid_until < TemporaryPassService._day_start(date_to + timedelta(days=1), now.tzinfo)
+            )
 
-        now = TemporaryPassService._now()
         if status_filter == "active":
             query = query.filter(
-                TemporaryPass.revoked_at.is_(None),
+                TemporaryPass.active_at(now),
                 TemporaryPass.entered_at.is_(None),
-                TemporaryPass.valid_from <= now,
-                TemporaryPass.valid_until > now,
             )
         elif status_filter == "on_territory":
             query = query.filter(
-                TemporaryPass.revoked_at.is_(None),
+                TemporaryPass.active_at(now),
                 TemporaryPass.entered_at.is_not(None),
                 TemporaryPass.exited_at.is_(None),
-                TemporaryPass.valid_from <= now,
-                TemporaryPass.valid_until > now,
             )
         elif status_filter == "revoked":
             query = query.filter(TemporaryPass.revoked_at.is_not(None))
@@ -309,8 +381,37 @@ class TemporaryPassService:
                 TemporaryPass.revoked_at.is_(None),
                 TemporaryPass.valid_until <= now,
             )
+        return query
 
-        return query.order_by(TemporaryPass.created_at.desc()).offset(skip).limit(limit).all()
+    @staticmethod
+    def list_passes(
+        db: Session,
+        status_filter: Optional[str] = None,
+        id_org: Optional[int] = None,
+        gos_id: Optional[str] = None,
+        date_from: Optional[dt_date] = None,
+        date_to: Optional[dt_date] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[tuple] = None,
+    ) -> List[TemporaryPass]:
+        query = TemporaryPassService._apply_filters(
+            db.query(TemporaryPass),
+            status_filter=status_filter,
+            id_org=id_org,
+            gos_id=gos_id,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        if cursor is not None:
+            query = apply_keyset(query, TemporaryPass.created_at, TemporaryPass.id, cursor)
+            skip = 0
+        return (
+            query.order_by(TemporaryPass.created_at.desc(), TemporaryPass.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
 
     @staticmethod
     def count_passes(
@@ -321,98 +422,166 @@ class TemporaryPassService:
         date_from: Optional[dt_date] = None,
         date_to: Optional[dt_date] = None,
     ) -> int:
-        query = db.query(func.count(TemporaryPass.id))
-        if id_org:
-            query = query.filter(TemporaryPass.id_org == id_org)
-        if gos_id:
-            query = query.filter(TemporaryPass.gos_id.ilike(f"%{gos_id}%"))
-        if date_from:
-            query = query.filter(func.date(TemporaryPass.valid_from) >= date_from)
-        if date_to:
-            query = query.filter(func.date(TemporaryPass.valid_until) <= date_to)
-
-        now = TemporaryPassService._now()
-        if status_filter == "active":
-            query = query.filter(
-                TemporaryPass.revoked_at.is_(None),
-                TemporaryPass.entered_at.is_(None),
-                TemporaryPass.valid_from <= now,
-                TemporaryPass.valid_until > now,
-            )
-        elif status_filter == "on_territory":
-            query = query.filter(
-                TemporaryPass.revoked_at.is_(None),
-                TemporaryPass.entered_at.is_not(None),
-                TemporaryPass.exited_at.is_(None),
-                TemporaryPass.valid_from <= now,
-                TemporaryPass.valid_until > now,
-            )
-        elif status_filter == "revoked":
-            query = query.filter(TemporaryPass.revoked_at.is_not(None))
-        elif status_filter == "expired":
-            query = query.filter(
-                TemporaryPass.revoked_at.is_(None),
-                TemporaryPass.valid_until <= now,
-            )
+        query = TemporaryPassService._apply_filters(
+            db.query(func.count(TemporaryPass.id)),
+            status_filter=status_filter,
+            id_org=id_org,
+            gos_id=gos_id,
+            date_from=date_from,
+            date_to=date_to,
+        )
         total = query.scalar()
         return int(total or 0)
 
     @staticmethod
-    def archive_month(db: Session, year: int, month: int, archived_by: int) -> int:
-        now = TemporaryPassService._now()
-        start, end = TemporaryPassService._get_month_range(year, month, now.tzinfo)
-        items = (
-            db.query(TemporaryPass)
-            .filter(
-                TemporaryPass.created_at >= start,
-                TemporaryPass.created_at < end,
-            )
-            .all()
+    def total_passes(
+        db: Session,
+        total_mode: str = "exact",
+        status_filter: Optional[str] = None,
+        id_org: Optional[int] = None,
+        gos_id: Optional[str] = None,
+        date_from: Optional[dt_date] = None,
+        date_to: Optional[dt_date] = None,
+    ) -> tuple[int, bool]:
+        filters = {
+            "status_filter": status_filter,
+            "id_org": id_org,
+            "gos_id": gos_id,
+            "date_from": date_from,
+            "date_to": date_to,
+        }
+        return resolve_total(
+            db,
+            "temporary_pass",
+            filters,
+            count=lambda: TemporaryPassService.count_passes(db, **filters),
+            rows_query=TemporaryPassService._apply_filters(db.query(TemporaryPass.id), **filters),
+            total_mode=total_mode,
+            # active/on_territory/expired меняются со временем и без записи в таблицу
+            cacheable=status_filter in (None, "revoked"),
         )
-        if not items:
-            return 0
-        archives = []
-        for item in items:
-            archives.append(
-                TemporaryPassArchive(
-                    temp_pass_id=item.id,
-                    gos_id=item.gos_id,
-                    id_org=item.id_org,
-                    phone=item.phone,
-                    valid_from=item.valid_from,
-                    valid_until=item.valid_until,
-                    created_by=item.created_by,
-                    created_at=item.created_at,
-                    revoked_at=item.revoked_at,
-                    revoked_by=item.revoked_by,
-                    entered_at=item.entered_at,
-                    exited_at=item.exited_at,
-                    entered_by=item.entered_by,
-                    exited_by=item.exited_by,
-                    comment=item.comment,
-                    status=TemporaryPassService._compute_status(item, now),
-                    archived_by=archived_by,
-                )
+
+    # Одна порция архивации: выбрать, удалить с RETURNING и вставить в архив одним запросом.
+    # Статус считается в SQL так же, как _compute_status. SKIP LOCKED - строки, которые
+    # сейчас меняет пост охраны, уйдут в следующий проход.
+    _ARCHIVE_BATCH_SQL = text("""
+        WITH batch AS (
+            SELECT id FROM temporary_pass
+            WHERE created_at < :end AND (CAST(:start AS timestamptz) IS NULL OR created_at >= :start)
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        ),
+        moved AS (
+            DELETE FROM temporary_pass AS t
+            USING batch
+            WHERE t.id = batch.id
+            RETURNING t.id, t.gos_id, t.gos_id_norm, t.id_org, t.phone, t.valid_from, t.valid_until,
+                t.created_by, t.created_at, t.revoked_at, t.revoked_by, t.entered_at, t.exited_at,
+                t.entered_by, t.exited_by, t.comment
+        ),
+        archived AS (
+            INSERT INTO temporary_pass_archive (
+                temp_pass_id, gos_id, gos_id_norm, id_org, phone, valid_from, valid_until,
+                created_by, created_at, revoked_at, revoked_by, entered_at, exited_at,
+                entered_by, exited_by, comment, status, archived_by
             )
-        db.add_all(archives)
-        for item in items:
-            db.delete(item)
-        db.commit()
-        return len(archives)
+            SELECT
+                id, gos_id, gos_id_norm, id_org, phone, valid_from, valid_until,
+                created_by, created_at, revoked_at, revoked_by, entered_at, exited_at,
+                entered_by, exited_by, comment,
+                CASE
+                    WHEN revoked_at IS NOT NULL THEN 'revoked'
+                    WHEN valid_until IS NOT NULL AND CAST(:now AS timestamptz) > valid_until THEN 'expired'
+                    WHEN entered_at IS NOT NULL AND exited_at IS NULL THEN 'on_territory'
+                    ELSE 'active'
+                END,
+                CAST(:archived_by AS integer)
+            FROM moved
+            RETURNING 1
+        )
+        SELECT count(*) FROM archived
+    """)
 
     @staticmethod
-    def list_archive(
+    def _archive_range(
+        db: Session,
+        start: Optional[datetime],
+        end: datetime,
+        archived_by: Optional[int],
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """
+        Переносит пропуска с created_at в [start, end) порциями, коммит после каждой.
+        Прерванный перенос продолжается повторным вызовом: перенесённых строк в
+        temporary_pass уже нет.
+        """
+        batch_size = batch_size or settings.TEMP_PASS_ARCHIVE_BATCH_SIZE
+        now = TemporaryPassService._now()
+        total = 0
+        while True:
+            moved = db.execute(
+                TemporaryPassService._ARCHIVE_BATCH_SQL,
+                {
+                    "start": start,
+                    "end": end,
+                    "batch_size": batch_size,
+                    "now": now,
+                    "archived_by": archived_by,
+                },
+            ).scalar() or 0
+            if moved:
+                invalidate_totals(db, "temporary_pass", "temporary_pass_archive")
+                GateService.invalidate(db)
+            db.commit()
+            total += moved
+            if progress and moved:
+                progress(total)
+            if moved < batch_size:
+                break
+        return total
+
+    @staticmethod
+    def archive_month(
         db: Session,
         year: int,
         month: int,
+        archived_by: Optional[int],
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        now = TemporaryPassService._now()
+        start, end = TemporaryPassService._get_month_range(year, month, now.tzinfo)
+        return TemporaryPassService._archive_range(db, start, end, archived_by, batch_size, progress)
+
+    @staticmethod
+    def archive_closed_months(db: Session, keep_months: int = 0) -> int:
+        """
+        Плановая архивация: всё, что создано до начала месяца (текущий минус keep_months).
+        archived_by пустой - перенесено автоматически.
+        """
+        now = TemporaryPassService._now()
+        year, month = now.year, now.month - keep_months
+        while month < 1:
+            year, month = year - 1, month + 12
+        cutoff, _ = TemporaryPassService._get_month_range(year, month, now.tzinfo)
+
+        def report(total: int) -> None:
+            print(f"📦 Архивация временных пропусков до {cutoff:%Y-%m}: перенесено {total}")
+
+        return TemporaryPassService._archive_range(db, None, cutoff, None, progress=report)
+
+    @staticmethod
+    def _apply_archive_filters(
+        query,
+        year: int,
+        month: int,
         gos_id: Optional[str] = None,
         id_org: Optional[int] = None,
-        skip: int = 0,
-        limit: int = 50,
-    ) -> List[TemporaryPassArchive]:
+    ):
         now = TemporaryPassService._now()
         start, end = TemporaryPassService._get_month_range(year, month, now.tzinfo)
-        query = db.query(TemporaryPassArchive).filter(
+        query = query.filter(
             TemporaryPassArchive.created_at >= start,
             TemporaryPassArchive.created_at < end,
         )
@@ -420,7 +589,35 @@ class TemporaryPassService:
             query = query.filter(TemporaryPassArchive.id_org == id_org)
         if gos_id:
             query = query.filter(TemporaryPassArchive.gos_id.ilike(f"%{gos_id}%"))
-        return query.order_by(TemporaryPassArchive.created_at.desc()).offset(skip).limit(limit).all()
+        return query
+
+    @staticmethod
+    def list_archive(
+        db: Session,
+        year: int,
+        month: int,
+        gos_id: Optional[str] = None,
+        id_org: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[tuple] = None,
+    ) -> List[TemporaryPassArchive]:
+        query = TemporaryPassService._apply_archive_filters(
+            db.query(TemporaryPassArchive),
+            year=year,
+            month=month,
+            gos_id=gos_id,
+            id_org=id_org,
+        )
+        if cursor is not None:
+            query = apply_keyset(query, TemporaryPassArchive.created_at, TemporaryPassArchive.id, cursor)
+            skip = 0
+        return (
+            query.order_by(TemporaryPassArchive.created_at.desc(), TemporaryPassArchive.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
 
     @staticmethod
     def count_archive(
@@ -430,19 +627,40 @@ class TemporaryPassService:
         gos_id: Optional[str] = None,
         id_org: Optional[int] = None,
     ) -> int:
-        now = TemporaryPassService._now()
-        start, end = TemporaryPassService._get_month_range(year, month, now.tzinfo)
-        query = db.query(func.count(TemporaryPassArchive.id)).filter(
-            TemporaryPassArchive.created_at >= start,
-            TemporaryPassArchive.created_at < end,
+        query = TemporaryPassService._apply_archive_filters(
+            db.query(func.count(TemporaryPassArchive.id)),
+            year=year,
+            month=month,
+            gos_id=gos_id,
+            id_org=id_org,
         )
-        if id_org:
-            query = query.filter(TemporaryPassArchive.id_org == id_org)
-        if gos_id:
-            query = query.filter(TemporaryPassArchive.gos_id.ilike(f"%{gos_id}%"))
         total = query.scalar()
         return int(total or 0)
 
+    @staticmethod
+    def total_archive(
+        db: Session,
+        year: int,
+        month: int,
+        gos_id: Optional[str] = None,
+        id_org: Optional[int] = None,
+        total_mode: str = "exact",
+    ) -> tuple[int, bool]:
+        filters = {
+            "year": year,
+            "month": month,
+            "gos_id": gos_id,
+            "id_org": id_org,
+        }
+        return resolve_total(
+            db,
+            "temporary_pass_archive",
+            filters,
+            count=lambda: TemporaryPassService.count_archive(db, **filters),
+            rows_query=TemporaryPassService._apply_archive_filters(db.query(TemporaryPassArchive.id), **filters),
+            total_mode=total_mode,
+        )
+
     @staticmethod
     def list_archive_all(
         db: Session,
@@ -451,14 +669,11 @@ class TemporaryPassService:
         gos_id: Optional[str] = None,
         id_org: Optional[int] = None,
     ) -> List[TemporaryPassArchive]:
-        now = TemporaryPassService._now()
-        start, end = TemporaryPassService._get_month_range(year, month, now.tzinfo)
-        query = db.query(TemporaryPassArchive).filter(
-            TemporaryPassArchive.created_at >= start,
-            TemporaryPassArchive.created_at < end,
+        query = TemporaryPassService._apply_archive_filters(
+            db.query(TemporaryPassArchive),
+            year=year,
+            month=month,
+            gos_id=gos_id,
+            id_org=id_org,
         )
-        if id_org:
-            query = query.filter(TemporaryPassArchive.id_org == id_org)
-        if gos_id:
-            query = query.filter(TemporaryPassArchive.gos_id.ilike(f"%{gos_id}%"))
-        return query.order_by(TemporaryPassArchive.created_at.desc()).all()
+        return query.order_by(TemporaryPassArchive.created_at.desc(), TemporaryPassArchive.id.desc()).all()
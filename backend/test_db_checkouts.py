@@ -0,0 +1,125 @@
+"""
+Тест сессии на запрос - один запрос к API берёт из пулов не больше одного соединения
+(middleware, проверка прав и обработчик работают в общей database.RequestDB).
+При промахе кэша флагов middleware читает флаг в короткой транзакции: соединений
+выдаётся два, но одновременно занято не больше одного.
+Запуск: python test_db_checkouts.py [username]
+"""
+import asyncio
+import sys
+
+from database import SessionLocal, async_engine, connections_in_use, pool_status
+from auth.service import AuthService
+from auth import principal
+from settings import service as app_settings
+from main import app
+
+
+ENDPOINTS = [
+    ("async", "/api/propusk/paged", "limit=20"),
+    ("async", "/api/temporary-pass", "limit=20"),
+    ("async", "/api/auth/me", ""),
+    ("sync", "/api/references/organizations", ""),
+    ("sync", "/api/temporary-pass/archive", "year=2026&month=1&limit=20"),
+]
+
+
+def _checkouts() -> int:
+    return sum(pool["checkouts"] + pool["timeouts"] for pool in pool_status().values())
+
+
+async def _get(path: str, query: str, token: str) -> int:
+    """GET в приложение напрямую через ASGI, без HTTP-сервера"""
+    sent = {"body": False}
+    messages = []
+
+    async def receive():
+        if not sent["body"]:
+            sent["body"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return next(m["status"] for m in messages if m["type"] == "http.response.start")
+
+
+async def _run(token: str) -> bool:
+    ok = True
+    for kind, path, query in ENDPOINTS:
+        # Прогрев: кэши прав и флагов, планы запросов
+        await _get(path, query, token)
+
+        runs = (
+            ("кэши заполнены", None),
+            ("промах кэша прав", principal._principals.clear),
+            ("промах кэша флагов", app_settings._flags.clear),
+        )
+        for title, reset in runs:
+            if reset:
+                reset()
+            before = _checkouts()
+            connections_in_use.reset_peak()
+            status = await _get(path, query, token)
+            used = _checkouts() - before
+            peak = connections_in_use.peak
+            # Флаг читается до обработчика и отдаёт соединение сразу - вторая выдача последовательная
+            max_used = 2 if reset is app_settings._flags.clear else 1
+            passed = status < 500 and peak <= 1 and used <= max_used
+            ok = ok and passed
+            mark = "✅" if passed else "❌"
+            print(
+                f"{mark} {kind:<5} {path:<34} {title:<20} HTTP {status}, "
+                f"выдач из пула: {used}, одновременно занято: {peak}"
+            )
+    await async_engine.dispose()
+    return ok
+
+
+def test_db_checkouts():
+    print("\n" + "="*60)
+    print("   ТЕСТ: ОДНО СОЕДИНЕНИЕ НА ЗАПРОС")
+    print("="*60 + "\n")
+
+    username = sys.argv[1] if len(sys.argv) > 1 else input("Введи username: ").strip()
+
+    db = SessionLocal()
+    try:
+        user = AuthService.get_user_by_username(db, username)
+    finally:
+        db.close()
+    if not user:
+        print("❌ Пользователь не найден!")
+        return
+
+    token = AuthService.create_access_token(
+        data={"sub": str(user.id), "username": user.username, "role": user.role.value}
+    )
+    ok = asyncio.run(_run(token))
+
+    print("\n" + "="*60)
+    print("   ✅ ВСЁ РАБОТАЕТ ОТЛИЧНО!" if ok else "   ❌ ЕСТЬ ЗАПРОСЫ С НЕСКОЛЬКИМИ СОЕДИНЕНИЯМИ")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    test_db_checkouts()
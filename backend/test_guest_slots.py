@@ -0,0 +1,127 @@
+"""
+Стресс-тест гостевых мест: сотни параллельных выдач временных пропусков
+одной организации не занимают мест больше лимита, а параллельные
+отзывы/выезды/удаления возвращают каждое место ровно один раз
+Запуск: python test_guest_slots.py [выдач] [мест] [потоков]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import sys
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from models import User, Organiz, TemporaryPass
+from temporary_pass.service import TemporaryPassService
+
+
+def _business_now() -> datetime:
+    # Выдача разрешена только с 08:00 до 20:00 - тест выполняется "в полдень"
+    now = datetime.now().astimezone()
+    return now.replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def _parallel(workers: int, func, items: list) -> dict:
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(func, items):
+            outcomes[result] = outcomes.get(result, 0) + 1
+    return outcomes
+
+
+def test_guest_slots(attempts: int = 300, slots: int = 25, workers: int = 50):
+    print("\n" + "="*60)
+    print("   СТРЕСС-ТЕСТ ГОСТЕВЫХ МЕСТ")
+    print("="*60 + "\n")
+
+    # Отдельный пул на все потоки теста, чтобы ждали строку организации, а не соединение
+    engine = create_engine(settings.DATABASE_URL, pool_size=workers, max_overflow=0)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    TemporaryPassService._now = staticmethod(_business_now)
+
+    db = Session()
+    org_name = f"Стресс-тест {uuid.uuid4().hex[:8]}"
+    try:
+        user = db.query(User).order_by(User.id).first()
+        if not user:
+            print("❌ Нет пользователей! Сначала запусти create_admin.py")
+            return
+        org = Organiz(org_name=org_name, free_mesto=slots, free_mesto_limit=slots)
+        db.add(org)
+        db.commit()
+        org_id, user_id = org.id_org, user.id
+
+        def create(index: int) -> str:
+            session = Session()
+            try:
+                TemporaryPassService.create_pass(
+                    session,
+                    {"gos_id": f"Т{index:04d}СТ", "id_org": org_id},
+                    created_by=user_id,
+                )
+                return "выдан"
+            except HTTPException as exc:
+                return f"HTTP {exc.status_code}"
+            finally:
+                session.close()
+
+        def release(args: tuple) -> str:
+            action, pass_id = args
+            session = Session()
+            try:
+                if action == "revoke":
+                    TemporaryPassService.revoke_pass(session, pass_id, user_id)
+                else:
+                    TemporaryPassService.delete_pass(session, pass_id)
+                return f"{action}: ok"
+            except HTTPException as exc:
+                return f"{action}: HTTP {exc.status_code}"
+            finally:
+                session.close()
+
+        print(f"1️⃣ {attempts} параллельных выдач на {slots} мест ({workers} потоков)...")
+        created = _parallel(workers, create, list(range(attempts)))
+        print(f"   {created}")
+
+        db.expire_all()
+        issued = db.query(TemporaryPass).filter(TemporaryPass.id_org == org_id).count()
+        free = db.query(Organiz.free_mesto).filter(Organiz.id_org == org_id).scalar()
+        ok_create = issued == slots and free == 0 and created.get("выдан") == slots
+        print(f"{'✅' if ok_create else '❌'} выдано {issued} из {slots}, свободно {free}")
+
+        ids = [row.id for row in db.query(TemporaryPass.id).filter(TemporaryPass.id_org == org_id)]
+        half = len(ids) // 2
+        # Каждый пропуск отзывается/удаляется сразу несколькими потоками
+        jobs = [("revoke", pass_id) for pass_id in ids[:half] for _ in range(4)]
+        jobs += [("delete", pass_id) for pass_id in ids[half:] for _ in range(4)]
+        jobs += [("delete", pass_id) for pass_id in ids[:half] for _ in range(2)]
+
+        print(f"\n2️⃣ {len(jobs)} параллельных отзывов и удалений...")
+        released = _parallel(workers, release, jobs)
+        print(f"   {released}")
+
+        db.expire_all()
+        free = db.query(Organiz.free_mesto).filter(Organiz.id_org == org_id).scalar()
+        ok_release = free == slots
+        print(f"{'✅' if ok_release else '❌'} свободно {free} из {slots}")
+
+        print("\n" + "="*60)
+        print("   ✅ ВСЁ РАБОТАЕТ ОТЛИЧНО!" if ok_create and ok_release else "   ❌ СЧЁТЧИК МЕСТ РАЗОШЁЛСЯ")
+        print("="*60 + "\n")
+    finally:
+        db.rollback()
+        org = db.query(Organiz).filter(Organiz.org_name == org_name).first()
+        if org:
+            db.query(TemporaryPass).filter(TemporaryPass.id_org == org.id_org).delete()
+            db.delete(org)
+            db.commit()
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(value) for value in sys.argv[1:4]]
+    test_guest_slots(*args)
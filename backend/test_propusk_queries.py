@@ -0,0 +1,73 @@
+"""
+Тест числа запросов в списке пропусков - тот же путь, что у GET /api/propusks
+и /paged (get_propusk_rows + _row_to_response): количество SQL-запросов
+не зависит от размера страницы
+Запуск: python test_propusk_queries.py
+"""
+import sys
+
+from sqlalchemy import event, text
+
+from database import SessionLocal, engine
+from models import Propusk
+from propusk.router import _row_to_response
+from propusk.schemas import PropuskResponse
+from propusk.service import PropuskService
+
+
+PAGE_SIZES = [1, 50, 500]
+
+
+def _count_statements(db, limit: int) -> tuple:
+    statements = []
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        rows = PropuskService.get_propusk_rows(db, limit=limit)
+        # Как при отдаче ответа: FastAPI проверяет модель по response_model
+        for row in rows:
+            PropuskResponse.model_validate(_row_to_response(row).model_dump())
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return len(rows), len(statements)
+
+
+def test_propusk_queries() -> bool:
+    print("\n" + "="*60)
+    print("   ТЕСТ: ЧИСЛО ЗАПРОСОВ В СПИСКЕ ПРОПУСКОВ")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+    try:
+        total = db.query(Propusk).count()
+        if total < 2:
+            print("❌ Мало пропусков! Сначала запусти seed_propusks.py")
+            return False
+        if total < max(PAGE_SIZES):
+            print(f"⚠️ В базе {total} пропусков, большие страницы будут неполными\n")
+
+        results = []
+        for limit in PAGE_SIZES:
+            # Новая транзакция и пустая identity map на каждый замер
+            db.rollback()
+            db.expunge_all()
+            db.execute(text("SELECT 1"))
+            rows, statements = _count_statements(db, limit)
+            results.append(statements)
+            print(f"  страница {limit:<4} строк {rows:<4} запросов {statements}")
+    finally:
+        db.rollback()
+        db.close()
+
+    ok = len(set(results)) == 1
+    print("\n" + "="*60)
+    print("   ✅ ЧИСЛО ЗАПРОСОВ НЕ ЗАВИСИТ ОТ СТРАНИЦЫ" if ok else "   ❌ ЧИСЛО ЗАПРОСОВ РАСТЁТ С РАЗМЕРОМ СТРАНИЦЫ (N+1)")
+    print("="*60 + "\n")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_propusk_queries() else 1)
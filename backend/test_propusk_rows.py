@@ -0,0 +1,130 @@
+"""
+Тест плоской выборки списков - PropuskService.get_propusk_rows + _row_to_response
+отдают то же, что ORM-путь get_propusk_by_id + _enrich_propusk, для одних и тех же id
+(тестовые пропуска создаются в транзакции и откатываются в конце)
+Запуск: python test_propusk_rows.py [сколько_существующих_сравнить]
+"""
+from datetime import date, timedelta
+import sys
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+
+from database import SessionLocal
+from models import Propusk, PropuskStatus, User, Organiz, Abonent, ModelAuto
+from propusk.router import _enrich_propusk, _row_to_response
+from propusk.schemas import PropuskResponse
+from propusk.service import PropuskService
+
+
+def _add_propusk(db, gos_id: str, org: Organiz, model: ModelAuto, abonent: Abonent, created_by: int) -> int:
+    propusk = Propusk(
+        gos_id=gos_id,
+        id_mark_auto=model.id_mark,
+        id_model_auto=model.id_model,
+        id_org=org.id_org,
+        release_date=date.today(),
+        valid_until=date.today() + timedelta(days=30),
+        id_fio=abonent.id_fio,
+        status=PropuskStatus.DRAFT,
+        created_by=created_by,
+    )
+    db.add(propusk)
+    db.flush()
+    return propusk.id_propusk
+
+
+def _add_without_creator(db, org: Organiz, model: ModelAuto, abonent: Abonent):
+    """Пропуск, создатель которого отсутствует в users (внешний ключ отключается на время транзакции)"""
+    savepoint = db.begin_nested()
+    try:
+        db.execute(text("SET LOCAL session_replication_role = replica"))
+        missing_user = (db.query(func.max(User.id)).scalar() or 0) + 1000
+        propusk_id = _add_propusk(db, "Т000БС99", org, model, abonent, missing_user)
+        savepoint.commit()
+        return propusk_id
+    except DBAPIError:
+        savepoint.rollback()
+        return None
+
+
+def _orm_response(db, propusk_id: int) -> dict:
+    propusk = PropuskService.get_propusk_by_id(db, propusk_id)
+    return PropuskResponse.model_validate(_enrich_propusk(db, propusk)).model_dump()
+
+
+def test_propusk_rows(existing: int = 200):
+    print("\n" + "="*60)
+    print("   ТЕСТ: ПЛОСКАЯ ВЫБОРКА = ORM + _enrich_propusk")
+    print("="*60 + "\n")
+
+    db = SessionLocal()
+    ok = True
+    try:
+        user = db.query(User).order_by(User.id).first()
+        org = db.query(Organiz).order_by(Organiz.id_org).first()
+        model = db.query(ModelAuto).order_by(ModelAuto.id_model).first()
+        if not user or not org or not model:
+            print("❌ Нет пользователей, организаций или моделей! Сначала запусти seed_data.py")
+            return False
+
+        abonents = {
+            "отчество пустое": Abonent(surname="Тестов", name="Пустое", otchestvo="", id_org=org.id_org),
+            "отчества нет": Abonent(surname="Тестов", name="Без", otchestvo=None, id_org=org.id_org),
+            "полное ФИО": Abonent(surname="Тестов", name="Полный", otchestvo="Иванович", id_org=org.id_org),
+        }
+        db.add_all(abonents.values())
+        db.flush()
+
+        cases = {
+            title: _add_propusk(db, f"Т{index:03d}ТС99", org, model, abonent, user.id)
+            for index, (title, abonent) in enumerate(abonents.items(), start=1)
+        }
+        missing_creator = _add_without_creator(db, org, model, abonents["полное ФИО"])
+        if missing_creator:
+            cases["создателя нет"] = missing_creator
+        else:
+            print("⚠️ Случай 'создателя нет' пропущен: нужны права на session_replication_role\n")
+
+        # Новые пропуска - первые в порядке created_at desc, id desc
+        rows = PropuskService.get_propusk_rows(db, limit=existing + len(cases))
+        by_id = {row["id_propusk"]: row for row in rows}
+
+        for title, propusk_id in cases.items():
+            row = by_id.get(propusk_id)
+            if row is None:
+                print(f"❌ {title}: пропуск {propusk_id} не попал в выборку")
+                ok = False
+                continue
+            expected = _orm_response(db, propusk_id)
+            actual = PropuskResponse.model_validate(_row_to_response(row).model_dump()).model_dump()
+            passed = actual == expected
+            ok = ok and passed
+            print(f"{'✅' if passed else '❌'} {title}: abonent_fio={actual['abonent_fio']!r}, creator_name={actual['creator_name']!r}")
+            if not passed:
+                print(f"   ORM:     {expected}\n   выборка: {actual}")
+
+        mismatched = []
+        for propusk_id, row in by_id.items():
+            if propusk_id in cases.values():
+                continue
+            actual = PropuskResponse.model_validate(_row_to_response(row).model_dump()).model_dump()
+            if actual != _orm_response(db, propusk_id):
+                mismatched.append(propusk_id)
+        compared = len(by_id) - len(cases)
+        print(f"{'✅' if not mismatched else '❌'} существующие пропуска: совпало {compared - len(mismatched)} из {compared}")
+        if mismatched:
+            print(f"   расхождения: {mismatched[:20]}")
+            ok = False
+    finally:
+        db.rollback()
+        db.close()
+
+    print("\n" + "="*60)
+    print("   ✅ ВСЁ РАБОТАЕТ ОТЛИЧНО!" if ok else "   ❌ ВЫБОРКА РАСХОДИТСЯ С ORM")
+    print("="*60 + "\n")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_propusk_rows(*[int(value) for value in sys.argv[1:2]]) else 1)